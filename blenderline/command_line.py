@@ -9,10 +9,21 @@ from blenderline.scripts.python import (  # noqa: E402
     run_convert,
     run_download,
     run_generate,
+    run_online,
+    run_stats,
+    run_tune,
+    run_verify,
 )
 
 DOWNLOAD_NAME_CHOICES = ["example_beer"]
-CONVERT_FORMAT_CHOICES = ["yolo_detection", "yolo_segmentation"]
+CONVERT_FORMAT_CHOICES = [
+    "coco",
+    "instance_maps",
+    "webdataset",
+    "yolo_detection",
+    "yolo_segmentation",
+]
+CONVERT_IMAGE_MODE_CHOICES = ["auto", "copy", "hardlink", "symlink", "reflink", "move"]
 
 
 def cli_parser() -> argparse.ArgumentParser:
@@ -76,6 +87,209 @@ def cli_parser() -> argparse.ArgumentParser:
         help="Absolute location of the folder in which Blender is installed.\n"
         "By default, BlenderLine assumes that Blender is added to the system path.",
     )
+    generate_optional_parser.add_argument(
+        "--overlay",
+        required=False,
+        action="append",
+        metavar="<filepath>",
+        help="Absolute or relative location of a configuration overlay, e.g., generated\n"
+        "by `blenderline tune`. May be given multiple times, in which case overlays are\n"
+        "applied in order.",
+    )
+    generate_optional_parser.add_argument(
+        "--workers",
+        required=False,
+        type=int,
+        metavar="<int>",
+        help="Number of parallel Blender processes to generate the dataset with.\n"
+        "By default, BlenderLine uses generation.workers from the configuration, or 1.",
+    )
+    generate_optional_parser.add_argument(
+        "--estimate-samples",
+        required=False,
+        default=5,
+        type=int,
+        metavar="<int>",
+        help="Number of instances per split rendered to estimate the cost of generation.\n"
+        "By default, BlenderLine renders 5 instances per split.",
+    )
+    generate_optional_parser.add_argument(
+        "--max-hours",
+        required=False,
+        type=float,
+        metavar="<float>",
+        help="Wall-clock budget in hours. If set, BlenderLine first estimates the cost of\n"
+        "generation and aborts if the upper bound of the estimate exceeds the budget.",
+    )
+    generate_optional_parser.add_argument(
+        "--max-disk",
+        required=False,
+        type=float,
+        metavar="<float>",
+        help="Disk budget in GB. If set, BlenderLine first estimates the cost of\n"
+        "generation and aborts if the upper bound of the estimate exceeds the budget.",
+    )
+    generate_optional_parser.add_argument(
+        "--instances",
+        required=False,
+        metavar="<filepath>",
+        help="Absolute or relative location of a JSON list of instances to (re)generate,\n"
+        "e.g., invalid.json written by `blenderline verify`, or quarantine.json.\n"
+        "By default, BlenderLine generates all instances of the configured splits.",
+    )
+    generate_flags_parser = generate_parser.add_argument_group("flags")
+    generate_flags_parser.add_argument(
+        "--estimate",
+        required=False,
+        action="store_true",
+        help="If set, BlenderLine only renders a small stratified sample of instances\n"
+        "per split and reports the estimated wall-clock time, disk usage and inode\n"
+        "count (with 95%% confidence intervals) of generating the full dataset.",
+    )
+    generate_flags_parser.add_argument(
+        "--allow-partial",
+        required=False,
+        action="store_true",
+        help="If set, label_mapping.json, which marks the dataset as complete, is also\n"
+        "written if some instances were quarantined. BlenderLine still exits with a\n"
+        "non-zero code in that case.",
+    )
+
+    # Online subparser
+    online_parser = subparsers.add_parser(
+        name="online",
+        help="Stream samples from Blender workers without writing files, to measure the\n"
+        "throughput an online dataset can feed a training process with.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    online_required_parser = online_parser.add_argument_group("required arguments")
+    online_required_parser.add_argument(
+        "--config",
+        required=True,
+        metavar="<filepath>",
+        help="Absolute or relative location of the configuration file.",
+    )
+    online_optional_parser = online_parser.add_argument_group("optional arguments")
+    online_optional_parser.add_argument(
+        "--blender",
+        required=False,
+        metavar="<filepath>",
+        help="Absolute location of the folder in which Blender is installed.\n"
+        "By default, BlenderLine assumes that Blender is added to the system path.",
+    )
+    online_optional_parser.add_argument(
+        "--overlay",
+        required=False,
+        action="append",
+        metavar="<filepath>",
+        help="Absolute or relative location of a configuration overlay. May be given\n"
+        "multiple times, in which case overlays are applied in order.",
+    )
+    online_optional_parser.add_argument(
+        "--workers",
+        required=False,
+        type=int,
+        metavar="<int>",
+        help="Number of parallel Blender processes to generate samples with.\n"
+        "By default, BlenderLine uses generation.workers from the configuration, or 1.",
+    )
+    online_optional_parser.add_argument(
+        "--images",
+        required=False,
+        default=100,
+        type=int,
+        metavar="<int>",
+        help="Number of samples to receive before stopping the Blender processes.\n"
+        "By default, BlenderLine receives 100 samples.",
+    )
+
+    # Tune subparser
+    tune_parser = subparsers.add_parser(
+        name="tune",
+        help="Find the fastest CPU render settings for a configuration file.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    tune_required_parser = tune_parser.add_argument_group("required arguments")
+    tune_required_parser.add_argument(
+        "--config",
+        required=True,
+        metavar="<filepath>",
+        help="Absolute or relative location of the configuration file.",
+    )
+    tune_required_parser.add_argument(
+        "--output",
+        required=True,
+        metavar="<filepath>",
+        help="Absolute or relative location of the configuration overlay to write the\n"
+        "best settings to. Pass it to `blenderline generate --overlay`.",
+    )
+    tune_optional_parser = tune_parser.add_argument_group("optional arguments")
+    tune_optional_parser.add_argument(
+        "--blender",
+        required=False,
+        metavar="<filepath>",
+        help="Absolute location of the folder in which Blender is installed.\n"
+        "By default, BlenderLine assumes that Blender is added to the system path.",
+    )
+    tune_optional_parser.add_argument(
+        "--overlay",
+        required=False,
+        action="append",
+        metavar="<filepath>",
+        help="Absolute or relative location of a configuration overlay to tune with.",
+    )
+    tune_optional_parser.add_argument(
+        "--workers",
+        required=False,
+        nargs="+",
+        type=int,
+        metavar="<int>",
+        help="Numbers of parallel Blender processes to try. By default, 1, 2, and 4.",
+    )
+    tune_optional_parser.add_argument(
+        "--threads",
+        required=False,
+        nargs="+",
+        type=int,
+        metavar="<int>",
+        help="Numbers of Cycles threads per Blender process to try. By default,\n"
+        "BlenderLine divides the available cores evenly over the processes.",
+    )
+    tune_optional_parser.add_argument(
+        "--tile-sizes",
+        required=False,
+        nargs="+",
+        type=int,
+        metavar="<int>",
+        help="Render tile sizes to try. By default, 256 and 2048.",
+    )
+    tune_optional_parser.add_argument(
+        "--samples",
+        required=False,
+        nargs="+",
+        type=int,
+        metavar="<int>",
+        help="Render sample counts to try. By default, BlenderLine keeps the\n"
+        "configured sample count, as it affects image quality.",
+    )
+    tune_optional_parser.add_argument(
+        "--images",
+        required=False,
+        default=3,
+        type=int,
+        metavar="<int>",
+        help="Number of calibration images to render per Blender process. The first\n"
+        "image of every process is excluded from measurements as warm-up.\n"
+        "By default, BlenderLine renders 3 images per process.",
+    )
+    tune_optional_parser.add_argument(
+        "--max-rss",
+        required=False,
+        type=float,
+        metavar="<float>",
+        help="Maximum combined peak memory (in MB) of all Blender processes.\n"
+        "By default, memory usage is not restricted.",
+    )
 
     # Convert subparser
     convert_parser = subparsers.add_parser(
@@ -87,9 +301,12 @@ def cli_parser() -> argparse.ArgumentParser:
     convert_required_parser.add_argument(
         "--format",
         required=True,
+        nargs="+",
         choices=CONVERT_FORMAT_CHOICES,
         metavar="<option>",
-        help=f"Type of dataset to convert to. Must be in {{{', '.join(CONVERT_FORMAT_CHOICES)}}}",
+        help=f"Type(s) of dataset to convert to. Must be in {{{', '.join(CONVERT_FORMAT_CHOICES)}}}.\n"
+        "If several types are given, all are converted in a single pass over the\n"
+        "dataset, each to a subfolder of the target named after the type.",
     )
     convert_required_parser.add_argument(
         "--source",
@@ -126,6 +343,63 @@ def cli_parser() -> argparse.ArgumentParser:
         "factor of 0.005, based on the example_beer dataset. Note that this\n"
         "argument is ignored for non-segmentation tasks.",
     )
+    convert_optional_parser.add_argument(
+        "--precision",
+        required=False,
+        default=6,
+        type=int,
+        metavar="<int>",
+        help="Number of decimals of normalized label coordinates.\n"
+        "By default, BlenderLine writes coordinates with 6 decimals.",
+    )
+    convert_optional_parser.add_argument(
+        "--shard-size",
+        required=False,
+        default=500,
+        type=int,
+        metavar="<int>",
+        help="Maximum size of tar shards in megabytes, unless a shard holds a single\n"
+        "larger instance. By default, BlenderLine writes shards of up to 500 MB. Note\n"
+        "that this argument is ignored for formats other than webdataset.",
+    )
+    convert_optional_parser.add_argument(
+        "--jobs",
+        required=False,
+        default=1,
+        type=int,
+        metavar="<int>",
+        help="Number of parallel processes to convert instances with, where 0 uses one\n"
+        "process per CPU core. The converted dataset does not depend on the number of\n"
+        "processes. By default, BlenderLine converts in a single process.",
+    )
+    convert_optional_parser.add_argument(
+        "--image-mode",
+        required=False,
+        default="auto",
+        choices=CONVERT_IMAGE_MODE_CHOICES,
+        metavar="<option>",
+        help=f"Way of placing images in the converted dataset. Must be in {{{', '.join(CONVERT_IMAGE_MODE_CHOICES)}}}.\n"
+        "By default (auto), BlenderLine uses a copy-on-write reflink or else a hardlink\n"
+        "if source and target are on the same device, and copies images otherwise. The\n"
+        "move mode can be combined with --remove to never hold two copies of images.",
+    )
+    convert_optional_parser.add_argument(
+        "--skip",
+        required=False,
+        metavar="<filepath>",
+        help="Absolute or relative location of a JSON list of instances to skip, e.g.,\n"
+        "invalid.json written by `blenderline verify`. By default, BlenderLine converts\n"
+        "all instances.",
+    )
+    convert_optional_parser.add_argument(
+        "--follow-timeout",
+        required=False,
+        type=float,
+        metavar="<seconds>",
+        help="Number of seconds without newly generated instances after which --follow\n"
+        "stops with an error. By default, BlenderLine waits until generation completes\n"
+        "or fails.",
+    )
     convert_flags_parser = convert_parser.add_argument_group("flags")
     convert_flags_parser.add_argument(
         "--remove",
@@ -135,6 +409,126 @@ def cli_parser() -> argparse.ArgumentParser:
         "possible, it is discouraged to add the converted dataset to the source dataset\n"
         "by setting neither --target nor --remove.",
     )
+    convert_flags_parser.add_argument(
+        "--shard-masks",
+        required=False,
+        action="store_true",
+        help="If set, the webdataset format includes an instance-ID map of every image\n"
+        "as PNG image, in which pixel value i belongs to the i-th annotation.",
+    )
+    convert_flags_parser.add_argument(
+        "--incremental",
+        required=False,
+        action="store_true",
+        help="If set, only instances that are new or changed since an earlier incremental\n"
+        "conversion to the same target are converted, and outputs of deleted instances\n"
+        "are removed. Changing any conversion parameter converts all instances again.",
+    )
+    convert_flags_parser.add_argument(
+        "--follow",
+        required=False,
+        action="store_true",
+        help="If set, instances are converted while the source dataset is being generated,\n"
+        "as soon as they are complete, until generation completes. The conversion fails\n"
+        "if generation fails. The conversion is incremental, so an interrupted\n"
+        "conversion can be resumed.",
+    )
+    convert_flags_parser.add_argument(
+        "--stats",
+        required=False,
+        action="store_true",
+        help="If set, dataset statistics are computed from the masks decoded for conversion\n"
+        "and written to statistics.json in the target, as `blenderline stats` would.",
+    )
+
+    # Stats subparser
+    stats_parser = subparsers.add_parser(
+        name="stats",
+        help="Compute statistics of a BlenderLine dataset or a converted YOLO dataset.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    stats_required_parser = stats_parser.add_argument_group("required arguments")
+    stats_required_parser.add_argument(
+        "--source",
+        required=True,
+        metavar="<filepath>",
+        help="Absolute or relative location of the BlenderLine dataset, or of a dataset\n"
+        "converted to yolo_detection or yolo_segmentation.",
+    )
+    stats_required_parser.add_argument(
+        "--output",
+        required=True,
+        metavar="<filepath>",
+        help="Absolute or relative location of the folder to write statistics.json and\n"
+        "histogram images to.",
+    )
+    stats_optional_parser = stats_parser.add_argument_group("optional arguments")
+    stats_optional_parser.add_argument(
+        "--minarea",
+        required=False,
+        default=0.005,
+        type=float,
+        metavar="<float>",
+        help="Minimum area an object mask must have to be counted as object, as in\n"
+        "`blenderline convert`. Masks below it are reported as dropped. Note that this\n"
+        "argument is ignored for converted datasets. By default, 0.005.",
+    )
+    stats_optional_parser.add_argument(
+        "--jobs",
+        required=False,
+        default=1,
+        type=int,
+        metavar="<int>",
+        help="Number of parallel processes to compute statistics with, where 0 uses one\n"
+        "process per CPU core. By default, BlenderLine uses a single process.",
+    )
+    stats_flags_parser = stats_parser.add_argument_group("flags")
+    stats_flags_parser.add_argument(
+        "--plots",
+        required=False,
+        action="store_true",
+        help="If set, every histogram is also written as PNG image per split.",
+    )
+
+    # Verify subparser
+    verify_parser = subparsers.add_parser(
+        name="verify",
+        help="Check a BlenderLine dataset for incomplete or corrupt instances.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    verify_required_parser = verify_parser.add_argument_group("required arguments")
+    verify_required_parser.add_argument(
+        "--source",
+        required=True,
+        metavar="<filepath>",
+        help="Absolute or relative location of the BlenderLine dataset to verify.",
+    )
+    verify_optional_parser = verify_parser.add_argument_group("optional arguments")
+    verify_optional_parser.add_argument(
+        "--output",
+        required=False,
+        metavar="<filepath>",
+        help="Absolute or relative location of the JSON list of invalid instances.\n"
+        "By default, BlenderLine writes invalid.json next to quarantine.json, i.e., to\n"
+        ".blenderline/<dataset name>/ next to the dataset.",
+    )
+    verify_optional_parser.add_argument(
+        "--jobs",
+        required=False,
+        default=1,
+        type=int,
+        metavar="<int>",
+        help="Number of parallel processes to verify instances with, where 0 uses one\n"
+        "process per CPU core. By default, BlenderLine uses a single process.",
+    )
+    verify_flags_parser = verify_parser.add_argument_group("flags")
+    verify_flags_parser.add_argument(
+        "--headers-only",
+        required=False,
+        action="store_true",
+        help="If set, images are not decoded, and only their headers and ends are checked,\n"
+        "which finds empty and truncated images much faster.",
+    )
 
     return parser
 
@@ -147,7 +541,40 @@ def cli():
     if args.command == "download":
         run_download(name=args.name, target=args.target)
     elif args.command == "generate":
-        run_generate(config=args.config, target=args.target, blender=args.blender)
+        run_generate(
+            config=args.config,
+            target=args.target,
+            blender=args.blender,
+            overlays=args.overlay,
+            workers=args.workers,
+            estimate=args.estimate,
+            estimate_samples=args.estimate_samples,
+            max_hours=args.max_hours,
+            max_disk=args.max_disk,
+            instances=args.instances,
+            allow_partial=args.allow_partial,
+        )
+    elif args.command == "online":
+        run_online(
+            config=args.config,
+            overlays=args.overlay,
+            workers=args.workers,
+            blender=args.blender,
+            images=args.images,
+        )
+    elif args.command == "tune":
+        run_tune(
+            config=args.config,
+            output=args.output,
+            blender=args.blender,
+            overlays=args.overlay,
+            workers=args.workers,
+            threads=args.threads,
+            tile_sizes=args.tile_sizes,
+            samples=args.samples,
+            images=args.images,
+            max_rss=args.max_rss,
+        )
     elif args.command == "convert":
         run_convert(
             format=args.format,
@@ -156,6 +583,31 @@ def cli():
             minarea=args.minarea,
             remove=args.remove,
             eps_factor=args.eps_factor,
+            precision=args.precision,
+            shard_size=args.shard_size,
+            shard_masks=args.shard_masks,
+            jobs=args.jobs,
+            image_mode=args.image_mode,
+            incremental=args.incremental,
+            follow=args.follow,
+            stats=args.stats,
+            skip=args.skip,
+            follow_timeout=args.follow_timeout,
+        )
+    elif args.command == "stats":
+        run_stats(
+            source=args.source,
+            output=args.output,
+            minarea=args.minarea,
+            jobs=args.jobs,
+            plots=args.plots,
+        )
+    elif args.command == "verify":
+        run_verify(
+            source=args.source,
+            output=args.output,
+            jobs=args.jobs,
+            headers_only=args.headers_only,
         )
 
 
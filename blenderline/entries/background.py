@@ -35,7 +35,11 @@ class BackgroundEntry(BaseEntry):
         # Add Texture Image node.
         node: bpy.types.ShaderNodeTexImage = nodes.new("ShaderNodeTexImage")
         texture_node = node
-        texture_node.image = bpy.data.images.load(str(self.filepath))
+        # Reuse image datablock if the image was loaded before, instead of loading a
+        # new copy every time the entry is sampled.
+        texture_node.image = bpy.data.images.load(
+            str(self.filepath), check_existing=True
+        )
         texture_node.location = (-300, 0)
 
         # Add Principled BSDF node.
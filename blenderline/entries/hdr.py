@@ -42,7 +42,11 @@ class HDREntry(BaseEntry):
         # Add Environment Texture node.
         node: bpy.types.ShaderNodeTexEnvironment = nodes.new("ShaderNodeTexEnvironment")
         environment_node = node
-        environment_node.image = bpy.data.images.load(str(self.filepath))
+        # Reuse image datablock if the image was loaded before, instead of loading a
+        # new copy every time the entry is sampled.
+        environment_node.image = bpy.data.images.load(
+            str(self.filepath), check_existing=True
+        )
         environment_node.location = (-300, 0)
 
         # Add Background node.
@@ -39,6 +39,10 @@ class ItemEntry(BaseEntry):
         self.max_lateral_distance = max_lateral_distance
         self.relative_frequency = relative_frequency
 
+        # Convex hull vertices of the evaluated item mesh in object coordinates, computed
+        # once for all spawned items when bounding boxes are projected.
+        self.hull_vertices = None
+
     def spawn(self, location: tuple[float, float, float]) -> ItemReference:
         """Instantiate item object in the scene at a given location.
 
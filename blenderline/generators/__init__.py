@@ -1 +1 @@
-from .image import ImageDatasetGenerator
+from .image import ImageDatasetGenerator, SampleRecord
@@ -1,13 +1,22 @@
 import json
 import pathlib
-from dataclasses import dataclass
+import shutil
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
 
 from blenderline.managers import (
     BackgroundManager,
     HDRManager,
     ItemManager,
+    LifecycleManager,
     SceneManager,
 )
+from blenderline.utils import SampleRing, append_progress
+
+# Stages of generating a sample at which registered hooks are called.
+HOOK_STAGES = ["before_render", "after_render", "after_write"]
 
 
 @dataclass(frozen=True, eq=True)
@@ -26,6 +35,44 @@ class Label:
     label_name: str
 
 
+@dataclass(frozen=True, eq=True)
+class Instance:
+    """Instance (image) in dataset split."""
+
+    split: str
+    index: int
+
+
+@dataclass
+class SampleRecord:
+    """Record of a sample generated for an instance, passed to hooks and yielded by
+    ImageDatasetGenerator.iter_instances.
+    """
+
+    instance: Instance
+    output_folder: pathlib.Path  # None in online generation, which writes no files.
+    entries: dict = field(default_factory=dict)  # HDR and background files, if any.
+    layout: list[dict] = field(default_factory=list)  # Placement of every item.
+    outputs: dict = None  # Filenames of image, masks, and labels, once rendered.
+    sample: dict = None  # Sample rendered into memory, in online generation.
+    timings: dict = field(default_factory=dict)  # Seconds spent per stage.
+    telemetry: dict = field(default_factory=dict)  # Memory telemetry after clearing.
+    rejections: int = 0  # Number of samples rejected by hooks before this one.
+
+    @property
+    def output_paths(self) -> list[pathlib.Path]:
+        """Absolute locations of all output files of the sample."""
+        if not self.outputs:
+            return []
+
+        filenames = [
+            self.outputs["image"],
+            *(mask["file"] for mask in self.outputs["masks"]),
+            self.outputs.get("labels"),
+        ]
+        return [self.output_folder / filename for filename in filenames if filename]
+
+
 class ImageDatasetGenerator:
     """Generator for image datasets."""
 
@@ -37,6 +84,9 @@ class ImageDatasetGenerator:
         hdr_manager: HDRManager,
         background_manager: BackgroundManager,
         item_manager: ItemManager,
+        lifecycle_manager: LifecycleManager,
+        hook_threads: int = 0,
+        max_rejections: int = 100,
     ) -> None:
         """Create dataset generator.
 
@@ -47,6 +97,12 @@ class ImageDatasetGenerator:
             hdr_manager (HDRManager): HDR background manager.
             background_manager (BackgroundManager): background manager.
             item_manager (ItemManager): item manager.
+            lifecycle_manager (LifecycleManager): datablock lifecycle manager.
+            hook_threads (int, optional): number of threads calling after write hooks
+                while the next instance renders. Defaults to 0, i.e., hooks are called
+                before the next instance renders.
+            max_rejections (int, optional): number of samples of an instance that hooks
+                can reject before the instance fails. Defaults to 100.
         """
         # Save object attributes.
         self.name = name
@@ -55,11 +111,18 @@ class ImageDatasetGenerator:
         self.hdr_manager = hdr_manager
         self.background_manager = background_manager
         self.item_manager = item_manager
+        self.lifecycle_manager = lifecycle_manager
+        self.hook_threads = hook_threads
+        self.max_rejections = max_rejections
 
         # Keep track of registered splits and labels.
         self.registered_splits: list[Split] = list()
         self.registered_labels: set[Label] = set()
 
+        # Keep track of registered hooks per stage.
+        self.hooks: dict[str, list[Callable]] = {stage: [] for stage in HOOK_STAGES}
+        self.hook_executor = None
+
     def register_split(self, name: str, size: int) -> None:
         """Register dataset split to generate
 
@@ -83,28 +146,378 @@ class ImageDatasetGenerator:
         self.hdr_manager.initialize()
         self.background_manager.initialize()
         self.item_manager.initialize()
+        self.lifecycle_manager.initialize()
+
+        # Start threads calling after write hooks.
+        if self.hook_threads:
+            self.hook_executor = ThreadPoolExecutor(
+                self.hook_threads, thread_name_prefix="blenderline-hook"
+            )
+
+    def close(self) -> None:
+        """Wait for outputs written and after write hooks called in the background, and
+        stop their threads, after which no more instances can be generated. Raises the
+        first error that occurred while writing."""
+        if self.hook_executor is not None:
+            hook_executor, self.hook_executor = self.hook_executor, None
+            hook_executor.shutdown(wait=True)
+        self.scene_manager.close()
+
+    def get_instances(
+        self, worker_index: int = 0, worker_count: int = 1
+    ) -> list[Instance]:
+        """Get instances to generate by a worker, when generation is distributed over
+            multiple worker processes. Instances are assigned to workers round-robin.
+
+        Args:
+            worker_index (int, optional): index of worker. Defaults to 0.
+            worker_count (int, optional): total number of workers. Defaults to 1.
+
+        Returns:
+            list[Instance]: instances to generate, in order.
+        """
+        instances = [
+            Instance(split.name, i)
+            for split in self.registered_splits
+            for i in range(split.size)
+        ]
+        return instances[worker_index::worker_count]
+
+    def register_hook(
+        self, stage: str, hook: Callable[[SampleRecord], bool | None]
+    ) -> None:
+        """Register hook that is called with the record of every generated sample at a
+            stage of generation. Hooks of a stage are called in order of registration.
+
+            - before_render: after the scene is sampled, before it is rendered.
+            - after_render: after the scene is rendered, while it is still populated,
+                but possibly before outputs are written in the background.
+            - after_write: once all outputs are written, in the hook threads if
+                configured, so that post-processing overlaps rendering.
+
+            Before and after render hooks can reject a sample by returning False, in
+            which case its outputs are removed and the instance is sampled again, up to
+            max_rejections times. Errors raised by hooks fail the instance.
+
+        Args:
+            stage (str): stage to call hook at, one of HOOK_STAGES.
+            hook (Callable[[SampleRecord], bool | None]): function called with the
+                sample record.
+        """
+        if stage not in HOOK_STAGES:
+            raise Exception(f"Configure hook stage as one of {', '.join(HOOK_STAGES)}")
+        self.hooks[stage].append(hook)
+
+    def run_hooks(self, stage: str, record: SampleRecord) -> bool:
+        """Call hooks registered for a stage with a sample record.
+
+        Args:
+            stage (str): stage of generation.
+            record (SampleRecord): record of generated sample.
+
+        Returns:
+            bool: False if any hook rejected the sample, else True.
+        """
+        accepted = True
+        for hook in self.hooks[stage]:
+            if hook(record) is False:
+                accepted = False
+
+        return accepted
+
+    def get_layout(self) -> list[dict]:
+        """Get placement of every spawned item in the scene.
+
+        Returns:
+            list[dict]: label, pass index, item asset, location, and rotation quaternion
+                (w, x, y, z) of every item, in spawn order.
+        """
+        return [
+            {
+                "label": item_reference.reference_entry.label,
+                "pass_index": item_reference.pass_index,
+                "filepath": str(item_reference.reference_entry.filepath),
+                "object_name": item_reference.reference_entry.object_name,
+                "location": list(item_reference.item_object.location),
+                "rotation": list(item_reference.item_object.rotation_quaternion),
+            }
+            for item_reference in self.item_manager.item_references
+        ]
+
+    def generate_instance(self, instance: Instance) -> SampleRecord:
+        """Sample a scene and render it to the instance folder. The scene is sampled
+            again as long as before or after render hooks reject it.
+
+        Args:
+            instance (Instance): instance to generate.
+
+        Returns:
+            SampleRecord: record of generated sample, whose outputs may still be
+                written in the background.
+        """
+        output_folder = self.target / self.name / instance.split / str(instance.index)
+        record = SampleRecord(instance=instance, output_folder=output_folder)
+        self.generate_record(record)
+        return record
+
+    def generate_record(self, record: SampleRecord) -> None:
+        """Sample a scene and render it to the output folder of a sample record, or into
+            its sample if it has no output folder. The scene is sampled again as long as
+            before or after render hooks reject it, and the instance fails once they
+            rejected more than max_rejections samples.
+
+        Args:
+            record (SampleRecord): record of sample to generate, which is updated.
+        """
+        output_folder = record.output_folder
+
+        while True:
+            # Remove outputs of a previous, interrupted or rejected attempt at
+            # generating the instance, as output filenames are random.
+            if output_folder and output_folder.exists():
+                shutil.rmtree(output_folder)
 
-    def generate_dataset(self) -> None:
-        for split in self.registered_splits:
-            for i in range(split.size):
-                # Randomly sample (HDR) background.
+            # Fail instead of sampling forever if hooks reject every sample.
+            if record.rejections > self.max_rejections:
+                raise Exception(
+                    f"Hooks rejected {record.rejections} samples of instance "
+                    f"{record.instance.index} of split {record.instance.split}. Please "
+                    "check the hooks, or configure a higher generation.max_rejections"
+                )
+            start_time = time.perf_counter()
+
+            # Randomly sample (HDR) background, which only affects rendered images.
+            if self.scene_manager.render_images:
                 self.hdr_manager.sample()
                 self.background_manager.sample()
+                record.entries = {
+                    "hdr": str(self.hdr_manager.active_entry.filepath),
+                    "background": str(self.background_manager.active_entry.filepath),
+                }
 
-                # Sample number of items and assign pass indices
-                self.item_manager.sample()
-                self.item_manager.assign_pass_indices()
+            # Sample number of items and assign pass indices
+            self.item_manager.sample()
+            self.item_manager.assign_pass_indices()
+            record.layout = self.get_layout()
+            record.timings = {"sample": time.perf_counter() - start_time}
 
-                # Render image and segmentation masks
-                self.scene_manager.render(
-                    output_folder=self.target / self.name / split.name / str(i),
-                    item_references=self.item_manager.item_references,
-                )
+            # Render image and segmentation masks, or only write the layout labels,
+            # into files or memory, unless the sampled scene is rejected.
+            accepted = self.run_hooks("before_render", record)
+            if accepted:
+                start_time = time.perf_counter()
+                if output_folder:
+                    record.outputs = self.scene_manager.render(
+                        output_folder=output_folder,
+                        item_references=self.item_manager.item_references,
+                        split=record.instance.split,
+                    )
+                else:
+                    record.sample = self.scene_manager.render_sample(
+                        item_references=self.item_manager.item_references
+                    )
+                record.timings["render"] = time.perf_counter() - start_time
+                accepted = self.run_hooks("after_render", record)
+
+            # Clear items for next iteration
+            self.item_manager.clear()
+            if accepted:
+                return
+
+            # Wait for outputs of the rejected sample to be written before they are
+            # removed.
+            for future in self.scene_manager.pop_pending_writes():
+                future.result()
+            record.outputs, record.sample = None, None
+            record.rejections += 1
+
+    def finish_instance(self, record: SampleRecord, futures: list[Future]) -> None:
+        """Wait for outputs of a generated sample to be written, and call after write
+            hooks.
+
+        Args:
+            record (SampleRecord): record of generated sample.
+            futures (list[Future]): futures of outputs written in the background.
+        """
+        for future in futures:
+            future.result()
+
+        start_time = time.perf_counter()
+        self.run_hooks("after_write", record)
+        record.timings["after_write"] = time.perf_counter() - start_time
+
+    def iter_instances(
+        self,
+        instances: list[Instance],
+        max_images: int = None,
+        max_rss: float = None,
+    ) -> Iterator[SampleRecord]:
+        """Generate instances, and yield the record of every instance in order once all
+            its outputs are written and its after write hooks are done. Outputs of an
+            instance are written, and its hooks called, while the next instance renders.
+
+        Args:
+            instances (list[Instance]): instances to generate.
+            max_images (int, optional): number of images after which to stop, so that the
+                worker process can be recycled. Defaults to None.
+            max_rss (float, optional): memory usage (in MB) after which to stop, so that
+                the worker process can be recycled. Defaults to None.
+
+        Yields:
+            SampleRecord: record of generated sample.
+        """
+        # Instances whose outputs may still be written in the background, in order.
+        pending: list[tuple[SampleRecord, list[Future]]] = []
+
+        for num_images, instance in enumerate(instances, start=1):
+            record = self.generate_instance(instance)
+
+            # Purge orphaned datablocks and collect memory telemetry.
+            record.telemetry = self.lifecycle_manager.step()
+
+            # Call after write hooks once outputs are written, in the hook threads if
+            # configured, and else before rendering the next instance.
+            futures = self.scene_manager.pop_pending_writes()
+            if self.hooks["after_write"] and self.hook_executor:
+                futures = [
+                    self.hook_executor.submit(self.finish_instance, record, futures)
+                ]
+            elif self.hooks["after_write"]:
+                self.finish_instance(record, futures)
+                futures = []
+            pending.append((record, futures))
+            yield from self.pop_completed(pending)
+
+            # Stop early if the worker process needs to be recycled.
+            if num_images < len(instances) and (
+                (max_images and num_images >= max_images)
+                or (max_rss and record.telemetry["rss"] > max_rss * 2**20)
+            ):
+                break
+
+        yield from self.pop_completed(pending, wait=True)
+
+    def generate_dataset(
+        self,
+        worker_index: int = 0,
+        worker_count: int = 1,
+        progress_path: pathlib.Path = None,
+        instances: list[Instance] = None,
+        max_images: int = None,
+        max_rss: float = None,
+    ) -> None:
+        """Generate all instances assigned to this worker, and close the generator once
+            all outputs are written. The label mapping is only written if the entire
+            dataset is generated by this worker, as it marks a complete dataset.
+
+        Args:
+            worker_index (int, optional): index of worker. Defaults to 0.
+            worker_count (int, optional): total number of workers. Defaults to 1.
+            progress_path (pathlib.Path, optional): progress file to append a record to
+                after every generated instance. Defaults to None.
+            instances (list[Instance], optional): explicit instances to generate instead
+                of the instances assigned to this worker. Defaults to None.
+            max_images (int, optional): number of images after which to stop, so that the
+                worker process can be recycled. Defaults to None.
+            max_rss (float, optional): memory usage (in MB) after which to stop, so that
+                the worker process can be recycled. Defaults to None.
+        """
+        # Only a worker generating the entire dataset writes the label mapping.
+        write_label_mapping = instances is None and worker_count == 1
+        if instances is None:
+            instances = self.get_instances(worker_index, worker_count)
+
+        num_images = 0
+        try:
+            for record in self.iter_instances(instances, max_images, max_rss):
+                num_images += 1
+
+                # Report progress to the process that launched this worker.
+                if progress_path:
+                    append_progress(
+                        progress_path,
+                        {
+                            "split": record.instance.split,
+                            "index": record.instance.index,
+                            "render_time": record.timings["sample"]
+                            + record.timings["render"],
+                            "outputs": record.outputs,
+                            **record.telemetry,
+                            "timestamp": time.time(),
+                        },
+                    )
+        finally:
+            # Flush outputs written in the background, and raise write errors that no
+            # record reported, before the dataset is marked as complete.
+            self.close()
+
+        # The dataset is incomplete if the worker stopped early to be recycled.
+        if write_label_mapping and num_images == len(instances):
+            self.write_label_mapping()
+
+    def pop_completed(
+        self, pending: list[tuple[SampleRecord, list[Future]]], wait: bool = False
+    ) -> list[SampleRecord]:
+        """Remove generated instances from the pending instances in order, once all
+            their outputs are written and their after write hooks are done.
+
+        Args:
+            pending (list[tuple[SampleRecord, list[Future]]]): record and futures of
+                outputs written or hooks called in the background of every pending
+                instance.
+            wait (bool, optional): whether to wait until all outputs are written.
+                Defaults to False.
+
+        Returns:
+            list[SampleRecord]: records of completed instances.
+        """
+        completed: list[SampleRecord] = []
+        while pending and (wait or all(future.done() for future in pending[0][1])):
+            record, futures = pending.pop(0)
+
+            # Raise errors that occurred while writing or in hooks, which fail the
+            # instance.
+            for future in futures:
+                future.result()
+            completed.append(record)
+
+        return completed
+
+    def generate_online(self, sample_ring: SampleRing) -> None:
+        """Generate samples into memory until the reader closes the sample ring, without
+            writing any file. Generation blocks while the ring is full. The caller closes
+            the ring, and marks it as failed if generation raises.
+
+            Before and after render hooks are called with a record of every sample, as
+            an instance of the "online" split numbered in generation order, and can
+            reject it. After write hooks are not supported, as nothing is written.
+
+        Args:
+            sample_ring (SampleRing): ring to write samples to.
+        """
+        if self.hooks["after_write"]:
+            raise Exception(
+                "Please configure no after_write hooks for online generation, as no "
+                "outputs are written"
+            )
+
+        index = 0
+        while not sample_ring.closed:
+            # Render sample into memory, unless rejected by hooks.
+            record = SampleRecord(
+                instance=Instance("online", index), output_folder=None
+            )
+            self.generate_record(record)
+            index += 1
+
+            # Purge orphaned datablocks.
+            record.telemetry = self.lifecycle_manager.step()
 
-                # Clear items for next iteration
-                self.item_manager.clear()
+            if not sample_ring.put(record.sample):
+                break
 
-        # Write label mapping
+    def write_label_mapping(self) -> None:
+        """Write mapping between label indices and label names to dataset folder."""
         with open(self.target / self.name / "label_mapping.json", mode="+wt") as file:
             label_mapping = {
                 label.label: label.label_name for label in self.registered_labels
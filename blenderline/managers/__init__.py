@@ -1,4 +1,5 @@
 from .background import BackgroundManager
 from .hdr import HDRManager
 from .item import ItemManager
+from .lifecycle import LifecycleManager
 from .scene import SceneManager
@@ -21,6 +21,9 @@ class BackgroundManager:
         self.background_object_name = background_object_name
         self.background_collection = background_collection
 
+        # Keep track of background entry applied last.
+        self.active_entry = None
+
     def initialize(self) -> None:
         """Get background object."""
         # Get background object by name.
@@ -31,3 +34,4 @@ class BackgroundManager:
         # Sample background entry from collection and apply it to background object
         background_entry = self.background_collection.sample()
         background_entry.set(self.background_object)
+        self.active_entry = background_entry
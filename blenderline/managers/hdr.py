@@ -17,6 +17,9 @@ class HDRManager:
         # Save object attributes.
         self.hdr_collection = hdr_collection
 
+        # Keep track of HDR entry applied last.
+        self.active_entry = None
+
     def initialize(self) -> None:
         """Create world texture with nodes to put HDR background texture on."""
         # Create new world texture and enable nodes.
@@ -31,3 +34,4 @@ class HDRManager:
         # Sample HDR entry from collection and apply it to initialized world texture.
         hdr_entry = self.hdr_collection.sample()
         hdr_entry.set(self.world)
+        self.active_entry = hdr_entry
@@ -0,0 +1,108 @@
+import bpy
+
+from blenderline.utils import get_process_memory
+
+# Collections in bpy.data to track datablocks of. Spawned items bring their own objects,
+# meshes, materials, and textures, whereas (HDR) backgrounds load images.
+TRACKED_COLLECTIONS = [
+    "objects",
+    "meshes",
+    "materials",
+    "textures",
+    "images",
+    "node_groups",
+    "worlds",
+    "collections",
+    "libraries",
+]
+
+
+class LifecycleManager:
+    """Manager for datablock lifecycle-related operations, such as purging orphaned
+    datablocks created while generating and reporting memory telemetry.
+    """
+
+    def __init__(self, purge_interval: int) -> None:
+        """Create lifecycle manager.
+
+        Args:
+            purge_interval (int): number of generated images between purges of orphaned
+                datablocks. If 0, orphaned datablocks are never purged.
+        """
+        # Save object attributes.
+        self.purge_interval = purge_interval
+
+        # Keep track of number of generated images since initialization.
+        self.num_steps = 0
+
+    def initialize(self) -> None:
+        """Record datablocks present after initializing the scene. All other datablocks
+        are considered to be created by BlenderLine while generating.
+        """
+        self.initial_pointers = {
+            collection_name: {
+                datablock.as_pointer()
+                for datablock in getattr(bpy.data, collection_name)
+            }
+            for collection_name in TRACKED_COLLECTIONS
+        }
+
+    def purge(self) -> int:
+        """Remove datablocks created by BlenderLine that are no longer used. Removing a
+            datablock may orphan the datablocks it uses (e.g., mesh materials), so
+            collections are swept until no more datablocks are removed.
+
+        Returns:
+            int: number of removed datablocks.
+        """
+        num_removed = 0
+
+        while True:
+            num_removed_sweep = 0
+
+            for collection_name in TRACKED_COLLECTIONS:
+                collection = getattr(bpy.data, collection_name)
+                initial_pointers = self.initial_pointers[collection_name]
+
+                for datablock in list(collection):
+                    if datablock.users == 0 and (
+                        datablock.as_pointer() not in initial_pointers
+                    ):
+                        collection.remove(datablock)
+                        num_removed_sweep += 1
+
+            num_removed += num_removed_sweep
+            if num_removed_sweep == 0:
+                return num_removed
+
+    def get_telemetry(self) -> dict:
+        """Get number of datablocks per tracked collection and process memory usage.
+
+        Returns:
+            dict: datablock counts, and current and peak RSS in bytes.
+        """
+        rss, peak_rss = get_process_memory()
+
+        return {
+            "datablocks": {
+                collection_name: len(getattr(bpy.data, collection_name))
+                for collection_name in TRACKED_COLLECTIONS
+            },
+            "rss": rss,
+            "peak_rss": peak_rss,
+        }
+
+    def step(self) -> dict:
+        """Register generated image, purging orphaned datablocks at the configured
+            interval.
+
+        Returns:
+            dict: telemetry after the generated image.
+        """
+        self.num_steps += 1
+
+        num_purged = 0
+        if self.purge_interval and self.num_steps % self.purge_interval == 0:
+            num_purged = self.purge()
+
+        return {**self.get_telemetry(), "purged": num_purged}
@@ -1,9 +1,26 @@
+import json
 import pathlib
 import secrets
 
 import bpy
+import numpy as np
 
 from blenderline.references import ItemReference
+from blenderline.utils import (
+    LABELS_FILENAME,
+    EncodingProfile,
+    OutputWriter,
+    get_pass_labels,
+)
+
+# Modes of writing labels: mask images per item, a label sidecar per image extracted
+# from the object index pass, or a label sidecar with bounding boxes projected from item
+# geometry through the camera.
+LABEL_MODES = ["masks", "pass", "boxes"]
+
+# View transforms that can be applied to rendered pixels outside of Blender, which is
+# required to encode images in background threads or stream them from memory.
+PIXEL_VIEW_TRANSFORMS = ["Standard", "Raw"]
 
 
 class SceneManager:
@@ -19,6 +36,17 @@ class SceneManager:
         render_use_cuda: bool,
         render_denoising: bool,
         render_resolution: list[int, int],
+        render_threads: int,
+        render_tile_size: int,
+        label_mode: str = "masks",
+        render_images: bool = True,
+        encoding: EncodingProfile = EncodingProfile(),
+        split_encodings: dict[str, EncodingProfile] = None,
+        writer_threads: int = 0,
+        writer_queue_size: int = 8,
+        online: bool = False,
+        view_transform: str = None,
+        look: str = None,
     ) -> None:
         """Create scene manager.
 
@@ -29,7 +57,47 @@ class SceneManager:
             render_use_cuda (bool): whether to use CPU (False) or CUDA GPU (True).
             render_denoising (bool): enable denoising on rendered image.
             render_resolution (list[int, int]): image resolution ([x, y]) to render at.
+            render_threads (int): number of CPU threads to render with. If 0, Blender
+                detects the number of threads automatically.
+            render_tile_size (int): size (in pixels) of square render tiles.
+            label_mode (str, optional): way of writing labels, one of LABEL_MODES.
+                Defaults to "masks".
+            render_images (bool, optional): whether to render images. If False, only
+                layouts with projected bounding boxes are generated, which requires the
+                "boxes" label mode. Defaults to True.
+            encoding (EncodingProfile, optional): encoding of rendered images and
+                masks. Defaults to 8-bit PNG images and anti-aliased masks.
+            split_encodings (dict[str, EncodingProfile], optional): encoding per split
+                name, taking precedence over encoding. Defaults to None.
+            writer_threads (int, optional): number of background threads encoding and
+                writing outputs while the next image renders. If 0, outputs are written
+                by the compositor at the end of every render. Defaults to 0.
+            writer_queue_size (int, optional): maximum number of outputs waiting to be
+                written by background threads before rendering blocks. Defaults to 8.
+            online (bool, optional): whether samples are rendered into memory with
+                render_sample, instead of written to files with render. Defaults to
+                False.
+            view_transform (str, optional): color management view transform. Defaults
+                to None, i.e., "Standard" when rendered pixels are read from memory, and
+                else the Blender default.
+            look (str, optional): color management look. Defaults to None, i.e., "None"
+                when rendered pixels are read from memory, and else the Blender default.
         """
+        if label_mode not in LABEL_MODES:
+            raise Exception(f"Configure label mode as one of {', '.join(LABEL_MODES)}")
+        if not render_images and label_mode != "boxes":
+            raise Exception(
+                "Configure label mode as boxes to generate layouts without rendering"
+            )
+        if writer_threads and any(
+            profile.image_format != "PNG" or profile.mask_antialiasing
+            for profile in [encoding, *(split_encodings or {}).values()]
+        ):
+            raise Exception(
+                "Configure PNG images without mask anti-aliasing to write outputs in "
+                "background threads"
+            )
+
         # Save object attributes
         self.filepath = filepath
         self.camera_object_name = camera_object_name
@@ -37,13 +105,45 @@ class SceneManager:
         self.render_use_cuda = render_use_cuda
         self.render_denoising = render_denoising
         self.render_resolution = render_resolution
+        self.render_threads = render_threads
+        self.render_tile_size = render_tile_size
+        self.label_mode = label_mode
+        self.render_images = render_images
+        self.encoding = encoding
+        self.split_encodings = split_encodings or {}
+        self.writer_threads = writer_threads
+        self.writer_queue_size = writer_queue_size
+        self.online = online
+
+        # Rendered pixels are read from memory, rather than written by the compositor,
+        # when writing in the background or rendering samples into memory.
+        self.read_pixels = bool(writer_threads) or online
+
+        # Apply the view transform and look to the rendered pixels outside of Blender
+        # when reading them from memory, which only supports some view transforms.
+        if self.read_pixels:
+            view_transform = view_transform or PIXEL_VIEW_TRANSFORMS[0]
+            look = look or "None"
+        self.view_transform = view_transform
+        self.look = look
+
+        # Keep track of outputs of the last render that are written in the background.
+        self.output_writer = None
+        self.pending_writes = []
 
     def initialize(self) -> None:
         """Initialize scene using specified parameters by loading scene and configuring
-        the camera.
+        the camera and compositor.
         """
         self.load_scene()
         self.configure_camera()
+        self.configure_compositor()
+
+        # Start background threads writing outputs.
+        if self.writer_threads:
+            self.output_writer = OutputWriter(
+                self.writer_threads, self.writer_queue_size
+            )
 
     def load_scene(self) -> None:
         """Load scene .blend file as main Blender file."""
@@ -86,8 +186,23 @@ class SceneManager:
         bpy.context.scene.render.resolution_x = self.render_resolution[0]
         bpy.context.scene.render.resolution_y = self.render_resolution[1]
 
-    def reset_compositor_nodes(self) -> None:
-        """Configure render settings."""
+        # Configure CPU threads and tile size, which mostly affect CPU render throughput.
+        if self.render_threads:
+            bpy.context.scene.render.threads_mode = "FIXED"
+            bpy.context.scene.render.threads = self.render_threads
+        else:
+            bpy.context.scene.render.threads_mode = "AUTO"
+        bpy.context.scene.cycles.tile_size = self.render_tile_size
+
+        # Configure color management, which is otherwise the Blender default, as the
+        # scene is loaded into an empty Blender file.
+        if self.view_transform:
+            bpy.context.scene.view_settings.view_transform = self.view_transform
+        if self.look:
+            bpy.context.scene.view_settings.look = self.look
+
+    def configure_compositor(self) -> None:
+        """Configure compositor nodes that are kept for all renders."""
         # Enable object pass indexin view layer.
         bpy.context.scene.view_layers[0].use_pass_object_index = True
 
@@ -104,25 +219,104 @@ class SceneManager:
         self.render_layers_node = node
         self.render_layers_node.location = (-300, 0)
 
+        # Add File Output node, unless rendered pixels are read from memory. Save node
+        # as instance attribute to change output path. The image output filename is set
+        # for every render by reset_compositor_nodes.
+        self.links = self.node_tree.links
+        if not self.read_pixels:
+            node: bpy.types.CompositorNodeOutputFile = self.nodes.new(
+                "CompositorNodeOutputFile"
+            )
+            self.file_output_node = node
+            self.file_output_node.format.color_mode = "RGB"
+            self.file_output_node.format.color_depth = "8"
+            self.file_output_node.location = (300, 0)
+
+            # Link nodes.
+            _ = self.links.new(
+                input=self.render_layers_node.outputs["Image"],
+                output=self.file_output_node.inputs[0],
+            )
+
+        # Add Viewer node showing the object index pass, whose pixels can be read after
+        # rendering to extract labels without writing mask images. When reading rendered
+        # pixels from memory, the Viewer node shows the rendered image, with the object
+        # index pass as alpha channel.
+        if self.label_mode == "pass" or self.read_pixels:
+            node: bpy.types.CompositorNodeViewer = self.nodes.new(
+                "CompositorNodeViewer"
+            )
+            self.viewer_node = node
+            self.viewer_node.location = (300, -300)
+            if self.read_pixels:
+                self.viewer_node.use_alpha = True
+                _ = self.links.new(
+                    input=self.render_layers_node.outputs["Image"],
+                    output=self.viewer_node.inputs["Image"],
+                )
+                _ = self.links.new(
+                    input=self.render_layers_node.outputs["IndexOB"],
+                    output=self.viewer_node.inputs["Alpha"],
+                )
+            else:
+                self.viewer_node.use_alpha = False
+                _ = self.links.new(
+                    input=self.render_layers_node.outputs["IndexOB"],
+                    output=self.viewer_node.inputs["Image"],
+                )
+
+        # Check that the view transform can be applied to the rendered image, which
+        # the compositor no longer does when rendered pixels are read from memory.
+        # Layouts are generated without rendering, so no pixels are read.
+        view_settings = bpy.context.scene.view_settings
+        if (
+            self.read_pixels
+            and self.render_images
+            and (
+                view_settings.view_transform not in PIXEL_VIEW_TRANSFORMS
+                or view_settings.look != "None"
+            )
+        ):
+            raise Exception(
+                "Configure scene.view_transform as "
+                f"{' or '.join(PIXEL_VIEW_TRANSFORMS)} and scene.look as None to write "
+                "outputs in background threads or generate online"
+            )
+
+        # Keep track of ID Mask nodes, which are reused between renders instead of
+        # recreating them for every render.
+        self.id_mask_nodes: list[bpy.types.CompositorNodeIDMask] = []
+        self.num_item_outputs = 0
+
+    def reset_compositor_nodes(self, encoding: EncodingProfile) -> None:
+        """Reset compositor nodes for a new render, by removing the mask outputs of the
+            previous render, giving the image output a new random identifier, and
+            applying the encoding profile of the render.
+
+        Args:
+            encoding (EncodingProfile): encoding of rendered image and masks.
+        """
+        # Remove mask outputs, i.e., all outputs except for the image output.
+        while len(self.file_output_node.file_slots) > 1:
+            self.file_output_node.file_slots.remove(self.file_output_node.inputs[-1])
+        self.num_item_outputs = 0
+
+        # Configure image format of the image output, which uses the node format. Mask
+        # outputs have their own format, see add_item_reference_render_output.
+        self.active_encoding = encoding
+        image_format = self.file_output_node.format
+        image_format.file_format = encoding.image_format
+        if encoding.image_format == "PNG":
+            image_format.compression = encoding.image_compression
+        else:
+            image_format.quality = encoding.image_quality
+
         # Generate random indentifier for image
         image_filename = "image__" + secrets.token_hex(6) + "__"
+        self.file_output_node.file_slots[0].path = image_filename
 
-        # Add File Output node. Save node as instance attribute to change output path.
-        node: bpy.types.CompositorNodeOutputFile = self.nodes.new(
-            "CompositorNodeOutputFile"
-        )
-        self.file_output_node = node
-        self.file_output_node.file_slots.remove(node.inputs["Image"])
-        self.file_output_node.file_slots.new(image_filename)
-        self.file_output_node.format.color_mode = "RGB"
-        self.file_output_node.location = (300, 0)
-
-        # Link nodes.
-        self.links = self.node_tree.links
-        _ = self.links.new(
-            input=self.render_layers_node.outputs["Image"],
-            output=self.file_output_node.inputs[image_filename],
-        )
+        # Keep track of output files, which are reported after rendering.
+        self.outputs = {"image": image_filename, "masks": []}
 
     def add_item_reference_render_output(self, item_reference: ItemReference) -> None:
         """Add nodes to get segmentation mask corresponding to an item reference.
@@ -139,48 +333,419 @@ class SceneManager:
             + "__"
         )
 
-        # Add output file for object segmentation mask to File Output node.
+        # Add output file for object segmentation mask to File Output node, written as
+        # 8-bit grayscale PNG image regardless of the image format.
         self.file_output_node.file_slots.new(mask_filename)
+        mask_slot = self.file_output_node.file_slots[-1]
+        mask_slot.use_node_format = False
+        mask_slot.format.file_format = "PNG"
+        mask_slot.format.color_mode = "BW"
+        mask_slot.format.color_depth = "8"
+        mask_slot.format.compression = self.active_encoding.mask_compression
+        self.outputs["masks"].append(
+            {
+                "file": mask_filename,
+                "label": str(item_reference.reference_entry.label),
+                "pass_index": item_reference.pass_index,
+            }
+        )
 
-        # Add ID Mask node.
-        node: bpy.types.CompositorNodeIDMask = self.nodes.new("CompositorNodeIDMask")
-        id_mask_node = node
+        # Reuse ID Mask node of a previous render if available, else add ID Mask node.
+        if self.num_item_outputs < len(self.id_mask_nodes):
+            id_mask_node = self.id_mask_nodes[self.num_item_outputs]
+        else:
+            node: bpy.types.CompositorNodeIDMask = self.nodes.new(
+                "CompositorNodeIDMask"
+            )
+            id_mask_node = node
+            _ = self.links.new(
+                input=self.render_layers_node.outputs["IndexOB"],
+                output=id_mask_node.inputs["ID value"],
+            )
+            self.id_mask_nodes.append(id_mask_node)
         id_mask_node.index = item_reference.pass_index
-        id_mask_node.use_antialiasing = True
+        id_mask_node.use_antialiasing = self.active_encoding.mask_antialiasing
+        self.num_item_outputs += 1
 
         # Link nodes.
-        _ = self.links.new(
-            input=self.render_layers_node.outputs["IndexOB"],
-            output=id_mask_node.inputs["ID value"],
-        )
         _ = self.links.new(
             input=id_mask_node.outputs["Alpha"],
             output=self.file_output_node.inputs[mask_filename],
         )
 
-    def render(
+    def get_viewer_pixels(self) -> np.ndarray:
+        """Get pixels of the last render from the Viewer node.
+
+        Returns:
+            np.ndarray: RGBA float pixels, of shape (height, width, 4) with the first
+                row at the top of the image.
+        """
+        # Blender stores pixels as RGBA floats from the bottom row up.
+        viewer_image = bpy.data.images["Viewer Node"]
+        width, height = viewer_image.size
+        pixels = np.empty(width * height * 4, dtype=np.float32)
+        viewer_image.pixels.foreach_get(pixels)
+
+        return pixels.reshape(height, width, 4)[::-1]
+
+    def get_index_map(self, pixels: np.ndarray = None) -> np.ndarray:
+        """Get object index pass of the last render from the Viewer node.
+
+        Args:
+            pixels (np.ndarray, optional): pixels of the Viewer node, if already read.
+                Defaults to None.
+
+        Returns:
+            np.ndarray: object pass index of every pixel, of shape (height, width) with
+                the first row at the top of the image.
+        """
+        if pixels is None:
+            pixels = self.get_viewer_pixels()
+
+        # The pass index is shown in the alpha channel when rendered pixels are read
+        # from memory, and in all color channels otherwise.
+        channel = 3 if self.read_pixels else 0
+        return np.rint(pixels[..., channel]).astype(np.int32)
+
+    def get_display_image(self, pixels: np.ndarray) -> np.ndarray:
+        """Apply view transform, exposure, and gamma of the scene to rendered pixels,
+            as the compositor does when writing 8-bit images.
+
+        Args:
+            pixels (np.ndarray): linear RGB(A) float pixels, of shape (height, width, 3
+                or 4).
+
+        Returns:
+            np.ndarray: 8-bit RGB image, of shape (height, width, 3).
+        """
+        view_settings = bpy.context.scene.view_settings
+        image = pixels[..., :3] * 2.0**view_settings.exposure
+
+        # The Standard view transform applies the sRGB transfer function, whereas the
+        # Raw view transform keeps linear values.
+        if view_settings.view_transform == "Standard":
+            image = np.where(
+                image <= 0.0031308,
+                image * 12.92,
+                1.055 * np.power(image.clip(0.0031308), 1 / 2.4) - 0.055,
+            )
+        if view_settings.gamma != 1:
+            image = np.power(image.clip(0), 1 / view_settings.gamma)
+
+        return np.rint(image.clip(0, 1) * 255).astype(np.uint8)
+
+    def write_outputs(
+        self,
+        output_folder: pathlib.Path,
+        item_references: list[ItemReference],
+        encoding: EncodingProfile,
+        pixels: np.ndarray,
+        index_map: np.ndarray,
+    ) -> dict:
+        """Queue rendered image and item segmentation masks of the last render to be
+            written by background threads. Masks are extracted from the object index
+            pass and written as 1-bit PNG images. Futures of the queued outputs are kept
+            in pending_writes.
+
+        Args:
+            output_folder (pathlib.Path): folder to store images in.
+            item_references (list[ItemReference]): list of item refereces to generate
+                masks for.
+            encoding (EncodingProfile): encoding of rendered image and masks.
+            pixels (np.ndarray): Viewer pixels of the last render, see
+                get_viewer_pixels.
+            index_map (np.ndarray): object index pass of the last render, see
+                get_index_map.
+
+        Returns:
+            dict: filenames of image and masks within the output folder, and the label
+                and pass index of every mask.
+        """
+        output_folder.mkdir(parents=True, exist_ok=True)
+
+        # Use the same filenames as the File Output node, including the frame number.
+        frame = f"{bpy.context.scene.frame_current:04d}"
+        image_filename = "image__" + secrets.token_hex(6) + "__" + frame + ".png"
+        self.pending_writes.append(
+            self.output_writer.write_png(
+                output_folder / image_filename,
+                self.get_display_image(pixels),
+                encoding.image_compression,
+            )
+        )
+        outputs = {"image": image_filename, "masks": []}
+
+        if self.label_mode != "masks":
+            return outputs
+
+        for item_reference in item_references:
+            label = str(item_reference.reference_entry.label)
+            mask_filename = (
+                "mask__" + label + "__" + secrets.token_hex(6) + "__" + frame + ".png"
+            )
+            self.pending_writes.append(
+                self.output_writer.write_png(
+                    output_folder / mask_filename,
+                    index_map == item_reference.pass_index,
+                    encoding.mask_compression,
+                )
+            )
+            outputs["masks"].append(
+                {
+                    "file": mask_filename,
+                    "label": label,
+                    "pass_index": item_reference.pass_index,
+                }
+            )
+
+        return outputs
+
+    def render_sample(self, item_references: list[ItemReference]) -> dict:
+        """Render current scene into memory, without writing any file. In masks label
+            mode, the sample holds an instance map of object pass indices, and in pass
+            and boxes label modes, it holds the objects of the label sidecar instead.
+            Without rendering images, the sample only holds projected bounding boxes.
+
+        Args:
+            item_references (list[ItemReference]): list of item refereces to generate
+                labels for.
+
+        Returns:
+            dict: sample with "width", "height", "objects", and unless only layouts are
+                generated, an 8-bit RGB "image" array, and in masks label mode, a 16-bit
+                "instance_map" array.
+        """
+        labels = {
+            item_reference.pass_index: str(item_reference.reference_entry.label)
+            for item_reference in item_references
+        }
+
+        # Project bounding boxes of the layout without rendering.
+        if not self.render_images:
+            width, height = self.get_resolution()
+            return {
+                "width": width,
+                "height": height,
+                "objects": self.get_box_labels(item_references, width, height),
+            }
+
+        bpy.ops.render.render()
+        pixels = self.get_viewer_pixels()
+        index_map = self.get_index_map(pixels)
+        height, width = index_map.shape
+        sample = {
+            "width": width,
+            "height": height,
+            "image": self.get_display_image(pixels),
+        }
+
+        if self.label_mode == "masks":
+            sample["instance_map"] = index_map.astype(np.uint16)
+            sample["objects"] = [
+                {"label": label, "pass_index": pass_index}
+                for pass_index, label in labels.items()
+            ]
+        elif self.label_mode == "pass":
+            sample["objects"] = get_pass_labels(index_map, labels)
+        else:
+            sample["objects"] = self.get_box_labels(item_references, width, height)
+
+        return sample
+
+    def close(self) -> None:
+        """Wait for outputs written in the background, and stop writer threads. Raises
+        the first error that occurred while writing."""
+        if self.output_writer is not None:
+            output_writer, self.output_writer = self.output_writer, None
+            output_writer.close()
+
+    def pop_pending_writes(self) -> list:
+        """Get futures of outputs of the last render that are written in the
+        background, and stop keeping track of them.
+
+        Returns:
+            list[Future]: futures that complete once the outputs are written.
+        """
+        pending_writes, self.pending_writes = self.pending_writes, []
+        return pending_writes
+
+    def get_resolution(self) -> tuple[int, int]:
+        """Get resolution of rendered images, taking the resolution percentage of the
+        scene into account.
+
+        Returns:
+            tuple[int, int]: width and height of rendered images in pixels.
+        """
+        render = bpy.context.scene.render
+        return (
+            render.resolution_x * render.resolution_percentage // 100,
+            render.resolution_y * render.resolution_percentage // 100,
+        )
+
+    def get_box_labels(
+        self, item_references: list[ItemReference], width: int, height: int
+    ) -> list[dict]:
+        """Get bounding box of every item in the frame, by projecting item geometry
+            through the active camera. Occlusion by other objects is ignored.
+
+        Args:
+            item_references (list[ItemReference]): list of item references to get
+                bounding boxes for.
+            width (int): width of image in pixels.
+            height (int): height of image in pixels.
+
+        Returns:
+            list[dict]: label, pass index, and bounding box (x, y, width, height) of
+                every item in the frame.
+        """
+        # Evaluate the dependency graph once, which also updates the world matrices of
+        # items placed since the last evaluation.
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        camera = bpy.context.scene.camera.evaluated_get(depsgraph)
+        render = bpy.context.scene.render
+        projection = np.array(
+            camera.calc_matrix_camera(
+                depsgraph,
+                x=width,
+                y=height,
+                scale_x=render.pixel_aspect_x,
+                scale_y=render.pixel_aspect_y,
+            )
+        ) @ np.array(camera.matrix_world.inverted())
+
+        objects = []
+        for item_reference in item_references:
+            bbox = item_reference.get_projected_bbox(
+                depsgraph, projection, width, height
+            )
+            if bbox is not None:
+                objects.append(
+                    {
+                        "label": str(item_reference.reference_entry.label),
+                        "pass_index": item_reference.pass_index,
+                        "bbox": bbox,
+                    }
+                )
+
+        return objects
+
+    def write_labels(
         self,
         output_folder: pathlib.Path,
         item_references: list[ItemReference],
+        index_map: np.ndarray = None,
     ) -> None:
+        """Write label sidecar with bounding box, area, and mask of every visible item,
+            extracted from the object index pass of the last render. In boxes label
+            mode, the sidecar holds only projected bounding boxes.
+
+        Args:
+            output_folder (pathlib.Path): folder to store label sidecar in.
+            item_references (list[ItemReference]): list of item references to extract
+                labels for.
+            index_map (np.ndarray, optional): object index pass of the last render, if
+                already read. Defaults to None, i.e., it is read from the Viewer node.
+        """
+        if self.label_mode == "boxes":
+            width, height = self.get_resolution()
+            objects = self.get_box_labels(item_references, width, height)
+        else:
+            if index_map is None:
+                index_map = self.get_index_map()
+            height, width = index_map.shape
+            objects = get_pass_labels(
+                index_map,
+                {
+                    item_reference.pass_index: str(item_reference.reference_entry.label)
+                    for item_reference in item_references
+                },
+            )
+
+        output_folder.mkdir(parents=True, exist_ok=True)
+        with open(output_folder / LABELS_FILENAME, mode="wt") as file:
+            json.dump({"width": width, "height": height, "objects": objects}, file)
+
+    def render(
+        self,
+        output_folder: pathlib.Path,
+        item_references: list[ItemReference],
+        split: str = None,
+    ) -> dict:
         """Render current scene, outputting rendered image and all item segmentation
-            masks. Rendered image will have filename "image__0001.png". Segmentation masks
-            will have filename "<label ID>__<random item ID>__0001.png".
+            masks. Rendered image will have filename "image__0001.<extension>", with the
+            extension of the image format of the split. Segmentation masks will have
+            filename "<label ID>__<random item ID>__0001.png". In pass and boxes label
+            modes, a label sidecar is written instead of segmentation masks. Without
+            rendering images, only the label sidecar is written.
 
         Args:
             output_folder (pathlib.Path): folder to store images in.
             item_references (list[ItemReference]): list of item refereces to generate
                 masks for.
+            split (str, optional): name of split, which selects the encoding profile.
+                Defaults to None.
+
+        Returns:
+            dict: filenames of image (None without rendering) and masks (or label
+                sidecar) within the output folder, and the label and pass index of every
+                mask.
         """
-        # Reset compositor nodes.
-        self.reset_compositor_nodes()
+        # Write projected bounding boxes of the layout without rendering.
+        if not self.render_images:
+            self.write_labels(output_folder, item_references)
+            return {"image": None, "masks": [], "labels": LABELS_FILENAME}
+
+        # Render and queue outputs to be written in the background, so that the next
+        # image can be rendered while they are encoded.
+        encoding = self.split_encodings.get(split, self.encoding)
+        if self.output_writer is not None:
+            bpy.ops.render.render()
+
+            # Read the Viewer node once, for the image, masks, and labels.
+            pixels = self.get_viewer_pixels()
+            index_map = self.get_index_map(pixels)
+            outputs = self.write_outputs(
+                output_folder, item_references, encoding, pixels, index_map
+            )
+            if self.label_mode in ("pass", "boxes"):
+                self.write_labels(output_folder, item_references, index_map)
+                outputs["labels"] = LABELS_FILENAME
+            return outputs
+
+        # Reset compositor nodes with the encoding profile of the split.
+        self.reset_compositor_nodes(encoding)
 
         # Set output folder.
         self.file_output_node.base_path = str(output_folder)
 
         # Add item references to segmentation mask outputs.
-        for item_reference in item_references:
-            self.add_item_reference_render_output(item_reference)
+        if self.label_mode == "masks":
+            for item_reference in item_references:
+                self.add_item_reference_render_output(item_reference)
 
         # Start render.
         bpy.ops.render.render()
+
+        # The File Output node appends the (zero-padded) frame number and extension.
+        frame = f"{bpy.context.scene.frame_current:04d}"
+        image_filename = (
+            self.outputs["image"] + frame + self.active_encoding.image_suffix
+        )
+
+        # Extract labels from the object index pass, or project bounding boxes, instead
+        # of writing mask images.
+        if self.label_mode in ("pass", "boxes"):
+            self.write_labels(output_folder, item_references)
+            return {
+                "image": image_filename,
+                "masks": [],
+                "labels": LABELS_FILENAME,
+            }
+
+        return {
+            "image": image_filename,
+            "masks": [
+                {**mask, "file": mask["file"] + frame + ".png"}
+                for mask in self.outputs["masks"]
+            ],
+        }
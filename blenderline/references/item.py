@@ -1,5 +1,9 @@
+import math
+
+import bmesh
 import bpy
 import mathutils
+import numpy as np
 
 
 class ItemReference:
@@ -77,6 +81,117 @@ class ItemReference:
         # Check if distance satisfies both minimum margin distances
         return distance > max(current_min_margin_distance, proposed_min_margin_distance)
 
+    def get_hull_vertices(self, depsgraph: bpy.types.Depsgraph) -> np.ndarray:
+        """Get convex hull vertices of the evaluated item mesh in object coordinates.
+            The hull is computed once per item entry, as all items spawned from an entry
+            share their mesh, and the projection of the hull has the same bounding box as
+            the projection of the full mesh.
+
+        Args:
+            depsgraph (bpy.types.Depsgraph): evaluated dependency graph.
+
+        Returns:
+            np.ndarray: hull vertices, of shape (num_vertices, 3).
+        """
+        if self.reference_entry.hull_vertices is not None:
+            return self.reference_entry.hull_vertices
+
+        evaluated_object = self.item_object.evaluated_get(depsgraph)
+        mesh = evaluated_object.to_mesh()
+        vertices = np.empty(len(mesh.vertices) * 3, dtype=np.float64)
+        mesh.vertices.foreach_get("co", vertices)
+        vertices = vertices.reshape(-1, 3)
+
+        # Keep only hull vertices, or all vertices if the mesh is too degenerate to have
+        # a convex hull, e.g., a plane.
+        hull_mesh = bmesh.new()
+        hull_mesh.from_mesh(mesh)
+        try:
+            hull = bmesh.ops.convex_hull(hull_mesh, input=hull_mesh.verts)
+            hull_vertices = [
+                vertex.co[:]
+                for vertex in hull["geom"]
+                if isinstance(vertex, bmesh.types.BMVert)
+            ]
+            if hull_vertices:
+                vertices = np.array(hull_vertices, dtype=np.float64)
+        except RuntimeError:
+            pass
+        hull_mesh.free()
+        evaluated_object.to_mesh_clear()
+
+        self.reference_entry.hull_vertices = vertices
+        return vertices
+
+    def get_projected_bbox(
+        self,
+        depsgraph: bpy.types.Depsgraph,
+        projection: np.ndarray,
+        width: int,
+        height: int,
+    ) -> list[int] | None:
+        """Get bounding box of item in the image by projecting its convex hull through
+            the camera, clipped to the frame. Occlusion by other objects is ignored.
+
+        Args:
+            depsgraph (bpy.types.Depsgraph): evaluated dependency graph.
+            projection (np.ndarray): camera projection matrix times inverse camera world
+                matrix, mapping world coordinates to clip coordinates.
+            width (int): width of image in pixels.
+            height (int): height of image in pixels.
+
+        Returns:
+            list[int] | None: bounding box in pixels as (xmin, ymin, width, height), or
+                None if the item is not in the frame.
+        """
+        vertices = self.get_hull_vertices(depsgraph)
+        world_matrix = np.array(self.item_object.evaluated_get(depsgraph).matrix_world)
+
+        # Transform vertices to clip coordinates.
+        clip = np.c_[vertices, np.ones(len(vertices))] @ (projection @ world_matrix).T
+
+        # Clip the hull against the near plane (z = -w in clip coordinates), before the
+        # perspective divide. The clipped hull is spanned by the vertices in front of the
+        # plane and the points where hull edges cross it. Hull edges are not known, but
+        # every segment between a vertex in front and a vertex behind lies in the hull,
+        # and includes all crossing edges, so crossings of all such segments are used.
+        distance = clip[:, 2] + clip[:, 3]
+        front, behind = clip[distance >= 0], clip[distance < 0]
+        if not len(front):
+            return None
+        if len(behind):
+            front_distance = distance[distance >= 0][:, None, None]
+            behind_distance = distance[distance < 0][None, :, None]
+            fraction = front_distance / (front_distance - behind_distance)
+            crossings = front[:, None] + fraction * (behind[None, :] - front[:, None])
+            clip = np.r_[front, crossings.reshape(-1, 4)]
+
+        # Map clip coordinates to pixel coordinates with the origin at the top left.
+        x = (clip[:, 0] / clip[:, 3] + 1) / 2 * width
+        y = (1 - clip[:, 1] / clip[:, 3]) / 2 * height
+
+        # Round outwards to whole pixels and clip to the frame.
+        xmin, xmax = max(0, math.floor(x.min())), min(width, math.ceil(x.max()))
+        ymin, ymax = max(0, math.floor(y.min())), min(height, math.ceil(y.max()))
+        if xmin >= xmax or ymin >= ymax:
+            return None
+
+        return [xmin, ymin, xmax - xmin, ymax - ymin]
+
     def delete(self) -> None:
-        """Remove item object scene."""
+        """Remove item object from scene, together with its mesh and materials if they
+        are not used by any other object.
+        """
+        # Get mesh and materials before removing object, as every spawned item brings
+        # its own copy, which would otherwise be orphaned.
+        mesh = self.item_object.data
+        materials = [slot.material for slot in self.item_object.material_slots]
+
         bpy.data.objects.remove(self.item_object, do_unlink=True)
+
+        if isinstance(mesh, bpy.types.Mesh) and mesh.users == 0:
+            materials += list(mesh.materials)
+            bpy.data.meshes.remove(mesh)
+        for material in set(materials):
+            if material is not None and material.users == 0:
+                bpy.data.materials.remove(material)
@@ -1,4 +1,5 @@
 import argparse
+import json
 import pathlib
 import sys
 
@@ -6,7 +7,9 @@ import sys
 blenderline_dir = pathlib.Path(__file__).parent.parent.parent.parent
 sys.path.append(str(blenderline_dir))
 
+from blenderline.generators.image import Instance  # noqa: E402
 from blenderline.settings import ImageDatasetSettings  # noqa: E402
+from blenderline.utils import SampleRing  # noqa: E402
 
 
 def main() -> None:
@@ -20,9 +23,64 @@ def main() -> None:
     )
     parser.add_argument(
         "--target",
-        required=True,
+        required=False,
+        metavar="<filepath>",
+        help="Absolute location of the directory where the dataset is generated.\n"
+        "Required unless generating online.",
+    )
+    parser.add_argument(
+        "--overlay",
+        action="append",
+        default=[],
+        metavar="<filepath>",
+        help="Absolute location of a configuration overlay. May be given multiple times.",
+    )
+    parser.add_argument(
+        "--worker-index",
+        default=0,
+        type=int,
+        metavar="<int>",
+        help="Index of this worker when generation is distributed over workers.",
+    )
+    parser.add_argument(
+        "--worker-count",
+        default=1,
+        type=int,
+        metavar="<int>",
+        help="Total number of workers generation is distributed over.",
+    )
+    parser.add_argument(
+        "--progress",
+        required=False,
         metavar="<filepath>",
-        help="Absolute location of the directory where the dataset is generated.",
+        help="Absolute location of the file to report progress to.",
+    )
+    parser.add_argument(
+        "--tasks",
+        required=False,
+        metavar="<filepath>",
+        help="Absolute location of a JSON file listing the instances to generate.",
+    )
+    parser.add_argument(
+        "--max-images",
+        required=False,
+        type=int,
+        metavar="<int>",
+        help="Number of images after which to exit, so that the worker can be recycled.",
+    )
+    parser.add_argument(
+        "--max-rss",
+        required=False,
+        type=float,
+        metavar="<float>",
+        help="Memory usage (in MB) after which to exit, so that the worker can be recycled.",
+    )
+    parser.add_argument(
+        "--online",
+        required=False,
+        metavar="<name>",
+        help="Name of the shared-memory sample ring to generate samples into, instead\n"
+        "of generating a dataset.",
     )
 
     # Parse arguments after "--".
@@ -30,17 +88,60 @@ def main() -> None:
         args = parser.parse_args([])
     else:
         args = parser.parse_args(sys.argv[sys.argv.index("--") + 1 :])
+    if not args.target and not args.online:
+        parser.error("the following arguments are required: --target")
+
+    # Generate samples into the sample ring of the reading process, if given. The ring
+    # is attached first, so that it is marked as failed if any step fails, and always
+    # closed once this process stops writing.
+    if args.online:
+        sample_ring = SampleRing.attach(args.online)
+        try:
+            image_dataset_settings = ImageDatasetSettings(
+                config=pathlib.Path(args.config),
+                target=pathlib.Path("."),
+                overlays=[pathlib.Path(overlay) for overlay in args.overlay],
+            )
+            image_dataset_generator = image_dataset_settings.get_dataset_generator(
+                online=True
+            )
+            image_dataset_generator.initialize()
+            image_dataset_generator.generate_online(sample_ring)
+            image_dataset_generator.close()
+        except BaseException:
+            sample_ring.fail()
+            raise
+        finally:
+            sample_ring.close()
+            sample_ring.release()
+        return
 
     # Get settings object.
     image_dataset_settings = ImageDatasetSettings(
         config=pathlib.Path(args.config),
         target=pathlib.Path(args.target),
+        overlays=[pathlib.Path(overlay) for overlay in args.overlay],
     )
 
+    # Load explicit list of instances to generate, if given.
+    instances = None
+    if args.tasks:
+        with open(args.tasks, mode="rt") as file:
+            instances = [
+                Instance(task["split"], task["index"]) for task in json.load(file)
+            ]
+
     # Generate dataset.
     image_dataset_generator = image_dataset_settings.get_dataset_generator()
     image_dataset_generator.initialize()
-    image_dataset_generator.generate_dataset()
+    image_dataset_generator.generate_dataset(
+        worker_index=args.worker_index,
+        worker_count=args.worker_count,
+        progress_path=pathlib.Path(args.progress) if args.progress else None,
+        instances=instances,
+        max_images=args.max_images,
+        max_rss=args.max_rss,
+    )
 
 
 if __name__ == "__main__":
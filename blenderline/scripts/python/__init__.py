@@ -1,3 +1,7 @@
 from .convert import run_convert
 from .download import run_download
 from .generate import run_generate
+from .online import OnlineDataset, run_online
+from .stats import run_stats
+from .tune import run_tune
+from .verify import run_verify
@@ -1,44 +1,160 @@
 import os
 import pathlib
+import shutil
 
 from blenderline.scripts.python.converters import (
-    run_convert_yolo_detection,
-    run_convert_yolo_segmentation,
+    STATE_FILENAME,
+    CocoConverter,
+    ConversionState,
+    InstanceMapConverter,
+    StatisticsConverter,
+    WebDatasetConverter,
+    YoloDetectionConverter,
+    YoloSegmentationConverter,
+    run_conversion,
 )
+from blenderline.utils import read_instance_list
 
 CONVERTERS = {
-    "yolo_detection": run_convert_yolo_detection,
-    "yolo_segmentation": run_convert_yolo_segmentation,
+    "coco": CocoConverter,
+    "instance_maps": InstanceMapConverter,
+    "webdataset": WebDatasetConverter,
+    "yolo_detection": YoloDetectionConverter,
+    "yolo_segmentation": YoloSegmentationConverter,
 }
 
 
 def run_convert(
-    format: str,
+    format: str | list[str],
     source: str,
     target: str,
     minarea: float = 0.005,
     remove: bool = False,
-    **kwargs
+    jobs: int = 1,
+    image_mode: str = "auto",
+    incremental: bool = False,
+    follow: bool = False,
+    stats: bool = False,
+    skip: str = None,
+    follow_timeout: float = None,
+    **kwargs,
 ) -> None:
     # Get absolute path to source folder and check that it is valid, i.e., exists and
-    # contains a label_mapping.json file.
+    # contains a label_mapping.json file. When following a dataset being generated, the
+    # label mapping is only written once generation completes.
     source_path = pathlib.Path(os.path.abspath(source))
-    if not source_path.is_dir() or "label_mapping.json" not in os.listdir(source_path):
+    if not follow and (
+        not source_path.is_dir() or "label_mapping.json" not in os.listdir(source_path)
+    ):
         raise Exception(
             "Please specify a valid source directory in BlenderLine format."
         )
 
+    # Instances are converted incrementally when following a dataset being generated,
+    # so that regenerated and removed instances are replaced, and an interrupted
+    # conversion can be resumed.
+    incremental = incremental or follow
+
     # Get absolute path to target folder and check that it is valid, i.e., does not exist
     # or is empty. Also check if the target directory is not equal to the source directory
     # This is probably not needed however, as the source directory is likely not empty.
+    # When converting incrementally, the target may also contain an earlier incremental
+    # conversion, recognized by its conversion state file.
     target_path = pathlib.Path(os.path.abspath(target))
     if target_path == source_path:
         raise Exception("Please choose a different target directory than the source.")
-    if target_path.exists() and any(target_path.iterdir()):
+    if (
+        target_path.exists()
+        and any(target_path.iterdir())
+        and not (incremental and (target_path / STATE_FILENAME).is_file())
+    ):
         raise Exception("Please make sure that the target directory is empty.")
 
+    # Moved images are missing from the source dataset in later conversions.
+    if incremental and image_mode == "move":
+        raise Exception(
+            "Please choose an image mode other than move to convert incrementally."
+        )
+
+    # Symbolic links to images would dangle once the source dataset is removed.
+    if remove and image_mode == "symlink":
+        raise Exception(
+            "Please choose an image mode other than symlink to remove source."
+        )
+
     target_path.mkdir(parents=True, exist_ok=True)
 
-    # Run converter corresponding to specified target format.
-    converter = CONVERTERS[format]
-    converter(source_path, target_path, minarea, remove, **kwargs)
+    # Create converters corresponding to specified target formats. A single format is
+    # converted directly to the target folder, whereas several formats are converted to
+    # subfolders named after the formats.
+    formats = [format] if isinstance(format, str) else list(dict.fromkeys(format))
+    converters = [
+        CONVERTERS[name](
+            target_path / name if len(formats) > 1 else target_path,
+            minarea=minarea,
+            **kwargs,
+        )
+        for name in formats
+    ]
+
+    # Compute dataset statistics from the masks decoded for conversion, and write them
+    # to statistics.json in the target. Statistics only cover converted instances, so
+    # they cannot be computed incrementally.
+    if stats:
+        if incremental:
+            raise Exception(
+                "Please convert without statistics to convert incrementally, and run "
+                "`blenderline stats` instead."
+            )
+        converters.append(StatisticsConverter(target_path, minarea=minarea))
+
+    # Check that all formats support replacing and removing outputs of instances.
+    for name, converter in zip(formats, converters):
+        if incremental and not converter.incremental:
+            raise Exception(
+                f"Please choose formats that can be converted incrementally, {name} "
+                "cannot."
+            )
+
+    # Load conversion state of an earlier incremental conversion. Changing any parameter
+    # that affects the converted dataset causes all instances to be converted again.
+    state = None
+    if incremental:
+        state = ConversionState(
+            target_path, {"formats": formats, "minarea": minarea, **kwargs}
+        )
+
+    # Get instances to skip, e.g., invalid instances found by `blenderline verify`.
+    skip_keys = None
+    if skip:
+        skip_path = pathlib.Path(os.path.abspath(skip))
+        if not skip_path.is_file():
+            raise Exception("Please specify a valid list of instances to skip.")
+        skip_keys = {
+            f"{split}/{index}" for split, index in read_instance_list(skip_path)
+        }
+
+    # Convert all formats in a single pass over the dataset.
+    if follow:
+        print(
+            f"Converting instances of {source_path} as they are generated, until "
+            "generation completes."
+        )
+    run_conversion(
+        source_path,
+        converters,
+        jobs=jobs,
+        image_mode=image_mode,
+        state=state,
+        follow=follow,
+        skip=skip_keys,
+        follow_timeout=follow_timeout,
+    )
+
+    # Remove source dataset if desired.
+    if remove:
+        choice = input(f"Are you sure you want to remove source {source_path}? [y/N]: ")
+        if choice == "y":
+            shutil.rmtree(source_path)
+        else:
+            print("Source removal aborted.")
@@ -1,2 +1,10 @@
-from .yolo_detection import run_convert_yolo_detection
-from .yolo_segmentation import run_convert_yolo_segmentation
+from .base import BaseConverter
+from .coco import CocoConverter
+from .engine import run_conversion
+from .instance_maps import InstanceMapConverter, InstanceMapReader
+from .label_cache import LabelCache
+from .state import STATE_FILENAME, ConversionState
+from .stats import DatasetStatistics, StatisticsConverter, get_label_objects
+from .webdataset import WebDatasetConverter
+from .yolo_detection import YoloDetectionConverter
+from .yolo_segmentation import YoloSegmentationConverter
@@ -0,0 +1,99 @@
+import pathlib
+from typing import Any
+
+from .images import ImagePlacer
+from .utils import BlenderLineInstance, DecodedMask
+
+
+class BaseConverter:
+    """Base class for converters from BlenderLine datasets to other formats. Several
+    converters can run on the same dataset at once, in which case every mask is decoded
+    once and shared by all converters.
+
+    Conversion proceeds as follows, where only convert_instance runs in the conversion
+    worker processes, and must therefore not depend on state changed by other methods:
+    - begin: once, before converting any instance.
+    - begin_split: once per split, before converting its instances.
+    - convert_instance: once per instance, in any order.
+    - write_instance: once per instance with the result of convert_instance.
+    - finish: once, after all instances are written, with the label mapping.
+    """
+
+    # Whether outputs of single instances can be replaced and removed, which incremental
+    # conversion requires.
+    incremental = True
+
+    def __init__(
+        self, target_path: pathlib.Path, minarea: float = 0.005, **kwargs
+    ) -> None:
+        """Create converter. Keyword arguments of other converters are ignored, so that
+            all converters can be created with the same arguments.
+
+        Args:
+            target_path (pathlib.Path): absolute location of converted dataset.
+            minarea (float, optional): minimum area an object mask must have to be
+                included. Defaults to 0.005.
+        """
+        # Save object attributes.
+        self.target_path = target_path
+        self.minarea = minarea
+
+    def begin(self, source_path: pathlib.Path) -> None:
+        """Prepare converted dataset, which may already contain earlier conversions
+            when converting incrementally.
+
+        Args:
+            source_path (pathlib.Path): absolute location of dataset to convert.
+        """
+
+    def begin_split(self, split: str) -> None:
+        """Prepare split of converted dataset.
+
+        Args:
+            split (str): name of split.
+        """
+
+    def convert_instance(
+        self, instance: BlenderLineInstance, decoded_masks: list[DecodedMask | None]
+    ) -> Any:
+        """Convert instance, run in a conversion worker process.
+
+        Args:
+            instance (BlenderLineInstance): reference to instance with image and masks.
+            decoded_masks (list[DecodedMask | None]): decoded instance masks, or None for
+                empty masks.
+
+        Returns:
+            Any: picklable result passed to write_instance.
+        """
+        raise NotImplementedError
+
+    def write_instance(
+        self,
+        split: str,
+        instance: BlenderLineInstance,
+        result: Any,
+        image_placer: ImagePlacer,
+    ) -> list[pathlib.Path]:
+        """Write converted instance. Existing output files are overwritten.
+
+        Args:
+            split (str): name of split.
+            instance (BlenderLineInstance): reference to instance with image and masks.
+            result (Any): result of convert_instance.
+            image_placer (ImagePlacer): image placer to place generated image with.
+
+        Returns:
+            list[pathlib.Path]: absolute locations of written output files, which are
+                removed when the instance is deleted from an incrementally converted
+                dataset.
+        """
+        raise NotImplementedError
+
+    def finish(self, label_mapping: dict[str, str]) -> None:
+        """Finalize converted dataset. The label mapping is passed here, as it is only
+            written once generation completes when following a dataset being generated.
+
+        Args:
+            label_mapping (dict[str, str]): mapping between label IDs and names.
+        """
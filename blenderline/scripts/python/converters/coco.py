@@ -0,0 +1,229 @@
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+from typing import Any
+
+import cv2
+import numpy as np
+
+from .base import BaseConverter
+from .images import ImagePlacer
+from .utils import BlenderLineInstance, DecodedMask, get_image_size
+
+
+def encode_rle(decoded_mask: DecodedMask) -> dict[str, Any]:
+    """Encode decoded mask as compressed COCO run-length encoding (RLE), identical to
+        the encoding of pycocotools. Runs are found in the binarized crop only, as all
+        pixels outside of the crop are zero.
+
+    Args:
+        decoded_mask (DecodedMask): decoded mask with binarized crop.
+
+    Returns:
+        dict[str, Any]: COCO RLE with mask size (height, width) and compressed counts.
+    """
+    width, height = decoded_mask.width, decoded_mask.height
+
+    # COCO runs alternate between background and foreground pixels in column-major
+    # order, starting with background. Run boundaries are found per crop column, which
+    # is padded with a background pixel on both ends so that runs start and end within
+    # the column, and are converted to positions in the full mask.
+    columns = np.pad(decoded_mask.binary.T, ((0, 0), (1, 1)))
+    column, row = np.nonzero(np.diff(columns, axis=1))
+    positions = (decoded_mask.xoffset + column) * height + decoded_mask.yoffset + row
+
+    # A run ending at the bottom of a column continues at the top of the next column if
+    # the crop spans the full mask height, in which case both boundaries are dropped.
+    unique = np.ones(len(positions), dtype=bool)
+    unique[1:] &= positions[1:] != positions[:-1]
+    unique[:-1] &= positions[:-1] != positions[1:]
+    positions = positions[unique]
+    counts = np.diff(positions, prepend=0, append=width * height).tolist()
+
+    # No trailing background run is stored if the last pixel belongs to the object.
+    if len(counts) > 1 and counts[-1] == 0:
+        counts.pop()
+
+    # Compress counts as in pycocotools: counts after the second are stored relative to
+    # the count two runs before, as 5-bit groups with a continuation bit, offset to
+    # printable ASCII characters.
+    characters = []
+    for index, count in enumerate(counts):
+        value = count - counts[index - 2] if index > 2 else count
+        more = True
+        while more:
+            character = value & 0x1F
+            value >>= 5
+            more = value != -1 if character & 0x10 else value != 0
+            if more:
+                character |= 0x20
+            characters.append(chr(character + 48))
+
+    return {"size": [height, width], "counts": "".join(characters)}
+
+
+def get_coco_annotation(
+    decoded_mask: DecodedMask, minarea: float = 0.005
+) -> dict[str, Any] | None:
+    """Get COCO instance segmentation annotation from BlenderLine generated pixel mask.
+
+    Args:
+        decoded_mask (DecodedMask): decoded mask with label ID and binarized crop.
+        minarea (float): minimum area an object mask must have to be included.
+
+    Returns:
+        dict[str, Any] | None: COCO annotation without image and annotation IDs, or None
+            if minarea is not exceeded.
+    """
+    mask_width, mask_height = decoded_mask.width, decoded_mask.height
+
+    # Return None if mask is too small (< area_threshold).
+    area = cv2.countNonZero(decoded_mask.binary)
+    if area / (mask_width * mask_height) < minarea:
+        return None
+
+    # Compute bounding box in pixels, as (xmin, ymin, width, height).
+    x, y, w, h = cv2.boundingRect(decoded_mask.binary)
+
+    return {
+        "category_id": int(decoded_mask.mask.label),
+        "segmentation": encode_rle(decoded_mask),
+        "area": area,
+        "bbox": [decoded_mask.xoffset + x, decoded_mask.yoffset + y, w, h],
+        "iscrowd": 0,
+    }
+
+
+class CocoConverter(BaseConverter):
+    """Converter to COCO instance segmentation dataset format, with an image folder and
+    an annotation file per split. Annotations of every instance are written to a
+    separate fragment file while converting, which are streamed into the annotation
+    files once conversion finishes, so that memory use does not grow with the dataset
+    size and incremental conversions only convert changed instances.
+    """
+
+    def __init__(
+        self, target_path: pathlib.Path, minarea: float = 0.005, **kwargs
+    ) -> None:
+        """Create COCO converter.
+
+        Args:
+            target_path (pathlib.Path): absolute location of converted dataset.
+            minarea (float, optional): minimum area an object mask must have to be
+                included. Defaults to 0.005.
+        """
+        super().__init__(target_path, minarea)
+
+        # Image and annotation subfolders.
+        self.images_path = target_path / "images"
+        self.annotations_path = target_path / "annotations"
+        self.splits: list[str] = []
+
+    def begin(self, source_path: pathlib.Path) -> None:
+        # Create image and annotation subfolders, unless converting incrementally to an
+        # earlier conversion.
+        self.images_path.mkdir(parents=True, exist_ok=True)
+        self.annotations_path.mkdir(parents=True, exist_ok=True)
+
+    def begin_split(self, split: str) -> None:
+        # Create split folder within image directory, and folder for annotation
+        # fragments of split within annotation directory.
+        (self.images_path / split).mkdir(exist_ok=True)
+        (self.annotations_path / split).mkdir(exist_ok=True)
+        self.splits.append(split)
+
+    def convert_instance(
+        self, instance: BlenderLineInstance, decoded_masks: list[DecodedMask | None]
+    ) -> dict[str, Any]:
+        # Convert decoded masks to annotations, skipping empty masks. Image dimensions
+        # are read from the image header, as an instance may not contain any object.
+        width, height = get_image_size(instance.image.path)
+        return {
+            "file_name": f"{instance.image.id}{instance.image.path.suffix}",
+            "width": width,
+            "height": height,
+            "annotations": [
+                annotation
+                for decoded_mask in decoded_masks
+                if decoded_mask
+                and (annotation := get_coco_annotation(decoded_mask, self.minarea))
+            ],
+        }
+
+    def write_instance(
+        self,
+        split: str,
+        instance: BlenderLineInstance,
+        result: dict[str, Any],
+        image_placer: ImagePlacer,
+    ) -> list[pathlib.Path]:
+        # Place generated image in target dataset location, and write annotation
+        # fragment corresponding to image ID.
+        image = instance.image
+        image_path = self.images_path / split / f"{image.id}{image.path.suffix}"
+        fragment_path = self.annotations_path / split / f"{image.id}.json"
+        image_placer.place(image.path, image_path)
+        with open(fragment_path, "w+") as file:
+            json.dump(result, file)
+
+        return [image_path, fragment_path]
+
+    def finish(self, label_mapping: dict[str, str]) -> None:
+        categories = [
+            {"id": int(label), "name": name} for label, name in label_mapping.items()
+        ]
+        for split in self.splits:
+            self.write_annotations(split, categories)
+
+    def write_annotations(self, split: str, categories: list[dict[str, Any]]) -> None:
+        """Stream annotation fragments of split into COCO annotation file. Fragments are
+            read in order of image ID, and images and annotations are numbered
+            sequentially, so that the annotation file does not depend on the order in
+            which instances were converted.
+
+        Args:
+            split (str): name of split.
+            categories (list[dict[str, Any]]): COCO categories.
+        """
+        fragments_path = self.annotations_path / split
+        annotation_file_path = self.annotations_path / f"instances_{split}.json"
+
+        # Write images to the annotation file directly, and annotations to a temporary
+        # file that is appended once all images are written.
+        with open(annotation_file_path, "w+") as file, tempfile.TemporaryFile(
+            "w+", dir=self.annotations_path
+        ) as annotations_file:
+            file.write(f'{{"categories": {json.dumps(categories)}, "images": [')
+
+            annotation_id = 0
+            for image_id, filename in enumerate(sorted(os.listdir(fragments_path)), 1):
+                with open(fragments_path / filename, "r") as fragment_file:
+                    fragment = json.load(fragment_file)
+
+                image = {
+                    "id": image_id,
+                    "file_name": fragment.get(
+                        "file_name", f"{pathlib.Path(filename).stem}.png"
+                    ),
+                    "width": fragment["width"],
+                    "height": fragment["height"],
+                }
+                file.write(("," if image_id > 1 else "") + json.dumps(image))
+
+                for annotation in fragment["annotations"]:
+                    annotation_id += 1
+                    annotation = {
+                        "id": annotation_id,
+                        "image_id": image_id,
+                        **annotation,
+                    }
+                    annotations_file.write(
+                        ("," if annotation_id > 1 else "") + json.dumps(annotation)
+                    )
+
+            file.write('], "annotations": [')
+            annotations_file.seek(0)
+            shutil.copyfileobj(annotations_file, file)
+            file.write("]}")
@@ -0,0 +1,467 @@
+import collections
+import multiprocessing
+import multiprocessing.pool
+import os
+import pathlib
+import time
+from typing import Any
+
+import cv2
+
+from blenderline.scripts.python.generate import WORK_DIR_NAME, read_status
+
+from .base import BaseConverter
+from .follow import ManifestFollower
+from .images import ImagePlacer
+from .state import ConversionState, get_instance_signature
+from .utils import (
+    BlenderLineInstance,
+    decode_labels,
+    decode_mask,
+    get_blenderline_instances,
+    get_label_mapping,
+    get_manifest_instance,
+)
+
+# Number of instances handed to a worker process at once, which amortizes inter-process
+# communication over several instances without starving workers at the end of a run.
+CHUNK_SIZE = 16
+
+# Number of chunks per worker process that are converted ahead of the instance being
+# written, which bounds the memory held by converted instances waiting to be written
+# while keeping every worker process busy.
+CHUNKS_AHEAD = 2
+
+# Number of written instances after which the conversion state of an incremental
+# conversion is saved, so that an interrupted conversion can resume.
+STATE_SAVE_INTERVAL = 1000
+
+# Number of seconds between polls of the manifests of a dataset being generated.
+FOLLOW_INTERVAL = 2.0
+
+
+def initialize_worker() -> None:
+    """Initialize conversion worker process. OpenCV parallelizes some operations
+    internally, which oversubscribes the CPU when several worker processes are used.
+    """
+    cv2.setNumThreads(1)
+
+
+def get_job_count(jobs: int) -> int:
+    """Get number of conversion processes to use.
+
+    Args:
+        jobs (int): requested number of processes, where 0 means one per CPU core.
+
+    Returns:
+        int: number of processes.
+    """
+    if jobs <= 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def convert_instance(
+    instance: BlenderLineInstance, converters: list[BaseConverter]
+) -> list[Any]:
+    """Convert instance with all converters, decoding every mask once. Masks of
+        instances generated with a label sidecar are decoded from the sidecar.
+
+    Args:
+        instance (BlenderLineInstance): reference to instance with image and masks.
+        converters (list[BaseConverter]): converters to convert instance with.
+
+    Returns:
+        list[Any]: result of every converter.
+    """
+    if instance.labels:
+        decoded_masks = decode_labels(instance.labels)
+    else:
+        decoded_masks = [decode_mask(mask) for mask in instance.masks]
+    return [
+        converter.convert_instance(instance, decoded_masks) for converter in converters
+    ]
+
+
+class InstanceConversion:
+    """Picklable conversion function with the converters to convert chunks of instances
+    with."""
+
+    def __init__(self, converters: list[BaseConverter]) -> None:
+        self.converters = converters
+
+    def __call__(self, instances: list[BlenderLineInstance]) -> list[list[Any]]:
+        return [convert_instance(instance, self.converters) for instance in instances]
+
+
+class Conversion:
+    """Conversion of instances of a dataset with one or more converters, in batches
+    that are spread over a pool of worker processes. Instances are written by the
+    calling process in task order, each as soon as it and all earlier instances are
+    converted, so that outputs do not depend on the number of processes. At most
+    CHUNKS_AHEAD chunks per worker process are converted ahead of writing.
+    """
+
+    def __init__(
+        self,
+        converters: list[BaseConverter],
+        jobs: int,
+        image_mode: str,
+        state: ConversionState | None,
+    ) -> None:
+        """Create conversion.
+
+        Args:
+            converters (list[BaseConverter]): converters to convert instances with.
+            jobs (int): number of worker processes, where 1 converts in the calling
+                process.
+            image_mode (str): way of placing generated images in converted datasets,
+                one of IMAGE_MODES.
+            state (ConversionState | None): conversion state of the converted dataset
+                if converting incrementally.
+        """
+        # Save object attributes.
+        self.converters = converters
+        self.jobs = jobs
+        self.state = state
+        self.image_placer = ImagePlacer(image_mode)
+
+        # Keep track of splits and instances seen, and of instance signatures.
+        self.splits: set[str] = set()
+        self.signatures: dict[str, list[Any]] = {}
+        self.num_written = 0
+        self.num_skipped = 0
+        self.num_removed = 0
+
+        # Start worker processes once, so that they are reused between batches.
+        self.pool = None
+        if jobs > 1:
+            self.pool = multiprocessing.Pool(jobs, initializer=initialize_worker)
+
+    def begin_split(self, split: str) -> None:
+        """Prepare split in all converters, the first time the split is seen.
+
+        Args:
+            split (str): name of split.
+        """
+        if split not in self.splits:
+            self.splits.add(split)
+            for converter in self.converters:
+                converter.begin_split(split)
+
+    def remove_instance(self, key: str) -> None:
+        """Remove outputs of instance that no longer exists, if it was converted.
+
+        Args:
+            key (str): key of instance, i.e., "<split>/<instance folder name>".
+        """
+        self.signatures.pop(key, None)
+        if self.state and key in self.state.instances:
+            self.state.remove(key)
+            self.num_removed += 1
+
+    def remove_deleted_instances(self) -> None:
+        """Remove outputs of all converted instances that were not seen."""
+        if self.state:
+            for key in [
+                key for key in self.state.instances if key not in self.signatures
+            ]:
+                self.remove_instance(key)
+
+    def convert(self, tasks: list[tuple[str, BlenderLineInstance]]) -> None:
+        """Convert and write batch of instances. When converting incrementally,
+            instances that are unchanged since the last conversion are skipped.
+
+        Args:
+            tasks (list[tuple[str, BlenderLineInstance]]): split names and references
+                to instances to convert.
+        """
+        # Record signatures of all instances, so that deleted instances can be found.
+        changed_tasks = []
+        for split, instance in tasks:
+            self.begin_split(split)
+            key = f"{split}/{instance.path.name}"
+            self.signatures[key] = (
+                get_instance_signature(instance) if self.state else []
+            )
+            if self.state and self.state.is_current(key, self.signatures[key]):
+                self.num_skipped += 1
+            else:
+                changed_tasks.append((split, instance))
+
+        # Convert in the calling process if a single job is requested, which avoids the
+        # overhead of starting processes for small datasets.
+        if self.pool is None:
+            for split, instance in changed_tasks:
+                self.write_instance(
+                    split, instance, convert_instance(instance, self.converters)
+                )
+            return
+
+        # Small batches are split evenly over the worker processes.
+        chunk_size = max(1, min(CHUNK_SIZE, len(changed_tasks) // self.jobs))
+        chunks = [
+            changed_tasks[i : i + chunk_size]
+            for i in range(0, len(changed_tasks), chunk_size)
+        ]
+
+        # Results are written in task order, so that converters appending to shared
+        # files, e.g., tar shards, write the same bytes for any number of processes.
+        # Chunks are only submitted while few enough are pending, so that converted
+        # instances do not pile up in memory if writing is slower than converting.
+        conversion = InstanceConversion(self.converters)
+        pending: collections.deque = collections.deque()
+        for chunk in chunks:
+            if len(pending) >= CHUNKS_AHEAD * self.jobs:
+                self.write_chunk(*pending.popleft())
+            pending.append(
+                (
+                    chunk,
+                    self.pool.apply_async(
+                        conversion, ([instance for _, instance in chunk],)
+                    ),
+                )
+            )
+        while pending:
+            self.write_chunk(*pending.popleft())
+
+    def write_chunk(
+        self,
+        chunk: list[tuple[str, BlenderLineInstance]],
+        async_result: multiprocessing.pool.AsyncResult,
+    ) -> None:
+        """Wait for chunk of instances to be converted, and write its instances.
+
+        Args:
+            chunk (list[tuple[str, BlenderLineInstance]]): split names and references to
+                converted instances.
+            async_result (multiprocessing.pool.AsyncResult): pending results of every
+                converter for every instance.
+        """
+        for (split, instance), results in zip(chunk, async_result.get()):
+            self.write_instance(split, instance, results)
+
+    def write_instance(
+        self, split: str, instance: BlenderLineInstance, results: list[Any]
+    ) -> None:
+        """Write results of all converters for an instance, sharing placed images.
+
+        Args:
+            split (str): name of split.
+            instance (BlenderLineInstance): reference to instance with image and masks.
+            results (list[Any]): result of every converter.
+        """
+        key = f"{split}/{instance.path.name}"
+
+        # Remove outputs of earlier conversion of changed instance, whose image ID may
+        # differ from the current one.
+        if self.state:
+            self.state.remove(key)
+
+        outputs = []
+        for converter, result in zip(self.converters, results):
+            outputs += converter.write_instance(
+                split, instance, result, self.image_placer
+            )
+        self.image_placer.clear()
+        self.num_written += 1
+
+        # Record written instance, and save conversion state periodically.
+        if self.state:
+            self.state.update(key, self.signatures[key], outputs)
+            if self.num_written % STATE_SAVE_INTERVAL == 0:
+                self.state.save()
+
+    def close(self) -> None:
+        """Stop worker processes and save conversion state."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+        if self.state:
+            self.state.save()
+
+
+def get_excluded_instances(skip: set[str], split: str) -> set[str]:
+    """Get names of instance folders of a split to skip.
+
+    Args:
+        skip (set[str]): keys of instances to skip, i.e., "<split>/<instance folder
+            name>".
+        split (str): name of split.
+
+    Returns:
+        set[str]: names of instance folders of split to skip.
+    """
+    return {key[len(split) + 1 :] for key in skip if key.startswith(f"{split}/")}
+
+
+def follow_generation(
+    source_path: pathlib.Path,
+    conversion: Conversion,
+    skip: set[str],
+    timeout: float = None,
+) -> None:
+    """Convert instances of a dataset while it is being generated, as soon as they are
+        listed in the manifest of their split, until generation completes. Raises once
+        all listed instances are converted if generation fails.
+
+    Args:
+        source_path (pathlib.Path): absolute location of dataset being generated.
+        conversion (Conversion): conversion to convert instances with.
+        skip (set[str]): keys of instances to skip, i.e., "<split>/<instance folder
+            name>".
+        timeout (float, optional): seconds without newly listed instances after which
+            to stop with an error. Defaults to None, i.e., wait indefinitely.
+    """
+    work_path = source_path.parent / WORK_DIR_NAME / source_path.name
+    follower = ManifestFollower(source_path)
+    last_record_time = time.monotonic()
+    while True:
+        # The status of supervised generation, or else the label mapping, is written
+        # once generation completes or fails, so that all manifest records have been
+        # appended if it is read before polling.
+        status = read_status(work_path)
+        if status:
+            complete = status["state"] == "complete"
+            failed = status["state"] == "failed"
+        else:
+            complete = (source_path / "label_mapping.json").is_file()
+            failed = False
+
+        # Collect latest record of every instance. Removed instances, e.g., quarantined
+        # ones, are removed from the converted dataset.
+        records: dict[str, tuple[str, dict]] = {}
+        for split, record in follower.poll():
+            key = f"{split}/{record['index']}"
+            records.pop(key, None)
+            if record.get("removed") or key in skip:
+                conversion.remove_instance(key)
+            else:
+                records[key] = (split, record)
+
+        conversion.convert(
+            [
+                (split, get_manifest_instance(source_path / split, record))
+                for split, record in records.values()
+            ]
+        )
+
+        if complete:
+            break
+        if failed:
+            raise Exception(
+                f"Generation failed: {status['reason']}. Please regenerate the dataset "
+                "and follow it again, which only converts new instances."
+            )
+
+        # Stop if generation stalled, e.g., because it was killed without recording it.
+        if records:
+            last_record_time = time.monotonic()
+        elif timeout and time.monotonic() - last_record_time > timeout:
+            raise Exception(
+                f"Generation listed no instance for {timeout:g} seconds. Please "
+                "check that it is running, or increase --follow-timeout."
+            )
+        else:
+            time.sleep(FOLLOW_INTERVAL)
+
+    # Convert splits generated without manifest, which can only be listed once complete.
+    for split_path in [path for path in source_path.iterdir() if path.is_dir()]:
+        if not follower.offsets.get(split_path.name):
+            conversion.convert(
+                [
+                    (split_path.name, instance)
+                    for instance in get_blenderline_instances(
+                        split_path, get_excluded_instances(skip, split_path.name)
+                    )
+                ]
+            )
+
+
+def run_conversion(
+    source_path: pathlib.Path,
+    converters: list[BaseConverter],
+    jobs: int = 1,
+    image_mode: str = "copy",
+    state: ConversionState | None = None,
+    follow: bool = False,
+    skip: set[str] | None = None,
+    follow_timeout: float = None,
+) -> None:
+    """Convert BlenderLine dataset with one or more converters in a single pass,
+        optionally spread over a pool of worker processes, and report throughput.
+        Instances are converted in any order, but written by the calling process in
+        order, so that the output does not depend on the number of processes. When
+        following a dataset being generated, instances are written in the order in
+        which generation completes them.
+
+    Args:
+        source_path (pathlib.Path): absolute location of dataset to convert.
+        converters (list[BaseConverter]): converters to convert dataset with.
+        jobs (int, optional): number of worker processes, where 0 means one per CPU core
+            and 1 converts in the calling process. Defaults to 1.
+        image_mode (str, optional): way of placing generated images in converted
+            datasets, one of IMAGE_MODES. Defaults to "copy".
+        state (ConversionState | None, optional): conversion state of the converted
+            dataset if converting incrementally, in which case only new or changed
+            instances are converted, and outputs of deleted instances are removed.
+            Defaults to None.
+        follow (bool, optional): whether to convert instances while the dataset is
+            being generated, as soon as they are complete, until generation completes,
+            and raise if generation fails. Defaults to False.
+        skip (set[str] | None, optional): keys of instances to skip, i.e.,
+            "<split>/<instance folder name>", e.g., invalid instances found by
+            `blenderline verify`. Outputs of skipped instances of an earlier incremental
+            conversion are removed. Defaults to None.
+        follow_timeout (float, optional): seconds without newly generated instances
+            after which following stops with an error. Defaults to None, i.e., wait
+            indefinitely.
+    """
+    jobs = get_job_count(jobs)
+    skip = skip or set()
+    start_time = time.time()
+
+    for converter in converters:
+        converter.begin(source_path)
+
+    # Save conversion state, even if conversion is interrupted, so that converted
+    # instances are not converted again.
+    conversion = Conversion(converters, jobs, image_mode, state)
+    try:
+        if follow:
+            follow_generation(source_path, conversion, skip, follow_timeout)
+        else:
+            # Detect data splits from root BlenderLine dataset directory, and collect
+            # instances to convert.
+            tasks: list[tuple[str, BlenderLineInstance]] = []
+            for split_path in [path for path in source_path.iterdir() if path.is_dir()]:
+                conversion.begin_split(split_path.name)
+                tasks += [
+                    (split_path.name, instance)
+                    for instance in get_blenderline_instances(
+                        split_path, get_excluded_instances(skip, split_path.name)
+                    )
+                ]
+            conversion.convert(tasks)
+
+        # Remove outputs of instances that no longer exist since the last conversion.
+        conversion.remove_deleted_instances()
+    finally:
+        conversion.close()
+
+    label_mapping = get_label_mapping(source_path)
+    for converter in converters:
+        converter.finish(label_mapping)
+
+    # Report throughput.
+    duration = time.time() - start_time
+    num_written = conversion.num_written
+    print(
+        f"Converted {num_written} instances in {duration:.1f} seconds "
+        f"({num_written / max(duration, 1e-9):.1f} instances/second, {jobs} jobs)."
+    )
+    if state:
+        print(
+            f"Skipped {conversion.num_skipped} unchanged instances and removed "
+            f"{conversion.num_removed} deleted instances."
+        )
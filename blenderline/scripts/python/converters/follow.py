@@ -0,0 +1,46 @@
+import pathlib
+
+from blenderline.utils import MANIFEST_FILENAME, read_progress
+
+
+class ManifestFollower:
+    """Follows the manifests of a dataset while it is being generated. The generation
+    supervisor appends a record to the manifest of a split once all outputs of an
+    instance are written, so every record refers to a complete instance.
+    """
+
+    def __init__(self, source_path: pathlib.Path) -> None:
+        """Create manifest follower, starting at the beginning of every manifest.
+
+        Args:
+            source_path (pathlib.Path): absolute location of dataset being generated.
+        """
+        # Save object attributes.
+        self.source_path = source_path
+
+        # Byte offsets up to which the manifest of every split has been read.
+        self.offsets: dict[str, int] = {}
+
+    def poll(self) -> list[tuple[str, dict]]:
+        """Read manifest records appended since the last poll, including manifests of
+            splits that appeared since.
+
+        Returns:
+            list[tuple[str, dict]]: split names and manifest records, in order of
+                appending per split.
+        """
+        records: list[tuple[str, dict]] = []
+
+        # The dataset folder is only created once the first instance is generated.
+        if not self.source_path.is_dir():
+            return records
+
+        for split_path in [
+            path for path in self.source_path.iterdir() if path.is_dir()
+        ]:
+            split_records, self.offsets[split_path.name] = read_progress(
+                split_path / MANIFEST_FILENAME, self.offsets.get(split_path.name, 0)
+            )
+            records += [(split_path.name, record) for record in split_records]
+
+        return records
@@ -0,0 +1,140 @@
+import os
+import pathlib
+import shutil
+
+# The fcntl module is not available on Windows, where reflinks are not supported.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Linux ioctl request to clone a file's extents into another file (copy-on-write).
+FICLONE = 0x40049409
+
+# Ways of placing generated images in converted datasets.
+IMAGE_MODES = ["auto", "copy", "hardlink", "symlink", "reflink", "move"]
+
+
+def reflink(source_path: pathlib.Path, target_path: pathlib.Path) -> None:
+    """Create copy-on-write copy of a file, which shares the data blocks of the source
+        until either file is modified. Only supported by some filesystems, e.g., Btrfs
+        and XFS.
+
+    Args:
+        source_path (pathlib.Path): absolute location of file to copy.
+        target_path (pathlib.Path): absolute location of copy.
+
+    Raises:
+        OSError: if the platform or filesystem does not support reflinks.
+    """
+    if fcntl is None:
+        raise OSError("Reflinks are not supported on this platform.")
+
+    try:
+        with open(source_path, "rb") as source, open(target_path, "wb") as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    except OSError:
+        target_path.unlink(missing_ok=True)
+        raise
+
+
+class ImagePlacer:
+    """Places generated images in converted datasets. When several formats are
+    converted at once, an image is placed once and hardlinked to the other formats if
+    possible, so that images are not copied for every format.
+    """
+
+    def __init__(self, mode: str = "copy") -> None:
+        """Create image placer.
+
+        Args:
+            mode (str, optional): way of placing images, one of IMAGE_MODES. In auto
+                mode, images are reflinked or else hardlinked if the converted dataset
+                is on the same device as the source dataset, and copied otherwise.
+                Defaults to "copy".
+        """
+        if mode not in IMAGE_MODES:
+            raise Exception(f"Please choose an image mode in {IMAGE_MODES}.")
+
+        # Save object attributes. Auto mode is resolved on the first placed image.
+        self.mode = mode
+
+        # Keep track of first placement of images of the instance being written.
+        self.placed_paths: dict[pathlib.Path, pathlib.Path] = {}
+
+    def resolve_mode(
+        self, source_path: pathlib.Path, target_path: pathlib.Path
+    ) -> bool:
+        """Resolve auto mode to the cheapest mode supported between the source and target
+            locations, by trying to place the first image.
+
+        Args:
+            source_path (pathlib.Path): absolute location of generated image.
+            target_path (pathlib.Path): absolute location of image in converted dataset.
+
+        Returns:
+            bool: whether the image was placed while resolving.
+        """
+        self.mode = "copy"
+        if os.stat(source_path).st_dev != os.stat(target_path.parent).st_dev:
+            return False
+
+        for mode, place in [("reflink", reflink), ("hardlink", os.link)]:
+            try:
+                place(source_path, target_path)
+            except OSError:
+                continue
+            self.mode = mode
+            return True
+
+        return False
+
+    def place(self, source_path: pathlib.Path, target_path: pathlib.Path) -> None:
+        """Place generated image at target location.
+
+        Args:
+            source_path (pathlib.Path): absolute location of generated image.
+            target_path (pathlib.Path): absolute location of image in converted dataset.
+        """
+        # Replace image left by an earlier, interrupted incremental conversion, as links
+        # cannot overwrite existing files.
+        target_path.unlink(missing_ok=True)
+
+        # Link to the earlier placement of the image if possible, as placements are
+        # identical, and the source may have been moved. Linking fails e.g. across
+        # filesystems, in which case the earlier placement is copied.
+        if (
+            placed_path := self.placed_paths.get(source_path)
+        ) and self.mode != "symlink":
+            try:
+                os.link(placed_path, target_path)
+            except OSError:
+                shutil.copy(placed_path, target_path)
+            return
+
+        if self.mode == "auto" and self.resolve_mode(source_path, target_path):
+            self.placed_paths[source_path] = target_path
+            return
+
+        if self.mode == "copy":
+            shutil.copy(source_path, target_path)
+        elif self.mode == "hardlink":
+            os.link(source_path, target_path)
+        elif self.mode == "symlink":
+            os.symlink(source_path, target_path)
+        elif self.mode == "reflink":
+            try:
+                reflink(source_path, target_path)
+            except OSError:
+                raise Exception(
+                    "Reflinks are not supported between source and target, please "
+                    "choose another image mode."
+                )
+        elif self.mode == "move":
+            shutil.move(source_path, target_path)
+
+        self.placed_paths[source_path] = target_path
+
+    def clear(self) -> None:
+        """Forget placed images, e.g., once all formats of an instance are written."""
+        self.placed_paths.clear()
@@ -0,0 +1,183 @@
+import json
+import pathlib
+from typing import Any
+
+import cv2
+import numpy as np
+
+from .base import BaseConverter
+from .images import ImagePlacer
+from .utils import BlenderLineInstance, DecodedMask, get_image_size, get_instance_map
+
+# Size of write buffer of instance-ID map archives, so that maps are written with large
+# sequential writes.
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
+# Alignment of instance-ID maps within archives, so that uint16 maps can be viewed
+# without copying.
+ALIGNMENT = 8
+
+# Record of an instance-ID map in the index of an archive.
+INDEX_DTYPE = np.dtype(
+    [
+        ("key", "S12"),  # Image ID.
+        ("offset", "<u8"),  # Byte offset of map within archive.
+        ("height", "<u4"),
+        ("width", "<u4"),
+        ("itemsize", "u1"),  # 1 for uint8 maps, and 2 for uint16 maps.
+        ("label_start", "<u8"),  # Position of label of instance ID 1 in label table.
+        ("label_count", "<u4"),  # Number of instances in map.
+    ]
+)
+
+
+class InstanceMapReader:
+    """Reads instance-ID maps from the archive of a split without decoding or copying,
+    as views of a single memory map of the archive.
+    """
+
+    def __init__(self, split_path: pathlib.Path) -> None:
+        """Open archive of split.
+
+        Args:
+            split_path (pathlib.Path): absolute location of split folder of converted
+                dataset.
+        """
+        self.index = np.load(split_path / "index.npy")
+        self.labels = np.load(split_path / "labels.npy", mmap_mode="r")
+        self.archive = np.memmap(split_path / "instance_maps.bin", mode="r")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, position: int) -> tuple[str, np.ndarray, np.ndarray]:
+        """Get instance-ID map of sample.
+
+        Args:
+            position (int): position of sample in index.
+
+        Returns:
+            tuple[str, np.ndarray, np.ndarray]: image ID, instance-ID map in which pixel
+                value i belongs to the i-th instance, and label ID of every instance.
+        """
+        record = self.index[position]
+        size = int(record["height"]) * int(record["width"]) * int(record["itemsize"])
+        instance_map = (
+            self.archive[record["offset"] : record["offset"] + size]
+            .view(np.uint8 if record["itemsize"] == 1 else "<u2")
+            .reshape(record["height"], record["width"])
+        )
+        labels = self.labels[
+            record["label_start"] : record["label_start"] + record["label_count"]
+        ]
+
+        return record["key"].decode(), instance_map, labels
+
+
+class InstanceMapConverter(BaseConverter):
+    """Converter to memory-mappable instance-ID maps. Per split, the uncompressed map of
+    every instance is written to a single archive file, with an index of map offsets
+    and shapes, and a table with the label of every instance, so that masks can be read
+    without decoding PNG images and with one file handle per split.
+    """
+
+    # Maps cannot be removed from archives.
+    incremental = False
+
+    def __init__(
+        self, target_path: pathlib.Path, minarea: float = 0.005, **kwargs
+    ) -> None:
+        """Create instance-ID map converter.
+
+        Args:
+            target_path (pathlib.Path): absolute location of converted dataset.
+            minarea (float, optional): minimum area an object mask must have to be
+                included. Defaults to 0.005.
+        """
+        super().__init__(target_path, minarea)
+
+        # Open archives, and index records and labels of written maps, per split.
+        self.archives: dict[str, Any] = {}
+        self.records: dict[str, list[tuple]] = {}
+        self.labels: dict[str, list[int]] = {}
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Archives hold open files and are only used by the calling process, so they
+        # are not passed to conversion worker processes.
+        return {**self.__dict__, "archives": {}, "records": {}, "labels": {}}
+
+    def begin_split(self, split: str) -> None:
+        # Create split folder with archive.
+        (self.target_path / split).mkdir(parents=True)
+        self.archives[split] = open(
+            self.target_path / split / "instance_maps.bin",
+            "wb",
+            buffering=WRITE_BUFFER_SIZE,
+        )
+        self.records[split] = []
+        self.labels[split] = []
+
+    def convert_instance(
+        self, instance: BlenderLineInstance, decoded_masks: list[DecodedMask | None]
+    ) -> tuple[np.ndarray, list[int]]:
+        # Combine decoded masks into instance-ID map, skipping empty masks and masks
+        # that are too small (< area_threshold). Image dimensions are read from the
+        # image header, as an instance may not contain any object.
+        width, height = get_image_size(instance.image.path)
+        kept_masks = [
+            decoded_mask
+            for decoded_mask in decoded_masks
+            if decoded_mask
+            and cv2.countNonZero(decoded_mask.binary) / (width * height) >= self.minarea
+        ]
+
+        return (
+            get_instance_map(kept_masks, width, height),
+            [int(decoded_mask.mask.label) for decoded_mask in kept_masks],
+        )
+
+    def write_instance(
+        self,
+        split: str,
+        instance: BlenderLineInstance,
+        result: tuple[np.ndarray, list[int]],
+        image_placer: ImagePlacer,
+    ) -> list[pathlib.Path]:
+        # Append instance-ID map to archive, padded to the alignment, and record its
+        # location and labels.
+        instance_map, labels = result
+        archive = self.archives[split]
+        offset = archive.tell()
+        archive.write(
+            instance_map.astype(instance_map.dtype.newbyteorder("<"), copy=False).data
+        )
+        archive.write(bytes(-archive.tell() % ALIGNMENT))
+
+        self.records[split].append(
+            (
+                instance.image.id,
+                offset,
+                *instance_map.shape,
+                instance_map.itemsize,
+                len(self.labels[split]),
+                len(labels),
+            )
+        )
+        self.labels[split] += labels
+
+        return []
+
+    def finish(self, label_mapping: dict[str, str]) -> None:
+        # Close archives, and write index sorted by image ID and label table per split.
+        for split, archive in self.archives.items():
+            archive.close()
+            index = np.array(self.records[split], dtype=INDEX_DTYPE)
+            np.save(self.target_path / split / "index.npy", np.sort(index, order="key"))
+            np.save(
+                self.target_path / split / "labels.npy",
+                np.array(self.labels[split], dtype="<i4"),
+            )
+
+        # Write label mapping next to the splits.
+        with open(self.target_path / "label_mapping.json", "w+") as file:
+            json.dump(label_mapping, file)
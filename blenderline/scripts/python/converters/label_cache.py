@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import pathlib
+
+import numpy as np
+
+from .utils import get_image_size
+
+
+def get_label_hash(signatures: list[tuple[str, int, int]]) -> str:
+    """Get hash of label files, which changes whenever a label file is added, removed,
+        or rewritten.
+
+    Args:
+        signatures (list[tuple[str, int, int]]): filename, size, and modification time
+            in nanoseconds of every label file, sorted by filename.
+
+    Returns:
+        str: SHA-256 hash of lines "<filename>:<size>:<mtime_ns>".
+    """
+    label_hash = hashlib.sha256()
+    for name, size, mtime_ns in signatures:
+        label_hash.update(f"{name}:{size}:{mtime_ns}\n".encode())
+    return label_hash.hexdigest()
+
+
+def parse_label_file(label_path: pathlib.Path) -> tuple[np.ndarray, np.ndarray]:
+    """Parse YOLO label file into label values and number of values per line.
+
+    Args:
+        label_path (pathlib.Path): absolute location of label file.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: concatenated values of all lines (label ID
+            followed by coordinates), and number of values per line.
+    """
+    with open(label_path, "r") as file:
+        rows = [line.split() for line in file.read().splitlines() if line.strip()]
+    values = np.array([value for row in rows for value in row], dtype=np.float32)
+    return values, np.array([len(row) for row in rows], dtype=np.uint64)
+
+
+class LabelCache:
+    """Binary cache of the YOLO labels of a split, stored as separate arrays so that
+    loaders can memory-map them instead of parsing every label file:
+    - keys.npy: label file stem (image ID) of every image.
+    - image_sizes.npy: width and height of every image.
+    - image_offsets.npy: position of first line of every image, and total line count.
+    - line_offsets.npy: position of first value of every line, and total value count.
+    - values.npy: concatenated float32 values of all lines, i.e., the label ID followed
+        by box or polygon coordinates.
+    - signatures.npy: size and modification time of every label file.
+    - meta.json: hash of all label files.
+    """
+
+    def __init__(self, cache_path: pathlib.Path) -> None:
+        """Open label cache, memory-mapping its arrays.
+
+        Args:
+            cache_path (pathlib.Path): absolute location of label cache folder.
+        """
+        self.keys = np.load(cache_path / "keys.npy")
+        with open(cache_path / "meta.json", "r") as file:
+            self.hash = json.load(file)["hash"]
+        for name in [
+            "image_sizes",
+            "image_offsets",
+            "line_offsets",
+            "values",
+            "signatures",
+        ]:
+            setattr(self, name, np.load(cache_path / f"{name}.npy", mmap_mode="r"))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __getitem__(self, position: int) -> list[np.ndarray]:
+        """Get label lines of image.
+
+        Args:
+            position (int): position of image in cache.
+
+        Returns:
+            list[np.ndarray]: values of every label line of image.
+        """
+        line_offsets = self.line_offsets[
+            self.image_offsets[position] : self.image_offsets[position + 1] + 1
+        ]
+        return [
+            self.values[start:end] for start, end in zip(line_offsets, line_offsets[1:])
+        ]
+
+    @staticmethod
+    def write(
+        labels_path: pathlib.Path, images_path: pathlib.Path, cache_path: pathlib.Path
+    ) -> None:
+        """Write label cache of split. Label files that are unchanged since an earlier
+            cache of the split was written are not parsed again, so that rewriting the
+            cache after an incremental conversion only parses changed label files.
+
+        Args:
+            labels_path (pathlib.Path): absolute location of label folder of split.
+            images_path (pathlib.Path): absolute location of image folder of split.
+            cache_path (pathlib.Path): absolute location of label cache folder.
+        """
+        # List label files with their size and modification time.
+        with os.scandir(labels_path) as entries:
+            signatures = sorted(
+                (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                for entry in entries
+                if entry.name.endswith(".txt")
+            )
+
+        # Map label file stems to image filenames, as images keep the extension of their
+        # image format.
+        with os.scandir(images_path) as entries:
+            image_filenames = {
+                os.path.splitext(entry.name)[0]: entry.name for entry in entries
+            }
+
+        # Index images of earlier cache by label file stem and signature.
+        previous = None
+        previous_positions = {}
+        if (cache_path / "meta.json").is_file():
+            previous = LabelCache(cache_path)
+            previous_positions = {
+                (key, int(size), int(mtime_ns)): position
+                for position, (key, (size, mtime_ns)) in enumerate(
+                    zip(previous.keys.tolist(), previous.signatures)
+                )
+            }
+
+        keys, image_sizes, line_counts, line_lengths, values = [], [], [], [], []
+        for name, size, mtime_ns in signatures:
+            key = name[: -len(".txt")]
+            keys.append(key)
+
+            # Reuse values of unchanged images of earlier cache, and parse others.
+            if (position := previous_positions.get((key, size, mtime_ns))) is not None:
+                image_sizes.append(previous.image_sizes[position])
+                first_line, end_line = previous.image_offsets[position : position + 2]
+                image_line_offsets = previous.line_offsets[first_line : end_line + 1]
+                image_values = previous.values[
+                    image_line_offsets[0] : image_line_offsets[-1]
+                ]
+                image_line_lengths = np.diff(image_line_offsets)
+            else:
+                image_sizes.append(get_image_size(images_path / image_filenames[key]))
+                image_values, image_line_lengths = parse_label_file(labels_path / name)
+            values.append(image_values)
+            line_lengths.append(image_line_lengths)
+            line_counts.append(len(image_line_lengths))
+
+        arrays = {
+            "keys": np.array(keys, dtype=str),
+            "image_sizes": np.array(image_sizes, dtype=np.uint32).reshape(-1, 2),
+            "image_offsets": np.cumsum([0] + line_counts, dtype=np.uint64),
+            "line_offsets": np.cumsum(
+                np.concatenate([np.zeros(1, dtype=np.uint64)] + line_lengths),
+                dtype=np.uint64,
+            ),
+            "values": np.concatenate([np.empty(0)] + values, dtype=np.float32),
+            "signatures": np.array(
+                [signature[1:] for signature in signatures], dtype=np.int64
+            ).reshape(-1, 2),
+        }
+
+        # Write arrays of new cache to temporary files that replace the arrays of the
+        # earlier cache, so that memory maps of the earlier cache remain valid.
+        cache_path.mkdir(parents=True, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(cache_path / f"{name}.tmp.npy", array)
+            os.replace(cache_path / f"{name}.tmp.npy", cache_path / f"{name}.npy")
+        with open(cache_path / "meta.json", "w+") as file:
+            json.dump({"hash": get_label_hash(signatures)}, file)
@@ -0,0 +1,118 @@
+import json
+import os
+import pathlib
+from typing import Any
+
+from .utils import BlenderLineInstance
+
+# Name of conversion state file in root of converted dataset.
+STATE_FILENAME = ".blenderline_convert.json"
+
+
+def get_instance_signature(instance: BlenderLineInstance) -> list[Any]:
+    """Get signature of instance that changes whenever the instance is regenerated.
+        Regenerated instances get new random image and mask IDs, and the image is
+        rewritten, so the file names and the image modification time and size suffice,
+        without reading or stating every mask.
+
+    Args:
+        instance (BlenderLineInstance): reference to instance with image and masks.
+
+    Returns:
+        list[Any]: JSON serializable signature of instance.
+    """
+    image_stat = os.stat(instance.image.path)
+    return [
+        instance.image.path.name,
+        [mask.path.name for mask in instance.masks],
+        image_stat.st_mtime_ns,
+        image_stat.st_size,
+    ]
+
+
+class ConversionState:
+    """State of an incrementally converted dataset, stored in the converted dataset.
+    Records the conversion parameters, and the signature and output files of every
+    converted instance, so that later conversions only convert new or changed instances
+    and remove the outputs of deleted instances.
+    """
+
+    def __init__(self, target_path: pathlib.Path, parameters: dict[str, Any]) -> None:
+        """Load conversion state from converted dataset, if any. If the dataset was
+            converted with different parameters, all instances are considered changed.
+
+        Args:
+            target_path (pathlib.Path): absolute location of converted dataset.
+            parameters (dict[str, Any]): JSON serializable conversion parameters.
+        """
+        # Save object attributes.
+        self.target_path = target_path
+        self.path = target_path / STATE_FILENAME
+        self.parameters = parameters
+
+        # Load signature and output files of converted instances, keyed by split and
+        # instance folder name.
+        self.instances: dict[str, dict[str, Any]] = {}
+        if self.path.is_file():
+            with open(self.path, "r") as file:
+                state = json.load(file)
+            self.instances = state["instances"]
+
+            # Invalidate signatures if parameters changed, but keep output files so that
+            # they are removed when the instances are converted again.
+            if state["parameters"] != parameters:
+                for instance in self.instances.values():
+                    instance["signature"] = None
+
+    def is_current(self, key: str, signature: list[Any]) -> bool:
+        """Check if instance was converted before and has not changed since.
+
+        Args:
+            key (str): key of instance, i.e., "<split>/<instance folder name>".
+            signature (list[Any]): current signature of instance.
+
+        Returns:
+            bool: whether converted instance is up to date.
+        """
+        if key not in self.instances:
+            return False
+        return self.instances[key]["signature"] == signature
+
+    def remove(self, key: str) -> None:
+        """Remove output files of converted instance and forget instance.
+
+        Args:
+            key (str): key of instance, i.e., "<split>/<instance folder name>".
+        """
+        if not (instance := self.instances.pop(key, None)):
+            return
+        for output in instance["outputs"]:
+            (self.target_path / output).unlink(missing_ok=True)
+
+    def update(
+        self, key: str, signature: list[Any], outputs: list[pathlib.Path]
+    ) -> None:
+        """Record converted instance.
+
+        Args:
+            key (str): key of instance, i.e., "<split>/<instance folder name>".
+            signature (list[Any]): signature of instance at conversion.
+            outputs (list[pathlib.Path]): absolute locations of output files.
+        """
+        self.instances[key] = {
+            "signature": signature,
+            "outputs": [
+                output.relative_to(self.target_path).as_posix() for output in outputs
+            ],
+        }
+
+    def save(self) -> None:
+        """Save conversion state. The state is written to a temporary file first, so
+        that an interrupted save never leaves a corrupt state file.
+        """
+        temporary_path = self.path.with_suffix(".tmp")
+        with open(temporary_path, "w+") as file:
+            json.dump(
+                {"parameters": self.parameters, "instances": self.instances}, file
+            )
+        os.replace(temporary_path, self.path)
@@ -0,0 +1,336 @@
+import json
+import pathlib
+from fractions import Fraction
+from typing import Any
+
+import cv2
+import numpy as np
+
+from .base import BaseConverter
+from .images import ImagePlacer
+from .label_cache import parse_label_file
+from .utils import BlenderLineInstance, DecodedMask
+
+# Bin edges of histograms of normalized bounding box sizes, base-2 logarithm of
+# bounding box aspect ratios (width / height), and base-10 logarithm of normalized mask
+# areas. Values outside of the edges are counted in the outer bins.
+SIZE_EDGES = np.linspace(0.0, 1.0, 51)
+ASPECT_EDGES = np.linspace(-5.0, 5.0, 41)
+AREA_EDGES = np.linspace(-6.0, 0.0, 49)
+
+# Columns of object arrays, with one row per (non-empty) mask or label line.
+LABEL, AREA, WIDTH, HEIGHT, KEPT = range(5)
+
+
+def get_mask_objects(
+    decoded_masks: list[DecodedMask | None], minarea: float = 0.005
+) -> np.ndarray:
+    """Get object array of BlenderLine instance from decoded masks.
+
+    Args:
+        decoded_masks (list[DecodedMask | None]): decoded instance masks, or None for
+            empty masks.
+        minarea (float, optional): minimum area an object mask must have to be kept.
+            Defaults to 0.005.
+
+    Returns:
+        np.ndarray: label, normalized area, normalized bounding box width and height,
+            and whether the object exceeds minarea, of every non-empty mask.
+    """
+    objects = np.zeros((len(decoded_masks), 5))
+    for row, decoded_mask in enumerate(decoded_masks):
+        if decoded_mask is None:
+            continue
+        image_area = decoded_mask.width * decoded_mask.height
+        area = cv2.countNonZero(decoded_mask.binary) / image_area
+        _, _, w, h = cv2.boundingRect(decoded_mask.binary)
+        objects[row] = [
+            int(decoded_mask.mask.label),
+            area,
+            w / decoded_mask.width,
+            h / decoded_mask.height,
+            area >= minarea,
+        ]
+
+    return objects[objects[:, AREA] > 0]
+
+
+def get_label_objects(label_path: pathlib.Path) -> np.ndarray:
+    """Get object array of converted YOLO image from its label file. Areas are the box
+        areas for detection labels, and the polygon areas for segmentation labels.
+
+    Args:
+        label_path (pathlib.Path): absolute location of YOLO label file.
+
+    Returns:
+        np.ndarray: label, normalized area, normalized bounding box width and height,
+            and whether the object was kept (always), of every label line.
+    """
+    values, line_lengths = parse_label_file(label_path)
+    objects = np.ones((len(line_lengths), 5))
+    for row, end in enumerate(np.cumsum(line_lengths)):
+        line = values[end - line_lengths[row] : end].astype(np.float64)
+        objects[row, LABEL] = line[0]
+
+        # Detection labels hold center, width, and height of the bounding box.
+        if len(line) == 5:
+            objects[row, WIDTH : HEIGHT + 1] = line[3:5]
+            objects[row, AREA] = line[3] * line[4]
+            continue
+
+        # Segmentation labels hold polygon vertices, of which the area is computed with
+        # the shoelace formula.
+        x, y = line[1::2], line[2::2]
+        objects[row, WIDTH] = x.max() - x.min()
+        objects[row, HEIGHT] = y.max() - y.min()
+        objects[row, AREA] = (
+            abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1))) / 2
+        )
+
+    return objects
+
+
+def histogram(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Count values per bin, counting values outside of the edges in the outer bins.
+
+    Args:
+        values (np.ndarray): values to count.
+        edges (np.ndarray): bin edges.
+
+    Returns:
+        np.ndarray: number of values per bin.
+    """
+    return np.histogram(values.clip(edges[0], edges[-1]), edges)[0]
+
+
+def write_histogram_image(
+    image_path: pathlib.Path, title: str, edges: list[float], counts: list[int]
+) -> None:
+    """Draw histogram as bar chart and write it as PNG image.
+
+    Args:
+        image_path (pathlib.Path): absolute location of PNG image.
+        title (str): title of chart.
+        edges (list[float]): bin edges.
+        counts (list[int]): number of values per bin.
+    """
+    width, height, margin = 640, 360, 40
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    # Draw bars scaled to the largest bin.
+    bar_width = (width - 2 * margin) / max(len(counts), 1)
+    max_count = max(max(counts, default=0), 1)
+    for index, count in enumerate(counts):
+        bar_height = round(count / max_count * (height - 2.5 * margin))
+        cv2.rectangle(
+            image,
+            (round(margin + index * bar_width), height - margin - bar_height),
+            (round(margin + (index + 1) * bar_width) - 1, height - margin),
+            (180, 120, 40),
+            thickness=-1,
+        )
+
+    # Draw title, range of bin edges, and largest bin count.
+    font, color = cv2.FONT_HERSHEY_SIMPLEX, (0, 0, 0)
+    cv2.putText(image, title, (margin, 25), font, 0.6, color, 1, cv2.LINE_AA)
+    cv2.putText(image, f"max {max_count}", (width - 150, 25), font, 0.5, color, 1)
+    for text, x in [(f"{edges[0]:g}", margin), (f"{edges[-1]:g}", width - margin - 30)]:
+        cv2.putText(image, text, (x, height - 15), font, 0.5, color, 1, cv2.LINE_AA)
+    cv2.line(image, (margin, height - margin), (width - margin, height - margin), color)
+
+    cv2.imwrite(str(image_path), image)
+
+
+class SplitStatistics:
+    """Statistics of the images of a split, accumulated in fixed-size histograms so that
+    memory use does not grow with the number of images.
+    """
+
+    def __init__(self) -> None:
+        self.num_images = 0
+        self.num_masks = 0  # Number of non-empty masks or label lines.
+        self.num_objects = 0  # Number of masks or label lines exceeding minarea.
+        self.class_counts: dict[int, int] = {}
+        self.objects_per_image = np.zeros(1, dtype=np.int64)
+        self.width_counts = np.zeros(len(SIZE_EDGES) - 1, dtype=np.int64)
+        self.height_counts = np.zeros(len(SIZE_EDGES) - 1, dtype=np.int64)
+        self.aspect_counts = np.zeros(len(ASPECT_EDGES) - 1, dtype=np.int64)
+        self.area_counts = np.zeros(len(AREA_EDGES) - 1, dtype=np.int64)
+        self.area_sum = Fraction()  # Exact, so independent of the order of images.
+
+    def add(self, objects: np.ndarray) -> None:
+        """Add objects of an image to statistics.
+
+        Args:
+            objects (np.ndarray): object array of image.
+        """
+        kept = objects[objects[:, KEPT] > 0]
+        self.num_images += 1
+        self.num_masks += len(objects)
+        self.num_objects += len(kept)
+
+        labels, counts = np.unique(kept[:, LABEL].astype(int), return_counts=True)
+        for label, count in zip(labels.tolist(), counts.tolist()):
+            self.class_counts[label] = self.class_counts.get(label, 0) + count
+
+        if len(kept) >= len(self.objects_per_image):
+            self.objects_per_image = np.pad(
+                self.objects_per_image, (0, len(kept) + 1 - len(self.objects_per_image))
+            )
+        self.objects_per_image[len(kept)] += 1
+
+        # Histograms of kept objects, except for the area histogram, which includes
+        # dropped masks to show the effect of minarea.
+        self.width_counts += histogram(kept[:, WIDTH], SIZE_EDGES)
+        self.height_counts += histogram(kept[:, HEIGHT], SIZE_EDGES)
+        aspect = np.log2(kept[:, WIDTH].clip(1e-9) / kept[:, HEIGHT].clip(1e-9))
+        self.aspect_counts += histogram(aspect, ASPECT_EDGES)
+        self.area_counts += histogram(np.log10(objects[:, AREA].clip(1e-9)), AREA_EDGES)
+        self.area_sum += Fraction(float(objects[:, AREA].sum()))
+
+    def to_dict(self, label_mapping: dict[str, str]) -> dict[str, Any]:
+        """Get statistics as JSON serializable dictionary.
+
+        Args:
+            label_mapping (dict[str, str]): mapping between label IDs and names.
+
+        Returns:
+            dict[str, Any]: statistics, with histograms as bin edges and counts.
+        """
+
+        def to_histogram(edges: np.ndarray, counts: np.ndarray) -> dict[str, list]:
+            return {"edges": edges.round(6).tolist(), "counts": counts.tolist()}
+
+        return {
+            "num_images": self.num_images,
+            "num_masks": self.num_masks,
+            "num_objects": self.num_objects,
+            "dropped_fraction": 1 - self.num_objects / max(self.num_masks, 1),
+            "mean_area": float(self.area_sum / max(self.num_masks, 1)),
+            "class_counts": {
+                label_mapping.get(str(label), str(label)): count
+                for label, count in sorted(self.class_counts.items())
+            },
+            "objects_per_image": self.objects_per_image.tolist(),
+            "bbox_width": to_histogram(SIZE_EDGES, self.width_counts),
+            "bbox_height": to_histogram(SIZE_EDGES, self.height_counts),
+            "bbox_log2_aspect": to_histogram(ASPECT_EDGES, self.aspect_counts),
+            "mask_log10_area": to_histogram(AREA_EDGES, self.area_counts),
+        }
+
+
+class DatasetStatistics:
+    """Statistics of a dataset per split, written as JSON and optionally as histogram
+    images.
+    """
+
+    def __init__(self) -> None:
+        self.splits: dict[str, SplitStatistics] = {}
+
+    def add(self, split: str, objects: np.ndarray) -> None:
+        """Add objects of an image of a split to statistics.
+
+        Args:
+            split (str): name of split.
+            objects (np.ndarray): object array of image.
+        """
+        self.splits.setdefault(split, SplitStatistics()).add(objects)
+
+    def write(
+        self,
+        output_path: pathlib.Path,
+        label_mapping: dict[str, str],
+        plots: bool = False,
+    ) -> None:
+        """Write statistics to statistics.json, and optionally histogram images.
+
+        Args:
+            output_path (pathlib.Path): absolute location of folder to write to.
+            label_mapping (dict[str, str]): mapping between label IDs and names.
+            plots (bool, optional): whether to write histograms as PNG images named
+                "<split>_<histogram>.png". Defaults to False.
+        """
+        statistics = {
+            split: split_statistics.to_dict(label_mapping)
+            for split, split_statistics in sorted(self.splits.items())
+        }
+
+        output_path.mkdir(parents=True, exist_ok=True)
+        with open(output_path / "statistics.json", "w+") as file:
+            json.dump(statistics, file, indent=2)
+
+        if not plots:
+            return
+
+        # Objects per image are counted per number of objects, from 0.
+        for split, split_statistics in statistics.items():
+            histograms = {
+                name: split_statistics[name]
+                for name in [
+                    "bbox_width",
+                    "bbox_height",
+                    "bbox_log2_aspect",
+                    "mask_log10_area",
+                ]
+            }
+            objects_per_image = split_statistics["objects_per_image"]
+            histograms["objects_per_image"] = {
+                "edges": [0, len(objects_per_image)],
+                "counts": objects_per_image,
+            }
+            for name, histogram_dict in histograms.items():
+                write_histogram_image(
+                    output_path / f"{split}_{name}.png",
+                    f"{split}: {name}",
+                    histogram_dict["edges"],
+                    histogram_dict["counts"],
+                )
+
+
+class StatisticsConverter(BaseConverter):
+    """Converter that computes dataset statistics from the decoded masks shared with
+    other converters, so that statistics are a side effect of conversion at no extra
+    decoding cost.
+    """
+
+    # Statistics only cover converted instances.
+    incremental = False
+
+    def __init__(
+        self,
+        target_path: pathlib.Path,
+        minarea: float = 0.005,
+        plots: bool = False,
+        **kwargs,
+    ) -> None:
+        """Create statistics converter.
+
+        Args:
+            target_path (pathlib.Path): absolute location of folder to write statistics
+                to.
+            minarea (float, optional): minimum area an object mask must have to be
+                kept. Defaults to 0.005.
+            plots (bool, optional): whether to write histograms as PNG images. Defaults
+                to False.
+        """
+        super().__init__(target_path, minarea)
+        self.plots = plots
+        self.statistics = DatasetStatistics()
+
+    def convert_instance(
+        self, instance: BlenderLineInstance, decoded_masks: list[DecodedMask | None]
+    ) -> np.ndarray:
+        return get_mask_objects(decoded_masks, self.minarea)
+
+    def write_instance(
+        self,
+        split: str,
+        instance: BlenderLineInstance,
+        result: np.ndarray,
+        image_placer: ImagePlacer,
+    ) -> list[pathlib.Path]:
+        self.statistics.add(split, result)
+        return []
+
+    def finish(self, label_mapping: dict[str, str]) -> None:
+        self.statistics.write(self.target_path, label_mapping, self.plots)
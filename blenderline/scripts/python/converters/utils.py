@@ -2,8 +2,14 @@ import json
 import os
 import pathlib
 import re
+import struct
 from dataclasses import dataclass
 
+import cv2
+import numpy as np
+
+from blenderline.utils import LABELS_FILENAME, read_manifest
+
 
 @dataclass(frozen=True, eq=True)
 class BlenderLineImage:
@@ -20,60 +26,154 @@ class BlenderLineMask:
     id: str
     path: pathlib.Path
     label: str  # Label index (string, as label indices in label_mapping.json are strings)
+    pass_index: int | None = None  # Object pass index, if listed in the manifest.
+
+
+@dataclass(frozen=True, eq=True)
+class BlenderLineInstance:
+    """Reference to generated instance folder with its image and masks."""
+
+    path: pathlib.Path
+    image: BlenderLineImage
+    masks: list[BlenderLineMask]
+    labels: pathlib.Path | None = None  # Label sidecar, if masks were not written.
 
 
-def get_blenderline_image(instance_path: pathlib.Path) -> BlenderLineImage:
-    """Get reference to generated image in a BlenderLine instance folder.
+# BlenderLine names images with format "image__<image ID>__0001.<extension>", where the
+# image ID is a 6 byte random hex string, and the extension depends on the image format
+# of the encoding profile.
+IMAGE_SUFFIXES = (".png", ".jpg", ".webp")
+IMAGE_PATTERN = re.compile(r"image__([0-9a-f]{12})__0001(\.png|\.jpg|\.webp)$")
+
+# BlenderLine names masks with format "mask__<label ID>__<image ID>__0001.png", where the
+# mask ID is a 6 byte random hex string, and the label ID must be a digit.
+# TODO: there is currently no check for label IDs that are not digits, which are
+# incompatible with the YOLO metadata format.
+MASK_PATTERN = re.compile(r"mask__([0-9]{1,10})__([0-9a-f]{12})__0001\.png$")
+
+
+def get_blenderline_instance(
+    instance_path: pathlib.Path, filenames: list[str]
+) -> BlenderLineInstance:
+    """Get references to generated image and masks in a BlenderLine instance folder.
 
     Args:
         instance_path (pathlib.Path): path to BlenderLine instance folder.
+        filenames (list[str]): filenames in instance folder.
 
     Returns:
-        BlenderLineImage: reference to image containing path and image ID.
+        BlenderLineInstance: reference to instance containing image and masks. Masks are
+            sorted by filename, so that labels do not depend on the listing order.
     """
-    # BlenderLine names images with format "image__<image ID>__0001.png", where the image
-    # ID is a 6 byte random hex string.
-    image_pattern = re.compile(r"image__([0-9a-f]{12})__0001.png")
-
-    matches: list[BlenderLineImage] = []
+    images: list[BlenderLineImage] = []
+    masks: list[BlenderLineMask] = []
+    labels = None
 
-    for path in instance_path.iterdir():
-        if match := image_pattern.search(path.name):
-            matches.append(BlenderLineImage(id=match.group(1), path=path))
+    for filename in sorted(filenames):
+        if filename == LABELS_FILENAME:
+            labels = instance_path / filename
+        elif match := IMAGE_PATTERN.search(filename):
+            images.append(
+                BlenderLineImage(id=match.group(1), path=instance_path / filename)
+            )
+        elif match := MASK_PATTERN.search(filename):
+            masks.append(
+                BlenderLineMask(
+                    id=match.group(2),
+                    path=instance_path / filename,
+                    label=match.group(1),
+                )
+            )
 
     # Check that the instance contains exactly one generated image.
-    if len(matches) != 1:
+    if len(images) != 1:
         raise Exception(
             f"Instance at {instance_path} does not contain a valid BlenderLine image."
         )
 
-    return matches[0]
+    return BlenderLineInstance(
+        path=instance_path, image=images[0], masks=masks, labels=labels
+    )
 
 
-def get_blenderline_masks(instance_path: pathlib.Path) -> list[BlenderLineMask]:
-    """Get references to generated masks in a BlenderLine instance folder.
+def get_manifest_instance(
+    split_path: pathlib.Path, record: dict
+) -> BlenderLineInstance:
+    """Get references to generated image and masks of an instance listed in the manifest
+        of a split, without listing the instance folder.
 
     Args:
-        instance_path (pathlib.Path): path to BlenderLine instance folder.
+        split_path (pathlib.Path): path to BlenderLine split folder.
+        record (dict): manifest record of instance.
 
     Returns:
-        list[BlenderLineMask]: references to masks containing path, mask ID, and label ID.
+        BlenderLineInstance: reference to instance containing image and masks, with
+            object pass indices of masks.
     """
-    # BlenderLine names masks with format "mask__<label ID>__<image ID>__0001.png", where
-    # the mask ID is a 6 byte random hex string, and the label ID must be a digit.
-    # TODO: there is currently no check for label IDs that are not digits, which are
-    # incompatible with the YOLO metadata format.
-    mask_pattern = re.compile(r"mask__([0-9]{1,10})__([0-9a-f]{12})__0001.png")
-
-    matches: list[BlenderLineMask] = []
-
-    for path in instance_path.iterdir():
-        if match := mask_pattern.search(path.name):
-            matches.append(
-                BlenderLineMask(id=match.group(2), path=path, label=match.group(1))
+    if record["image"] is None:
+        raise Exception(
+            f"Instance at {split_path / str(record['index'])} is a layout generated "
+            "without rendering, which cannot be converted."
+        )
+
+    instance = get_blenderline_instance(
+        split_path / str(record["index"]),
+        [record["image"]]
+        + [mask["file"] for mask in record["masks"]]
+        + ([record["labels"]] if "labels" in record else []),
+    )
+    pass_indices = {mask["file"]: mask["pass_index"] for mask in record["masks"]}
+    masks = [
+        BlenderLineMask(
+            id=mask.id,
+            path=mask.path,
+            label=mask.label,
+            pass_index=pass_indices[mask.path.name],
+        )
+        for mask in instance.masks
+    ]
+
+    return BlenderLineInstance(
+        path=instance.path, image=instance.image, masks=masks, labels=instance.labels
+    )
+
+
+def get_blenderline_instances(
+    split_path: pathlib.Path, exclude: set[str] | None = None
+) -> list[BlenderLineInstance]:
+    """Get references to all instances in a BlenderLine split folder. The manifest
+        written while generating is used if present, so that instance folders need not
+        be listed. Otherwise, every folder is listed once.
+
+    Args:
+        split_path (pathlib.Path): path to BlenderLine split folder.
+        exclude (set[str] | None, optional): names of instance folders to skip, e.g.,
+            invalid instances found by `blenderline verify`. Defaults to None.
+
+    Returns:
+        list[BlenderLineInstance]: references to instances in split.
+    """
+    instances: list[BlenderLineInstance] = []
+    exclude = exclude or set()
+
+    if (manifest := read_manifest(split_path)) is not None:
+        return [
+            get_manifest_instance(split_path, record)
+            for index, record in manifest.items()
+            if str(index) not in exclude
+        ]
+
+    with os.scandir(split_path) as split_entries:
+        for split_entry in split_entries:
+            if not split_entry.is_dir() or split_entry.name in exclude:
+                continue
+            with os.scandir(split_entry.path) as instance_entries:
+                filenames = [entry.name for entry in instance_entries]
+            instances.append(
+                get_blenderline_instance(pathlib.Path(split_entry.path), filenames)
             )
 
-    return matches
+    return instances
 
 
 def get_label_mapping(source_path: pathlib.Path) -> dict[str, str]:
@@ -95,3 +195,290 @@ def get_label_mapping(source_path: pathlib.Path) -> dict[str, str]:
         label_mapping = json.load(file)
 
     return label_mapping
+
+
+def get_png_size(image_path: pathlib.Path) -> tuple[int, int]:
+    """Get width and height of PNG image from its header, without decoding it.
+
+    Args:
+        image_path (pathlib.Path): absolute location of PNG image.
+
+    Returns:
+        tuple[int, int]: width and height of image.
+    """
+    # The IHDR chunk directly follows the 8-byte signature, with width and height as
+    # big-endian integers after the 4-byte chunk length and 4-byte chunk type.
+    with open(image_path, "rb") as file:
+        header = file.read(24)
+    if header[:8] != b"\x89PNG\r\n\x1a\n" or header[12:16] != b"IHDR":
+        raise Exception(f"Image at {image_path} is not a valid PNG image.")
+
+    return struct.unpack(">II", header[16:24])
+
+
+def get_jpeg_size(image_path: pathlib.Path) -> tuple[int, int]:
+    """Get width and height of JPEG image from its start of frame segment, without
+        decoding it.
+
+    Args:
+        image_path (pathlib.Path): absolute location of JPEG image.
+
+    Returns:
+        tuple[int, int]: width and height of image.
+    """
+    with open(image_path, "rb") as file:
+        if file.read(2) != b"\xff\xd8":
+            raise Exception(f"Image at {image_path} is not a valid JPEG image.")
+
+        # Skip segments until a start of frame marker, which holds height and width as
+        # big-endian integers after the segment length and sample precision. Markers
+        # C4, C8, and CC share the range of start of frame markers, but are not.
+        while marker := file.read(2):
+            if len(marker) < 2 or marker[0] != 0xFF:
+                break
+            if marker[1] in (0x01, 0xFF) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            segment = file.read(7)
+            if len(segment) < 7:
+                break
+            if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">HH", segment[3:7])
+                return width, height
+            file.seek(struct.unpack(">H", segment[:2])[0] - 7, os.SEEK_CUR)
+
+    raise Exception(f"Image at {image_path} is not a valid JPEG image.")
+
+
+def get_webp_size(image_path: pathlib.Path) -> tuple[int, int]:
+    """Get width and height of WebP image from the header of its first chunk, without
+        decoding it.
+
+    Args:
+        image_path (pathlib.Path): absolute location of WebP image.
+
+    Returns:
+        tuple[int, int]: width and height of image.
+    """
+    with open(image_path, "rb") as file:
+        header = file.read(30)
+    if len(header) < 30 or header[:4] != b"RIFF" or header[8:12] != b"WEBP":
+        raise Exception(f"Image at {image_path} is not a valid WebP image.")
+
+    # Lossy images store 14-bit dimensions after the frame tag and start code, lossless
+    # images store 14-bit dimensions minus one after a signature byte, and extended
+    # images store 24-bit canvas dimensions minus one after flags.
+    chunk = header[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = struct.unpack("<I", header[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        return (
+            int.from_bytes(header[24:27], "little") + 1,
+            int.from_bytes(header[27:30], "little") + 1,
+        )
+
+    raise Exception(f"Image at {image_path} is not a valid WebP image.")
+
+
+def get_image_size(image_path: pathlib.Path) -> tuple[int, int]:
+    """Get width and height of generated PNG, JPEG, or WebP image from its header,
+        without decoding it.
+
+    Args:
+        image_path (pathlib.Path): absolute location of image.
+
+    Returns:
+        tuple[int, int]: width and height of image.
+    """
+    suffix = image_path.suffix.lower()
+    if suffix == ".jpg":
+        return get_jpeg_size(image_path)
+    if suffix == ".webp":
+        return get_webp_size(image_path)
+
+    return get_png_size(image_path)
+
+
+def get_otsu_threshold(mask_gray: np.ndarray, num_zeros: int = 0) -> int:
+    """Get Otsu threshold of a grayscale mask, computed exactly as in cv2.threshold, so
+        that masks can be binarized (in part) with the same result.
+
+    Args:
+        mask_gray (np.ndarray): grayscale (uint8) mask or crop of mask.
+        num_zeros (int, optional): number of additional zero pixels, e.g., outside of
+            the crop. Defaults to 0.
+
+    Returns:
+        int: threshold above which pixels belong to the object.
+    """
+    histogram = cv2.calcHist([mask_gray], [0], None, [256], [0, 256]).ravel()
+    counts = [int(count) for count in histogram]
+    counts[0] += num_zeros
+
+    scale = 1.0 / (mask_gray.size + num_zeros)
+    mu = sum(i * count for i, count in enumerate(counts)) * scale
+
+    # Maximize between-class variance over all thresholds, keeping the first maximum.
+    mu1, q1 = 0.0, 0.0
+    max_sigma, max_value = 0.0, 0
+    epsilon = float(np.finfo(np.float32).eps)
+    for i, count in enumerate(counts):
+        p_i = count * scale
+        mu1 *= q1
+        q1 += p_i
+        q2 = 1.0 - q1
+
+        if min(q1, q2) < epsilon or max(q1, q2) > 1.0 - epsilon:
+            continue
+
+        mu1 = (mu1 + i * p_i) / q1
+        mu2 = (mu - q1 * mu1) / q2
+        sigma = q1 * q2 * (mu1 - mu2) * (mu1 - mu2)
+        if sigma > max_sigma:
+            max_sigma, max_value = sigma, i
+
+    return max_value
+
+
+@dataclass
+class DecodedMask:
+    """Generated mask decoded and binarized once, shared by all label formats. Only the
+    crop containing the object is kept, with a margin of one (background) pixel where
+    possible, so that contours found in the crop equal contours found in the full mask.
+    """
+
+    mask: BlenderLineMask
+    width: int  # Width of full mask.
+    height: int  # Height of full mask.
+    xoffset: int  # Column of full mask at which the crop starts.
+    yoffset: int  # Row of full mask at which the crop starts.
+    binary: np.ndarray  # Binarized crop with values 0 and 1 (uint8).
+
+
+def decode_mask(mask: BlenderLineMask) -> DecodedMask | None:
+    """Decode and binarize generated mask. Pixels are binarized with the Otsu threshold
+        of the full mask, but only in the crop containing all non-zero pixels, which is
+        located with row and column projections.
+
+    Args:
+        mask (BlenderLineMask): reference to mask with image ID, label ID, and image path.
+
+    Returns:
+        DecodedMask | None: decoded mask, or None if the mask is empty.
+    """
+    # Read grayscale mask.
+    mask_gray = cv2.imread(str(mask.path), cv2.IMREAD_GRAYSCALE)
+    height, width = mask_gray.shape
+
+    # Locate non-zero pixels with row and column projections, which are far cheaper
+    # than thresholding the full mask.
+    cols = np.flatnonzero(mask_gray.max(axis=0))
+    rows = np.flatnonzero(mask_gray.max(axis=1))
+    if not len(cols):
+        return None
+
+    # Binarize only the crop containing all non-zero pixels, extended by one pixel. The
+    # Otsu threshold of the full mask is computed from the histogram of the crop, as all
+    # pixels outside of the crop are zero.
+    xoffset, yoffset = max(0, int(cols[0]) - 1), max(0, int(rows[0]) - 1)
+    mask_crop = mask_gray[yoffset : rows[-1] + 2, xoffset : cols[-1] + 2]
+    threshold = get_otsu_threshold(mask_crop, mask_gray.size - mask_crop.size)
+    _, mask_binary = cv2.threshold(mask_crop, threshold, 1, cv2.THRESH_BINARY)
+
+    return DecodedMask(
+        mask=mask,
+        width=width,
+        height=height,
+        xoffset=xoffset,
+        yoffset=yoffset,
+        binary=mask_binary,
+    )
+
+
+def decode_labels(labels_path: pathlib.Path) -> list[DecodedMask]:
+    """Decode masks of all objects from label sidecar written when labels are extracted
+        from the object index pass, so that converters can treat them as decoded mask
+        images. Crops are extended by one pixel where possible, as for mask images.
+        Objects with projected bounding boxes only, without runs, fill their box.
+
+    Args:
+        labels_path (pathlib.Path): absolute location of label sidecar.
+
+    Returns:
+        list[DecodedMask]: decoded mask of every visible object, referring to the
+            sidecar with the pass index of the object as mask ID.
+    """
+    with open(labels_path, "r") as file:
+        sidecar = json.load(file)
+    width, height = sidecar["width"], sidecar["height"]
+
+    decoded_masks = []
+    for object in sidecar["objects"]:
+        # Runs alternate between background and object pixels within the bounding box.
+        x, y, w, h = object["bbox"]
+        if "counts" in object:
+            counts = object["counts"]
+            box = np.repeat(np.arange(len(counts), dtype=np.uint8) % 2, counts)
+        else:
+            box = np.ones(w * h, dtype=np.uint8)
+
+        xoffset, yoffset = max(0, x - 1), max(0, y - 1)
+        binary = np.zeros(
+            (min(height, y + h + 1) - yoffset, min(width, x + w + 1) - xoffset),
+            dtype=np.uint8,
+        )
+        binary[
+            y - yoffset : y - yoffset + h, x - xoffset : x - xoffset + w
+        ] = box.reshape(h, w)
+
+        decoded_masks.append(
+            DecodedMask(
+                mask=BlenderLineMask(
+                    id=str(object["pass_index"]),
+                    path=labels_path,
+                    label=object["label"],
+                    pass_index=object["pass_index"],
+                ),
+                width=width,
+                height=height,
+                xoffset=xoffset,
+                yoffset=yoffset,
+                binary=binary,
+            )
+        )
+
+    return decoded_masks
+
+
+def get_instance_map(
+    decoded_masks: list[DecodedMask], width: int, height: int
+) -> np.ndarray:
+    """Combine decoded masks into a single instance-ID map, in which every pixel holds
+        the position of the mask it belongs to, counting from 1, or 0 for background.
+        Where masks overlap, e.g., at anti-aliased edges, later masks take precedence.
+
+    Args:
+        decoded_masks (list[DecodedMask]): decoded masks of instance.
+        width (int): width of instance image.
+        height (int): height of instance image.
+
+    Returns:
+        np.ndarray: instance-ID map of shape (height, width), of type uint8 if there are
+            fewer than 256 masks, and uint16 otherwise.
+    """
+    if len(decoded_masks) > np.iinfo(np.uint16).max:
+        raise Exception("Instance contains too many masks for an instance-ID map.")
+
+    dtype = np.uint8 if len(decoded_masks) <= np.iinfo(np.uint8).max else np.uint16
+    instance_map = np.zeros((height, width), dtype=dtype)
+    for instance_id, decoded_mask in enumerate(decoded_masks, 1):
+        crop_height, crop_width = decoded_mask.binary.shape
+        instance_map[
+            decoded_mask.yoffset : decoded_mask.yoffset + crop_height,
+            decoded_mask.xoffset : decoded_mask.xoffset + crop_width,
+        ][decoded_mask.binary > 0] = instance_id
+
+    return instance_map
@@ -0,0 +1,215 @@
+import json
+import os
+import pathlib
+import struct
+
+import cv2
+
+from blenderline.utils import LABELS_FILENAME
+
+from .utils import IMAGE_PATTERN, MASK_PATTERN, get_image_size
+
+# Every complete PNG image ends with an empty IEND chunk: its length, type, and CRC.
+PNG_END = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+
+# Every complete JPEG image ends with an end of image marker.
+JPEG_END = b"\xff\xd9"
+
+
+def is_complete(image_path: pathlib.Path, file_size: int) -> bool:
+    """Check that image with a valid header is complete, i.e., not truncated, from its
+        end or, for WebP images, from the file size stored in its header.
+
+    Args:
+        image_path (pathlib.Path): absolute location of PNG, JPEG, or WebP image.
+        file_size (int): size of image file in bytes.
+
+    Returns:
+        bool: whether the image is complete.
+    """
+    # A valid header implies that the file is longer than the end marker.
+    suffix = image_path.suffix.lower()
+    with open(image_path, "rb") as file:
+        if suffix == ".webp":
+            file.seek(4)
+            return struct.unpack("<I", file.read(4))[0] + 8 == file_size
+
+        end = JPEG_END if suffix == ".jpg" else PNG_END
+        file.seek(-len(end), os.SEEK_END)
+        return file.read() == end
+
+
+def get_image_problem(
+    image_path: pathlib.Path, decode: bool = True, size: tuple[int, int] | None = None
+) -> str | None:
+    """Check that PNG, JPEG, or WebP image is complete and, optionally, decodable.
+        Truncated images are recognized by their missing end without decoding them.
+
+    Args:
+        image_path (pathlib.Path): absolute location of image.
+        decode (bool, optional): whether to decode the image. Defaults to True.
+        size (tuple[int, int] | None, optional): width and height the image must have.
+            Defaults to None, i.e., any size.
+
+    Returns:
+        str | None: description of the problem, or None if the image is valid.
+    """
+    try:
+        file_size = os.stat(image_path).st_size
+    except FileNotFoundError:
+        return "is missing"
+    if file_size == 0:
+        return "is empty"
+
+    try:
+        width, height = get_image_size(image_path)
+    except Exception:
+        return f"has no valid {image_path.suffix[1:].upper()} header"
+
+    if not is_complete(image_path, file_size):
+        return "is truncated"
+
+    if size is not None and (width, height) != size:
+        return f"has size {width}x{height} instead of {size[0]}x{size[1]}"
+
+    if decode:
+        image = cv2.imread(str(image_path), cv2.IMREAD_UNCHANGED)
+        if image is None or image.shape[:2] != (height, width):
+            return "cannot be decoded"
+
+    return None
+
+
+def get_labels_problem(
+    labels_path: pathlib.Path, size: tuple[int, int] | None = None
+) -> str | None:
+    """Check that label sidecar is complete, i.e., can be parsed, and that the mask of
+        every object, if any, covers its bounding box.
+
+    Args:
+        labels_path (pathlib.Path): absolute location of label sidecar.
+        size (tuple[int, int] | None, optional): width and height of the image. Defaults
+            to None, i.e., any size.
+
+    Returns:
+        str | None: description of the problem, or None if the sidecar is valid.
+    """
+    try:
+        with open(labels_path, "r") as file:
+            sidecar = json.load(file)
+    except ValueError:
+        return "cannot be parsed"
+
+    if size is not None and (sidecar["width"], sidecar["height"]) != size:
+        return "does not match the image size"
+    for object in sidecar["objects"]:
+        _, _, w, h = object["bbox"]
+        if "counts" in object and sum(object["counts"]) != w * h:
+            return f"has an invalid mask for pass index {object['pass_index']}"
+
+    return None
+
+
+def get_instance_problems(
+    instance_path: pathlib.Path,
+    record: dict | None = None,
+    label_ids: set[str] | None = None,
+    decode: bool = True,
+) -> list[str]:
+    """Check instance folder for problems that would make conversion fail or produce
+        wrong labels, e.g., after a crash or a full disk.
+
+    Args:
+        instance_path (pathlib.Path): absolute location of instance folder.
+        record (dict | None, optional): manifest record of instance to check outputs
+            against. Defaults to None.
+        label_ids (set[str] | None, optional): label IDs of the label mapping to check
+            mask labels against. Defaults to None.
+        decode (bool, optional): whether to decode all images, rather than only check
+            their headers and ends. Defaults to True.
+
+    Returns:
+        list[str]: descriptions of the problems of the instance, empty if it is valid.
+    """
+    if not instance_path.is_dir():
+        return ["instance folder is missing"]
+
+    # Classify files as converters do, flagging files that look like BlenderLine outputs
+    # but do not follow the filename patterns.
+    problems: list[str] = []
+    images, masks = [], []
+    with os.scandir(instance_path) as entries:
+        filenames = sorted(entry.name for entry in entries)
+    for filename in filenames:
+        if IMAGE_PATTERN.search(filename):
+            images.append(filename)
+        elif match := MASK_PATTERN.search(filename):
+            masks.append((filename, match))
+        elif filename.startswith(("image__", "mask__")):
+            problems.append(f"{filename} has an invalid filename")
+
+    # Check that there is exactly one image, or none for layouts generated without
+    # rendering, and that all masks have a known label.
+    expected_images = 0 if record is not None and record["image"] is None else 1
+    if len(images) != expected_images:
+        problems.append(f"{len(images)} images instead of {expected_images}")
+    for filename, match in masks:
+        if label_ids is not None and match.group(1) not in label_ids:
+            problems.append(f"{filename} has unknown label {match.group(1)}")
+
+    # Check outputs against the manifest record written once the instance completed.
+    if record is not None:
+        if record["image"] is not None and record["image"] not in images:
+            problems.append(f"image {record['image']} listed in manifest is missing")
+        mask_filenames = {filename for filename, _ in masks}
+        missing = [
+            mask["file"]
+            for mask in record["masks"]
+            if mask["file"] not in mask_filenames
+        ]
+        if missing:
+            problems.append(f"{len(missing)} masks listed in manifest are missing")
+        if "labels" in record and record["labels"] not in filenames:
+            problems.append(f"label sidecar {record['labels']} is missing")
+        if len(masks) != len(record["masks"]):
+            problems.append(
+                f"{len(masks)} masks instead of {len(record['masks'])} listed in "
+                "manifest"
+            )
+
+    # Check that all images and the label sidecar are complete, and that masks match
+    # the image size.
+    size = None
+    for filename in images:
+        if problem := get_image_problem(instance_path / filename, decode):
+            problems.append(f"{filename} {problem}")
+        elif len(images) == 1:
+            size = get_image_size(instance_path / filename)
+    for filename, _ in masks:
+        if problem := get_image_problem(instance_path / filename, decode, size):
+            problems.append(f"{filename} {problem}")
+    if LABELS_FILENAME in filenames:
+        if problem := get_labels_problem(instance_path / LABELS_FILENAME, size):
+            problems.append(f"{LABELS_FILENAME} {problem}")
+
+    return problems
+
+
+class InstanceVerification:
+    """Picklable verification function that passes through the split and index of the
+    verified instance, so that results can be returned out of order.
+    """
+
+    def __init__(self, label_ids: set[str] | None, decode: bool) -> None:
+        self.label_ids = label_ids
+        self.decode = decode
+
+    def __call__(
+        self, task: tuple[str, str, pathlib.Path, dict | None]
+    ) -> tuple[str, str, list[str]]:
+        split, index, instance_path, record = task
+        return (
+            split,
+            index,
+            get_instance_problems(instance_path, record, self.label_ids, self.decode),
+        )
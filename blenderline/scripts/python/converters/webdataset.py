@@ -0,0 +1,238 @@
+import io
+import json
+import os
+import pathlib
+import tarfile
+from typing import Any
+
+import cv2
+
+from .base import BaseConverter
+from .images import ImagePlacer
+from .utils import BlenderLineInstance, DecodedMask, get_image_size, get_instance_map
+
+# Size of write buffer of shard files, so that shards are written with large
+# sequential writes rather than one write per tar header and member.
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+
+
+def get_member_size(data_size: int) -> int:
+    """Get size of data of tar member, padded to whole tar blocks.
+
+    Args:
+        data_size (int): size of data in bytes.
+
+    Returns:
+        int: padded size in bytes.
+    """
+    return -(-data_size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+
+def get_object_annotation(
+    decoded_mask: DecodedMask, minarea: float = 0.005
+) -> dict[str, Any] | None:
+    """Get object annotation with label ID, bounding box, and area from BlenderLine
+        generated pixel mask.
+
+    Args:
+        decoded_mask (DecodedMask): decoded mask with label ID and binarized crop.
+        minarea (float): minimum area an object mask must have to be included.
+
+    Returns:
+        dict[str, Any] | None: object annotation with bounding box in pixels as (xmin,
+            ymin, width, height), or None if minarea is not exceeded.
+    """
+    # Return None if mask is too small (< area_threshold).
+    area = cv2.countNonZero(decoded_mask.binary)
+    if area / (decoded_mask.width * decoded_mask.height) < minarea:
+        return None
+
+    x, y, w, h = cv2.boundingRect(decoded_mask.binary)
+    return {
+        "label": int(decoded_mask.mask.label),
+        "bbox": [decoded_mask.xoffset + x, decoded_mask.yoffset + y, w, h],
+        "area": area,
+    }
+
+
+class ShardWriter:
+    """Writes samples of a split to sequential tar shards of a maximum size, and lists
+    the location of every sample member in a shard index for random access.
+    """
+
+    def __init__(self, split_path: pathlib.Path, shard_size: int) -> None:
+        """Create shard writer.
+
+        Args:
+            split_path (pathlib.Path): absolute location of split folder to write shards
+                and shard index to.
+            shard_size (int): maximum size of a shard in bytes, unless it holds a
+                single larger sample.
+        """
+        # Save object attributes.
+        self.split_path = split_path
+        self.shard_size = shard_size
+
+        # Shard index with one line per sample, appended as samples are written.
+        self.index_file = open(split_path / "index.jsonl", "w+")
+
+        # Shard currently being written.
+        self.shard_count = 0
+        self.shard_name: str | None = None
+        self.shard_file = None
+        self.tar: tarfile.TarFile | None = None
+
+    def open_shard(self) -> None:
+        """Close current shard, if any, and open next shard."""
+        self.close_shard()
+        self.shard_name = f"{self.split_path.name}-{self.shard_count:06d}.tar"
+        self.shard_file = open(
+            self.split_path / self.shard_name, "wb", buffering=WRITE_BUFFER_SIZE
+        )
+        self.tar = tarfile.open(fileobj=self.shard_file, mode="w")
+        self.shard_count += 1
+
+    def close_shard(self) -> None:
+        """Finalize current shard, if any."""
+        if self.tar is not None:
+            self.tar.close()
+            self.shard_file.close()
+            self.tar, self.shard_file = None, None
+
+    def write(self, key: str, members: dict[str, bytes], mtime: int) -> None:
+        """Write sample to current shard, or to the next shard if the sample does not
+            fit in the current shard.
+
+        Args:
+            key (str): key of sample, shared by all its members.
+            members (dict[str, bytes]): data of sample members by file extension.
+            mtime (int): modification time of sample members, in whole seconds so
+                that no extended headers are needed.
+        """
+        # Every member takes a header block and its data padded to whole blocks.
+        sample_size = sum(
+            tarfile.BLOCKSIZE + get_member_size(len(data)) for data in members.values()
+        )
+        if self.tar is None or (
+            self.tar.offset and self.tar.offset + sample_size > self.shard_size
+        ):
+            self.open_shard()
+
+        # Write members, recording the offset and size of their data within the shard.
+        offsets = {}
+        for extension, data in members.items():
+            tarinfo = tarfile.TarInfo(f"{key}.{extension}")
+            tarinfo.size = len(data)
+            tarinfo.mtime = mtime
+            self.tar.addfile(tarinfo, io.BytesIO(data))
+            data_offset = self.tar.offset - get_member_size(len(data))
+            offsets[extension] = [data_offset, len(data)]
+
+        self.index_file.write(
+            json.dumps({"key": key, "shard": self.shard_name, "members": offsets})
+            + "\n"
+        )
+
+    def close(self) -> None:
+        """Finalize current shard and shard index."""
+        self.close_shard()
+        self.index_file.close()
+
+
+class WebDatasetConverter(BaseConverter):
+    """Converter to WebDataset format, which packs the image, annotations, and
+    optionally an instance-ID map of every instance into sequential tar shards per split,
+    so that training reads few large files instead of many small ones.
+    """
+
+    # Samples cannot be removed from tar shards.
+    incremental = False
+
+    def __init__(
+        self,
+        target_path: pathlib.Path,
+        minarea: float = 0.005,
+        shard_size: int = 500,
+        shard_masks: bool = False,
+        **kwargs,
+    ) -> None:
+        """Create WebDataset converter.
+
+        Args:
+            target_path (pathlib.Path): absolute location of converted dataset.
+            minarea (float, optional): minimum area an object mask must have to be
+                included. Defaults to 0.005.
+            shard_size (int, optional): maximum size of a shard in megabytes. Defaults
+                to 500.
+            shard_masks (bool, optional): whether to include an instance-ID map of
+                every instance as PNG image. Defaults to False.
+        """
+        super().__init__(target_path, minarea)
+        self.shard_size = shard_size * 1000 * 1000
+        self.shard_masks = shard_masks
+        self.writers: dict[str, ShardWriter] = {}
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Shard writers hold open files and are only used by the calling process, so
+        # they are not passed to conversion worker processes.
+        return {**self.__dict__, "writers": {}}
+
+    def begin_split(self, split: str) -> None:
+        # Create split folder with shard writer.
+        (self.target_path / split).mkdir(parents=True)
+        self.writers[split] = ShardWriter(self.target_path / split, self.shard_size)
+
+    def convert_instance(
+        self, instance: BlenderLineInstance, decoded_masks: list[DecodedMask | None]
+    ) -> dict[str, bytes]:
+        # Convert decoded masks to object annotations, skipping empty masks. Image
+        # dimensions are read from the image header, as an instance may not contain any
+        # object.
+        width, height = get_image_size(instance.image.path)
+        kept_masks, annotations = [], []
+        for decoded_mask in decoded_masks:
+            if decoded_mask and (
+                annotation := get_object_annotation(decoded_mask, self.minarea)
+            ):
+                kept_masks.append(decoded_mask)
+                annotations.append(annotation)
+
+        members = {
+            "json": json.dumps(
+                {"width": width, "height": height, "annotations": annotations}
+            ).encode()
+        }
+
+        # Encode instance-ID map, in which pixel value i belongs to annotation i - 1.
+        if self.shard_masks:
+            instance_map = get_instance_map(kept_masks, width, height)
+            members["mask.png"] = cv2.imencode(".png", instance_map)[1].tobytes()
+
+        return members
+
+    def write_instance(
+        self,
+        split: str,
+        instance: BlenderLineInstance,
+        result: dict[str, bytes],
+        image_placer: ImagePlacer,
+    ) -> list[pathlib.Path]:
+        # Pack generated image and converted members into shard, keyed by image ID, with
+        # the image member named after the image format. The image is read from its
+        # placement by another converter, if any, as it may have been moved there.
+        image = instance.image
+        image_path = image_placer.placed_paths.get(image.path, image.path)
+        self.writers[split].write(
+            image.id,
+            {image.path.suffix[1:]: image_path.read_bytes(), **result},
+            int(os.stat(image_path).st_mtime),
+        )
+
+        return []
+
+    def finish(self, label_mapping: dict[str, str]) -> None:
+        # Finalize shards, and write label mapping next to the splits.
+        for writer in self.writers.values():
+            writer.close()
+        with open(self.target_path / "label_mapping.json", "w+") as file:
+            json.dump(label_mapping, file)
@@ -0,0 +1,128 @@
+import pathlib
+
+import yaml
+
+from .base import BaseConverter
+from .images import ImagePlacer
+from .label_cache import LabelCache
+from .utils import BlenderLineInstance, DecodedMask
+
+
+class YoloConverter(BaseConverter):
+    """Base class for converters to YOLO dataset formats, which consist of an image and a
+    label file per instance, and a YAML metadata file.
+    """
+
+    def __init__(
+        self,
+        target_path: pathlib.Path,
+        minarea: float = 0.005,
+        precision: int = 6,
+        **kwargs,
+    ) -> None:
+        """Create YOLO converter.
+
+        Args:
+            target_path (pathlib.Path): absolute location of converted dataset.
+            minarea (float, optional): minimum area an object mask must have to be
+                included. Defaults to 0.005.
+            precision (int, optional): number of decimals of label coordinates.
+                Defaults to 6.
+        """
+        super().__init__(target_path, minarea)
+        self.precision = precision
+
+        # Image, label, and label cache subfolders.
+        self.images_path = target_path / "images"
+        self.labels_path = target_path / "labels"
+        self.label_cache_path = target_path / "label_cache"
+        self.splits: list[str] = []
+
+    def get_label(self, decoded_mask: DecodedMask) -> str | None:
+        """Get YOLO label from decoded mask.
+
+        Args:
+            decoded_mask (DecodedMask): decoded mask.
+
+        Returns:
+            str | None: YOLO label line(s), or None if minarea is not exceeded.
+        """
+        raise NotImplementedError
+
+    def begin(self, source_path: pathlib.Path) -> None:
+        # Create image and label subfolders, unless converting incrementally to an
+        # earlier conversion.
+        self.images_path.mkdir(parents=True, exist_ok=True)
+        self.labels_path.mkdir(parents=True, exist_ok=True)
+
+        # Prepopulate YOLO metadata. Paths to training, validation, and testing data will
+        # be added when looping over the data splits, and label names once conversion
+        # finishes.
+        self.metadata_path = self.target_path / f"{source_path.name}.yaml"
+        self.metadata = {
+            "path": "/".join([".."] + list(self.target_path.parts[-2:])),
+            "train": None,
+            "val": None,
+            "test": None,
+            "names": None,
+        }
+
+    def begin_split(self, split: str) -> None:
+        # Create split folder within image and label directories
+        (self.images_path / split).mkdir(exist_ok=True)
+        (self.labels_path / split).mkdir(exist_ok=True)
+        self.splits.append(split)
+
+        # Automatically detect split names as training, validation, or testing.
+        # This may be done more cleanly, but YOLO expects slightly unusual names such
+        # as "val" for the validation set, and putting restrictions on the split
+        # naming possibilities is undesired. In most cases, this should work fine.
+        if "train" in split:
+            self.metadata["train"] = f"images/{split}"
+        if "val" in split:
+            self.metadata["val"] = f"images/{split}"
+        if "test" in split:
+            self.metadata["test"] = f"images/{split}"
+
+    def convert_instance(
+        self, instance: BlenderLineInstance, decoded_masks: list[DecodedMask | None]
+    ) -> list[str]:
+        # Convert decoded masks to labels, skipping empty masks.
+        return [
+            label
+            for decoded_mask in decoded_masks
+            if decoded_mask and (label := self.get_label(decoded_mask))
+        ]
+
+    def write_instance(
+        self,
+        split: str,
+        instance: BlenderLineInstance,
+        result: list[str],
+        image_placer: ImagePlacer,
+    ) -> list[pathlib.Path]:
+        # Place generated image in target dataset location, and merge labels into one
+        # label file corresponding to image ID.
+        image = instance.image
+        image_path = self.images_path / split / f"{image.id}{image.path.suffix}"
+        label_path = self.labels_path / split / f"{image.id}.txt"
+        image_placer.place(image.path, image_path)
+        with open(label_path, "w+") as file:
+            file.write("\n".join(result))
+
+        return [image_path, label_path]
+
+    def finish(self, label_mapping: dict[str, str]) -> None:
+        # Create YOLO metadata file.
+        self.metadata["names"] = label_mapping
+        with open(self.metadata_path, "w+") as file:
+            yaml.dump(self.metadata, file, sort_keys=False)
+
+        # Write binary label cache per split, so that loaders need not parse every
+        # label file.
+        for split in self.splits:
+            LabelCache.write(
+                self.labels_path / split,
+                self.images_path / split,
+                self.label_cache_path / split,
+            )
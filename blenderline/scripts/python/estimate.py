@@ -0,0 +1,364 @@
+import functools
+import math
+import operator
+import os
+import pathlib
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+
+blenderline_dir = pathlib.Path(__file__).parent.parent.parent.parent
+sys.path.append(str(blenderline_dir))
+
+from blenderline.scripts.python.workers import (  # noqa: E402
+    launch_workers,
+    wait_for_workers,
+)
+from blenderline.utils import get_setting, read_progress  # noqa: E402
+
+# Two-sided 95% Student t critical values for 1 to 30 degrees of freedom. The normal
+# approximation (1.96) is used for larger samples.
+T_CRITICAL_95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]  # fmt: skip
+
+# Split name used for warm-up renders, which are excluded from all measurements.
+WARMUP_SPLIT = ".warmup"
+
+
+@dataclass(frozen=True, eq=True)
+class Interval:
+    """Estimate with 95% confidence interval."""
+
+    mean: float
+    low: float
+    high: float
+
+    def __add__(self, other: "Interval | float") -> "Interval":
+        # Constants shift the interval, whereas half-widths of independent estimates
+        # are combined in quadrature.
+        if isinstance(other, (int, float)):
+            return Interval(self.mean + other, self.low + other, self.high + other)
+        mean = self.mean + other.mean
+        half_width = math.hypot(self.high - self.mean, other.high - other.mean)
+        return Interval(mean, max(0.0, mean - half_width), mean + half_width)
+
+    def __mul__(self, factor: float) -> "Interval":
+        return Interval(self.mean * factor, self.low * factor, self.high * factor)
+
+
+@dataclass(frozen=True, eq=True)
+class SplitEstimate:
+    """Extrapolated cost of generating a dataset split."""
+
+    name: str
+    size: int
+    samples: int
+    seconds: Interval  # Render time summed over all images.
+    bytes: Interval
+    inodes: Interval
+
+
+@dataclass(frozen=True, eq=True)
+class DatasetEstimate:
+    """Extrapolated cost of generating a dataset."""
+
+    splits: list[SplitEstimate]
+    workers: int
+    hours: Interval  # Wall-clock time with all workers.
+    bytes: Interval
+    inodes: Interval
+    free_bytes: int
+    free_inodes: int | None  # None if the platform does not report inodes.
+
+
+def get_interval(values: list[float], size: int) -> Interval:
+    """Extrapolate sample of per-instance values to the total over a split.
+
+    Args:
+        values (list[float]): measured per-instance values.
+        size (int): number of instances in split.
+
+    Returns:
+        Interval: estimated total with 95% confidence interval.
+    """
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return Interval(mean, mean, mean) * size
+
+    degrees_of_freedom = len(values) - 1
+    t_critical = T_CRITICAL_95[min(degrees_of_freedom, len(T_CRITICAL_95)) - 1]
+    if degrees_of_freedom > len(T_CRITICAL_95):
+        t_critical = 1.96
+
+    half_width = t_critical * statistics.stdev(values) / math.sqrt(len(values))
+    return Interval(mean, max(0.0, mean - half_width), mean + half_width) * size
+
+
+def get_stratified_indices(size: int, samples: int) -> list[int]:
+    """Get instance indices spread evenly over a split.
+
+    Args:
+        size (int): number of instances in split.
+        samples (int): maximum number of instances to sample.
+
+    Returns:
+        list[int]: sampled instance indices.
+    """
+    samples = min(size, samples)
+    return [int((stratum + 0.5) * size / samples) for stratum in range(samples)]
+
+
+def get_instance_footprint(instance_path: pathlib.Path) -> tuple[int, int]:
+    """Get disk usage of a generated instance folder.
+
+    Args:
+        instance_path (pathlib.Path): path to instance folder.
+
+    Returns:
+        tuple[int, int]: number of bytes of image and masks, and number of inodes
+            including the instance folder itself.
+    """
+    sizes = [entry.stat().st_size for entry in os.scandir(instance_path)]
+    return sum(sizes), len(sizes) + 1
+
+
+def get_existing_folder(target_path: pathlib.Path) -> pathlib.Path:
+    """Get closest existing folder of the dataset target, which is on the volume the
+        dataset is generated on, as the target folder may not exist yet.
+
+    Args:
+        target_path (pathlib.Path): absolute location of the generated dataset.
+
+    Returns:
+        pathlib.Path: target folder or its closest existing parent folder.
+    """
+    existing_path = target_path
+    while not existing_path.exists():
+        existing_path = existing_path.parent
+
+    return existing_path
+
+
+def get_free_space(target_path: pathlib.Path) -> tuple[int, int | None]:
+    """Get free bytes and inodes on the volume the dataset is generated on.
+
+    Args:
+        target_path (pathlib.Path): absolute location of the generated dataset, which may
+            not exist yet.
+
+    Returns:
+        tuple[int, int | None]: free bytes and inodes, or None if inodes are not
+            reported on the current platform.
+    """
+    existing_path = get_existing_folder(target_path)
+    free_bytes = shutil.disk_usage(existing_path).free
+    free_inodes = os.statvfs(existing_path).f_favail if hasattr(os, "statvfs") else None
+
+    return free_bytes, free_inodes
+
+
+def estimate_dataset(
+    settings: dict,
+    blender_path: str,
+    config_path: pathlib.Path,
+    target_path: pathlib.Path,
+    overlays: list[pathlib.Path],
+    worker_count: int,
+    samples: int = 5,
+    core_sets: list[list[int]] = None,
+) -> DatasetEstimate:
+    """Render a stratified sample of instances per split with the real configuration and
+        extrapolate wall-clock time, disk usage, and inode count of the full dataset.
+
+    Args:
+        settings (dict): settings dictionary.
+        blender_path (str): Blender start command.
+        config_path (pathlib.Path): absolute location of the configuration file.
+        target_path (pathlib.Path): absolute location of the generated dataset.
+        overlays (list[pathlib.Path]): absolute locations of configuration overlays.
+        worker_count (int): number of worker processes the dataset is generated with.
+        samples (int, optional): number of instances to render per split. Defaults to 5.
+        core_sets (list[list[int]], optional): CPU indices to pin every worker to, as in
+            the full run. Defaults to None, i.e., workers are not pinned.
+
+    Returns:
+        DatasetEstimate: extrapolated cost of generating the dataset.
+    """
+    splits: list[dict] = get_setting(settings, "dataset.splits", [])
+    name = get_setting(settings, "dataset.name", "dataset")
+
+    # Sample instances per split and distribute them over the same number of workers as
+    # the full run, so that measurements include contention between workers. Every
+    # worker starts with a warm-up render that is excluded from the measurements.
+    sampled_tasks = [
+        {"split": split["name"], "index": index}
+        for split in splits
+        for index in get_stratified_indices(split["size"], samples)
+    ]
+    tasks = [
+        [{"split": WARMUP_SPLIT, "index": worker_index}]
+        + sampled_tasks[worker_index::worker_count]
+        for worker_index in range(worker_count)
+    ]
+
+    # Render on the volume the dataset is generated on, so that measurements include
+    # the cost of writing outputs there, rather than to, e.g., a tmpfs.
+    with tempfile.TemporaryDirectory(
+        prefix=".blenderline-estimate-", dir=get_existing_folder(target_path)
+    ) as temp_folder:
+        temp_path = pathlib.Path(temp_folder)
+
+        start_time = time.time()
+        workers = launch_workers(
+            blender_path=blender_path,
+            config_path=config_path,
+            target_path=temp_path / "target",
+            overlays=overlays,
+            worker_count=worker_count,
+            work_dir=temp_path,
+            tasks=tasks,
+            core_sets=core_sets,
+        )
+        if returncode := wait_for_workers(workers):
+            raise Exception(f"Calibration run failed ({returncode}).")
+
+        # Collect per-instance render time and footprint of sampled instances, and the
+        # startup time of workers until their first render started.
+        render_times: dict[str, list[float]] = {split["name"]: [] for split in splits}
+        footprints: dict[str, list[tuple[int, int]]] = {
+            split["name"]: [] for split in splits
+        }
+        startup_times: list[float] = []
+        for worker in workers:
+            records, _ = read_progress(worker.progress_path)
+            if records:
+                first_record = records[0]
+                startup_times.append(
+                    first_record["timestamp"] - first_record["render_time"] - start_time
+                )
+            for record in records:
+                if record["split"] == WARMUP_SPLIT:
+                    continue
+                render_times[record["split"]].append(record["render_time"])
+                footprints[record["split"]].append(
+                    get_instance_footprint(
+                        temp_path
+                        / "target"
+                        / name
+                        / record["split"]
+                        / str(record["index"])
+                    )
+                )
+
+    # Extrapolate measurements per split.
+    split_estimates: list[SplitEstimate] = []
+    for split in splits:
+        if not render_times[split["name"]]:
+            continue
+        split_estimates.append(
+            SplitEstimate(
+                name=split["name"],
+                size=split["size"],
+                samples=len(render_times[split["name"]]),
+                seconds=get_interval(render_times[split["name"]], split["size"]),
+                bytes=get_interval(
+                    [size for size, _ in footprints[split["name"]]], split["size"]
+                ),
+                inodes=get_interval(
+                    [inodes for _, inodes in footprints[split["name"]]], split["size"]
+                ),
+            )
+        )
+    if not split_estimates:
+        raise Exception("Please configure at least one non-empty split.")
+
+    # Combine split estimates. Wall-clock time assumes instances are spread evenly over
+    # workers, which all pay the measured startup time once.
+    render_seconds = functools.reduce(
+        operator.add, [estimate.seconds for estimate in split_estimates]
+    )
+    startup_seconds = statistics.fmean(startup_times) if startup_times else 0.0
+    wall_seconds = render_seconds * (1 / worker_count) + startup_seconds
+
+    free_bytes, free_inodes = get_free_space(target_path)
+
+    return DatasetEstimate(
+        splits=split_estimates,
+        workers=worker_count,
+        hours=wall_seconds * (1 / 3600),
+        bytes=functools.reduce(
+            operator.add, [estimate.bytes for estimate in split_estimates]
+        ),
+        inodes=functools.reduce(
+            operator.add, [estimate.inodes for estimate in split_estimates]
+        ),
+        free_bytes=free_bytes,
+        free_inodes=free_inodes,
+    )
+
+
+def print_estimate(estimate: DatasetEstimate) -> None:
+    """Print human-readable report of dataset estimate.
+
+    Args:
+        estimate (DatasetEstimate): extrapolated cost of generating the dataset.
+    """
+
+    def format_interval(interval: Interval, scale: float, unit: str) -> str:
+        return (
+            f"{interval.mean / scale:.2f} {unit} "
+            f"[{interval.low / scale:.2f}, {interval.high / scale:.2f}]"
+        )
+
+    for split in estimate.splits:
+        print(
+            f"{split.name} ({split.size} images, {split.samples} sampled): "
+            f"{format_interval(split.seconds, 3600, 'render hours')}, "
+            f"{format_interval(split.bytes, 1e9, 'GB')}, "
+            f"{format_interval(split.inodes, 1, 'inodes')}"
+        )
+    print(
+        f"Total ({estimate.workers} workers, 95% confidence): "
+        f"{format_interval(estimate.hours, 1, 'hours')}, "
+        f"{format_interval(estimate.bytes, 1e9, 'GB')} "
+        f"({estimate.free_bytes / 1e9:.2f} GB free), "
+        f"{format_interval(estimate.inodes, 1, 'inodes')}"
+        + (
+            f" ({estimate.free_inodes} free)"
+            if estimate.free_inodes is not None
+            else ""
+        )
+    )
+
+
+def get_budget_violations(
+    estimate: DatasetEstimate, max_hours: float = None, max_disk: float = None
+) -> list[str]:
+    """Check upper bounds of dataset estimate against budgets and free space.
+
+    Args:
+        estimate (DatasetEstimate): extrapolated cost of generating the dataset.
+        max_hours (float, optional): wall-clock budget in hours. Defaults to None.
+        max_disk (float, optional): disk budget in GB. Defaults to None.
+
+    Returns:
+        list[str]: descriptions of violated budgets, empty if the dataset fits.
+    """
+    violations: list[str] = []
+
+    if max_hours is not None and estimate.hours.high > max_hours:
+        violations.append(f"generation may take up to {estimate.hours.high:.2f} hours")
+    if max_disk is not None and estimate.bytes.high / 1e9 > max_disk:
+        violations.append(f"dataset may take up to {estimate.bytes.high / 1e9:.2f} GB")
+    if estimate.bytes.high > estimate.free_bytes:
+        violations.append("dataset may not fit in the free disk space")
+    if estimate.free_inodes is not None and estimate.inodes.high > estimate.free_inodes:
+        violations.append("dataset may not fit in the free inodes")
+
+    return violations
@@ -1,20 +1,111 @@
+import json
 import os
 import pathlib
-import signal
-import subprocess
 import sys
+import time
 
 blenderline_dir = pathlib.Path(__file__).parent.parent.parent.parent
 sys.path.append(str(blenderline_dir))
 
+from blenderline.scripts.python.estimate import (  # noqa: E402
+    estimate_dataset,
+    get_budget_violations,
+    print_estimate,
+)
+from blenderline.scripts.python.placement import get_core_sets  # noqa: E402
+from blenderline.scripts.python.supervisor import WorkerSupervisor  # noqa: E402
+from blenderline.scripts.python.workers import get_blender_path  # noqa: E402
+from blenderline.utils import (  # noqa: E402
+    get_setting,
+    load_settings,
+    read_instance_list,
+)
 
-def run_generate(config: str, target: str = None, blender: str = None) -> None:
+# Name of folder next to generated datasets in which generation bookkeeping is kept.
+WORK_DIR_NAME = ".blenderline"
+
+# Name of the file in the work folder holding the state of the last generation, i.e.,
+# running, complete, or failed, which `blenderline convert --follow` waits for.
+STATUS_FILENAME = "status.json"
+GENERATION_STATES = ["running", "complete", "failed"]
+
+
+def write_label_mapping(settings: dict, dataset_path: pathlib.Path) -> None:
+    """Write label mapping for a dataset generated by supervised workers, as individual
+        workers cannot tell whether the dataset is complete.
+
+    Args:
+        settings (dict): settings dictionary.
+        dataset_path (pathlib.Path): absolute location of the dataset root folder.
+    """
+    label_mapping = {
+        item["label"]: item["label_name"]
+        for item in get_setting(settings, "items.entries", [])
+    }
+    with open(dataset_path / "label_mapping.json", mode="+wt") as file:
+        json.dump(label_mapping, file)
+
+
+def write_status(work_path: pathlib.Path, state: str, reason: str = None) -> None:
+    """Write state of generation to the status file in the work folder, replacing it
+        atomically so that it is never read partially.
+
+    Args:
+        work_path (pathlib.Path): absolute location of the work folder of the dataset.
+        state (str): state of generation, one of GENERATION_STATES.
+        reason (str, optional): reason for a failed generation. Defaults to None.
+    """
+    temporary_path = work_path / f".{STATUS_FILENAME}.tmp"
+    with open(temporary_path, mode="wt") as file:
+        json.dump({"state": state, "reason": reason, "timestamp": time.time()}, file)
+    os.replace(temporary_path, work_path / STATUS_FILENAME)
+
+
+def read_status(work_path: pathlib.Path) -> dict | None:
+    """Read state of generation from the status file in the work folder.
+
+    Args:
+        work_path (pathlib.Path): absolute location of the work folder of the dataset.
+
+    Returns:
+        dict | None: "state", "reason", and "timestamp" of generation, or None if no
+            supervised generation started.
+    """
+    try:
+        with open(work_path / STATUS_FILENAME, mode="rt") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def run_generate(
+    config: str,
+    target: str = None,
+    blender: str = None,
+    overlays: list[str] = None,
+    workers: int = None,
+    estimate: bool = False,
+    estimate_samples: int = 5,
+    max_hours: float = None,
+    max_disk: float = None,
+    instances: str = None,
+    allow_partial: bool = False,
+) -> None:
     # Get absolute path to configuration file and check that it is valid, i.e., exists
     # and is a JSON file.
     config_path = pathlib.Path(os.path.abspath(config))
     if not config_path.is_file() or config_path.suffix != ".json":
         raise Exception("Please specify a valid configuration file.")
 
+    # Get absolute paths to configuration overlays, e.g., generated by `blenderline tune`.
+    overlay_paths = [
+        pathlib.Path(os.path.abspath(overlay)) for overlay in overlays or []
+    ]
+    for overlay_path in overlay_paths:
+        if not overlay_path.is_file() or overlay_path.suffix != ".json":
+            raise Exception("Please specify a valid configuration overlay.")
+    settings = load_settings(config_path, overlay_paths)
+
     # Get absolute path to target directory if given, else, set target directory to
     # current working directory. Existence need not be checked, as Blender creates
     # all intermediate folders in the rendering process.
@@ -23,44 +114,143 @@ def run_generate(config: str, target: str = None, blender: str = None) -> None:
     else:
         target_path = pathlib.Path(os.getcwd())
 
-    # Append Blender start command to path if given, else, assume Blender start command
-    # is available on path and can be called using `blender`. No verification is performed
-    # on the given path, as this is likely platform-dependent.
-    if blender:
-        blender_path = pathlib.Path(blender) / "blender"
+    # Number of Blender processes to distribute generation over. The command line
+    # argument takes precedence over the (overlaid) configuration file.
+    worker_count = workers or get_setting(settings, "generation.workers", 1)
+
+    # Pin workers to disjoint core sets that do not straddle NUMA nodes, unless disabled.
+    core_sets = None
+    if get_setting(settings, "generation.pin_workers", True):
+        core_sets = get_core_sets(worker_count)
+
+    # Estimate cost of generating the full dataset with a calibration run, if desired or
+    # required to enforce a budget. Generation is aborted if the dataset may exceed the
+    # budget or does not fit on the volume.
+    if estimate or max_hours is not None or max_disk is not None:
+        dataset_estimate = estimate_dataset(
+            settings=settings,
+            blender_path=get_blender_path(blender),
+            config_path=config_path,
+            target_path=target_path,
+            overlays=overlay_paths,
+            worker_count=worker_count,
+            samples=estimate_samples,
+            core_sets=core_sets,
+        )
+        print_estimate(dataset_estimate)
+
+        if violations := get_budget_violations(dataset_estimate, max_hours, max_disk):
+            raise Exception(f"Generation aborted: {', '.join(violations)}.")
+        if estimate:
+            return
+
+    # Workers report progress and memory telemetry per generated image to progress
+    # files in a work folder next to the dataset.
+    dataset_name = get_setting(settings, "dataset.name", "dataset")
+    work_path = target_path / WORK_DIR_NAME / dataset_name
+    work_path.mkdir(parents=True, exist_ok=True)
+
+    # Distribute instances over workers round-robin. If a list of instances is given,
+    # e.g., invalid instances found by `blenderline verify` or quarantined instances,
+    # only those are (re)generated.
+    instances_path = pathlib.Path(os.path.abspath(instances)) if instances else None
+    if instances_path and not instances_path.is_file():
+        raise Exception("Please specify a valid list of instances to generate.")
+    split_sizes = {}
+    for split in get_setting(settings, "dataset.splits", []):
+        if "name" not in split or "size" not in split:
+            raise Exception("Invalid split configured. Specify name and size keys")
+        split_sizes[split["name"]] = split["size"]
+    if instances_path:
+        instance_list = list(
+            dict.fromkeys(
+                (split, int(index))
+                for split, index in read_instance_list(instances_path)
+            )
+        )
+        for split, index in instance_list:
+            if not 0 <= index < split_sizes.get(split, 0):
+                raise Exception(
+                    f"Please make sure that listed instance {split}/{index} is part of "
+                    "a configured split."
+                )
     else:
-        blender_path = "blender"
+        instance_list = [
+            (split, index)
+            for split, size in split_sizes.items()
+            for index in range(size)
+        ]
+    tasks = [
+        instance_list[worker_index::worker_count]
+        for worker_index in range(worker_count)
+    ]
 
-    # Get absolute path to generate script to be executing in Blender context.
-    script_path = (
-        blenderline_dir / "blenderline" / "scripts" / "blender" / "generate.py"
+    # Generate instances with supervised Blender processes, which are restarted when
+    # they crash, hang, or need to be recycled.
+    supervisor = WorkerSupervisor(
+        blender_path=get_blender_path(blender),
+        config_path=config_path,
+        target_path=target_path,
+        dataset_path=target_path / dataset_name,
+        overlays=overlay_paths,
+        work_path=work_path,
+        worker_count=worker_count,
+        image_timeout=get_setting(settings, "generation.image_timeout"),
+        startup_timeout=get_setting(settings, "generation.startup_timeout"),
+        max_retries=get_setting(settings, "generation.max_retries", 2),
+        max_startup_failures=get_setting(
+            settings, "generation.max_startup_failures", 5
+        ),
+        recycle_images=get_setting(settings, "generation.recycle_images"),
+        max_rss=get_setting(settings, "generation.max_rss"),
+        core_sets=core_sets,
     )
+    # Record the state of generation, so that a conversion following the dataset stops
+    # once generation completes or fails.
+    write_status(work_path, "running")
+    try:
+        report = supervisor.run(tasks)
+    except BaseException as error:
+        write_status(work_path, "failed", repr(error))
+        raise
+    if report.aborted:
+        write_status(work_path, "failed", report.aborted)
+        print(f"Generation aborted: {report.aborted}.")
+        sys.exit(1)
 
-    # Start Blender process.
-    blender_process = subprocess.Popen(
-        [
-            str(blender_path),
-            "--background",
-            "--python",
-            str(script_path),
-            "--",
-            "--config",
-            str(config_path),
-            "--target",
-            str(target_path),
-        ]
+    print(
+        f"Generated {report.num_completed} images with {report.num_restarts} worker "
+        f"restarts and {len(report.quarantined)} quarantined instances."
     )
+    if report.quarantined:
+        print(f"Quarantined instances are listed in {work_path / 'quarantine.json'}.")
+    for utilisation in report.utilisation:
+        print(
+            f"Worker {utilisation['worker']}: {utilisation['utilisation']:.0%} CPU "
+            f"utilisation of {len(utilisation['cores'] or []) or 'all'} cores."
+        )
 
-    # Handle termination of the subprocess
-    signal.signal(signal.SIGTERM, lambda _signum, _frame: blender_process.terminate())
+    # Workers cannot tell whether the dataset is complete, so the label mapping, which
+    # marks a complete dataset, is written once all instances are generated, or once
+    # generation finishes if partial datasets are allowed.
+    complete = report.num_completed == len(instance_list)
+    if complete or (allow_partial and report.num_completed):
+        write_label_mapping(settings, target_path / dataset_name)
+        write_status(work_path, "complete")
+    elif report.num_completed:
+        write_status(
+            work_path,
+            "failed",
+            f"{len(report.quarantined)} instances were quarantined",
+        )
+        print(
+            "The dataset is incomplete, so label_mapping.json is not written. "
+            "Regenerate the quarantined instances with --instances, or pass "
+            "--allow-partial to mark the dataset as complete without them."
+        )
+    else:
+        write_status(work_path, "failed", "no instance was generated")
 
-    try:
-        blender_process.wait()
-    except KeyboardInterrupt:
-        try:
-            blender_process.terminate()
-        except OSError:
-            pass
-        blender_process.wait()
-
-    sys.exit(blender_process.returncode)
+    # Signal failure if any instance could not be generated.
+    if report.quarantined or not report.num_completed:
+        sys.exit(1)
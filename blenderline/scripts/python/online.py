@@ -0,0 +1,296 @@
+import os
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Iterator
+
+blenderline_dir = pathlib.Path(__file__).parent.parent.parent.parent
+sys.path.append(str(blenderline_dir))
+
+from blenderline.scripts.python.placement import get_core_sets  # noqa: E402
+from blenderline.scripts.python.workers import (  # noqa: E402
+    get_blender_path,
+    get_worker_command,
+    start_worker_process,
+)
+from blenderline.utils import SampleRing, get_setting, load_settings  # noqa: E402
+
+
+def get_loader_worker() -> tuple[int, int]:
+    """Get index and number of data loader workers, if iterated by a PyTorch data loader
+        worker. PyTorch is only inspected if it is imported already, so that it is not a
+        dependency.
+
+    Returns:
+        tuple[int, int]: index of data loader worker and number of data loader workers,
+            or (0, 1) if not iterated by a data loader worker.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return 0, 1
+
+    worker_info = torch.utils.data.get_worker_info()
+    if worker_info is None:
+        return 0, 1
+    return worker_info.id, worker_info.num_workers
+
+
+class OnlineDataset:
+    """Iterable of samples generated by Blender workers while they are consumed, e.g., by
+    a training process, without writing any file. Every Blender worker writes samples
+    into its own shared-memory ring, which blocks the worker while the ring is full.
+
+    The dataset is compatible with torch.utils.data.IterableDataset without depending
+    on PyTorch. Start it in the main process before iterating it with a data loader, in
+    which case the rings are divided over the data loader workers, so configure at least
+    as many Blender workers as data loader workers.
+
+    A Blender worker that fails marks its ring as failed, as does the process that
+    started it if the worker exits with an error without doing so, e.g., when it
+    crashes. Iterating a failed ring raises, also in data loader workers.
+    """
+
+    def __init__(
+        self,
+        config: str,
+        overlays: list[str] = None,
+        workers: int = None,
+        blender: str = None,
+        num_slots: int = 4,
+        slot_size: int = None,
+        poll_interval: float = 0.001,
+    ) -> None:
+        """Create online dataset. Blender workers are only started by start.
+
+        Args:
+            config (str): absolute or relative location of the configuration file.
+            overlays (list[str], optional): absolute or relative locations of
+                configuration overlays. Defaults to None.
+            workers (int, optional): number of Blender workers. Defaults to None, i.e.,
+                generation.workers from the configuration, or 1.
+            blender (str, optional): folder in which Blender is installed. Defaults to
+                None, i.e., Blender is added to the system path.
+            num_slots (int, optional): number of samples every ring can hold. Defaults
+                to 4.
+            slot_size (int, optional): maximum size of a sample in bytes. Defaults to
+                None, i.e., 5 bytes per pixel of the configured resolution, for an RGB
+                image and a 16-bit instance map, plus 1 MB for labels.
+            poll_interval (float, optional): seconds between checks of empty rings.
+                Defaults to 0.001.
+        """
+        # Get absolute path to configuration file and check that it is valid, i.e.,
+        # exists and is a JSON file.
+        self.config_path = pathlib.Path(os.path.abspath(config))
+        if not self.config_path.is_file() or self.config_path.suffix != ".json":
+            raise Exception("Please specify a valid configuration file.")
+        self.overlay_paths = [
+            pathlib.Path(os.path.abspath(overlay)) for overlay in overlays or []
+        ]
+        for overlay_path in self.overlay_paths:
+            if not overlay_path.is_file() or overlay_path.suffix != ".json":
+                raise Exception("Please specify a valid configuration overlay.")
+        settings = load_settings(self.config_path, self.overlay_paths)
+
+        self.worker_count = workers or get_setting(settings, "generation.workers", 1)
+        self.blender_path = get_blender_path(blender)
+        self.pin_workers = get_setting(settings, "generation.pin_workers", True)
+        self.num_slots = num_slots
+        self.poll_interval = poll_interval
+
+        # Fit an 8-bit RGB image and a 16-bit instance map at the configured resolution.
+        if slot_size is None:
+            width, height = get_setting(settings, "scene.render_resolution", [512, 512])
+            slot_size = width * height * 5 + 2**20
+        self.slot_size = slot_size
+
+        self.ring_names: list[str] = []
+        self.rings: list[SampleRing] = []
+        self.processes: list[subprocess.Popen] = []
+        self.owner_pid: int = None
+        self.monitor: threading.Thread = None
+        self.monitor_stop = threading.Event()
+
+    def start(self) -> None:
+        """Create a ring per Blender worker, and start the Blender workers."""
+        if self.ring_names:
+            raise Exception("Online dataset is already started.")
+
+        # Pin workers to disjoint core sets that do not straddle NUMA nodes, unless
+        # disabled.
+        core_sets = get_core_sets(self.worker_count) if self.pin_workers else None
+        self.owner_pid = os.getpid()
+
+        for worker_index in range(self.worker_count):
+            ring = SampleRing.create(self.num_slots, self.slot_size)
+            self.rings.append(ring)
+            self.ring_names.append(ring.name)
+
+            cores = core_sets[worker_index] if core_sets else None
+            command = get_worker_command(
+                blender_path=self.blender_path,
+                config_path=self.config_path,
+                target_path=None,
+                overlays=self.overlay_paths,
+                worker_index=worker_index,
+                worker_count=self.worker_count,
+                threads=len(cores) if cores else None,
+                online=ring.name,
+            )
+            self.processes.append(start_worker_process(command, cores))
+
+        # Watch Blender workers from this process, as data loader workers cannot.
+        self.monitor_stop.clear()
+        self.monitor = threading.Thread(target=self.monitor_workers, daemon=True)
+        self.monitor.start()
+
+    def monitor_workers(self) -> None:
+        """Close the ring of every Blender worker that exits, and mark it as failed if
+        the worker exited with an error, until the dataset is closed."""
+        running = dict(enumerate(zip(self.processes, self.rings)))
+        while running and not self.monitor_stop.wait(self.poll_interval * 100):
+            for index, (process, ring) in list(running.items()):
+                returncode = process.poll()
+                if returncode is None:
+                    continue
+                if returncode:
+                    ring.fail()
+                else:
+                    ring.close()
+                del running[index]
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop Blender workers, and remove their rings.
+
+        Args:
+            timeout (float, optional): seconds to wait for Blender workers to exit, after
+                which they are terminated. Defaults to 10.0.
+        """
+        # Stop watching Blender workers, which exit with an error when terminated.
+        if self.monitor is not None:
+            self.monitor_stop.set()
+            self.monitor.join()
+            self.monitor = None
+
+        # Closing a ring makes its worker exit once the current sample is rendered.
+        for ring in self.rings:
+            ring.close()
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            try:
+                process.wait(max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                process.terminate()
+                process.wait()
+
+        for ring in self.rings:
+            ring.release()
+        self.ring_names, self.rings, self.processes = [], [], []
+
+    def __enter__(self) -> "OnlineDataset":
+        self.start()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def __getstate__(self) -> dict:
+        # Data loader workers attach to rings by name, and do not manage the Blender
+        # workers.
+        state = dict(self.__dict__)
+        state["rings"], state["processes"] = [], []
+        state["monitor"], state["monitor_stop"] = None, None
+        return state
+
+    @property
+    def is_owner(self) -> bool:
+        """Whether this process started the Blender workers and created their rings, as
+        opposed to, e.g., a data loader worker, even if forked with a copy of them."""
+        return self.owner_pid == os.getpid()
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """Iterate over generated samples, alternating between the rings assigned to
+            this process, until all of their workers have stopped. Raises once a failed
+            ring is empty.
+
+        Yields:
+            dict[str, Any]: sample with "width", "height", "objects", and unless only
+                layouts are generated, an "image" array of shape (height, width, 3), and
+                in masks label mode, an "instance_map" array of shape (height, width)
+                holding the pass index of the object in every pixel.
+        """
+        loader_index, loader_count = get_loader_worker()
+        if not self.ring_names:
+            if loader_count > 1:
+                raise Exception(
+                    "Please start the online dataset before iterating it with data "
+                    "loader workers."
+                )
+            self.start()
+        if loader_count > len(self.ring_names):
+            raise Exception(
+                f"Please configure at least {loader_count} Blender workers, one per "
+                "data loader worker."
+            )
+
+        # Divide rings over data loader workers, which attach to them by name.
+        worker_indices = list(range(len(self.ring_names)))[loader_index::loader_count]
+        if self.is_owner:
+            attached = []
+            rings = {index: self.rings[index] for index in worker_indices}
+        else:
+            attached = [SampleRing.attach(self.ring_names[i]) for i in worker_indices]
+            rings = dict(zip(worker_indices, attached))
+
+        try:
+            while rings:
+                received = False
+                for index, ring in list(rings.items()):
+                    # A ring that is closed before it is found empty holds no samples
+                    # that are still being written.
+                    stopped, failed = ring.closed, ring.failed
+                    sample = ring.get()
+                    if sample is not None:
+                        received = True
+                        yield sample
+                    elif failed:
+                        raise Exception(
+                            f"Blender worker {index} failed, see its output for the "
+                            "error."
+                        )
+                    elif stopped:
+                        del rings[index]
+
+                if not received:
+                    time.sleep(self.poll_interval)
+        finally:
+            # Detach from rings attached by this process.
+            for ring in attached:
+                ring.release()
+
+
+def run_online(
+    config: str,
+    overlays: list[str] = None,
+    workers: int = None,
+    blender: str = None,
+    images: int = 100,
+) -> None:
+    # Stream samples from Blender workers without storing them, to measure the
+    # throughput a training process can be fed with.
+    with OnlineDataset(
+        config=config, overlays=overlays, workers=workers, blender=blender
+    ) as dataset:
+        start_time = time.monotonic()
+        num_samples = 0
+        for _ in dataset:
+            num_samples += 1
+            if num_samples == images:
+                break
+        duration = time.monotonic() - start_time
+
+    print(
+        f"Received {num_samples} samples from {dataset.worker_count} Blender workers "
+        f"in {duration:.1f} s ({num_samples / duration:.2f} samples/s)."
+    )
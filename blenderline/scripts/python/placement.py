@@ -0,0 +1,91 @@
+import os
+import pathlib
+
+
+def parse_cpu_list(cpu_list: str) -> list[int]:
+    """Parse CPU list in Linux sysfs format, e.g., "0-3,8-11".
+
+    Args:
+        cpu_list (str): comma-separated CPU indices and ranges.
+
+    Returns:
+        list[int]: CPU indices.
+    """
+    cpus: list[int] = []
+
+    for part in cpu_list.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, stop = part.split("-")
+            cpus += list(range(int(start), int(stop) + 1))
+        else:
+            cpus.append(int(part))
+
+    return cpus
+
+
+def get_numa_nodes() -> list[list[int]]:
+    """Get CPUs available to this process grouped per NUMA node. Falls back to a single
+        node with all CPUs if the NUMA topology cannot be read, e.g., outside Linux.
+
+    Returns:
+        list[list[int]]: available CPU indices per NUMA node, excluding empty nodes.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        available_cpus = os.sched_getaffinity(0)
+    else:
+        available_cpus = set(range(os.cpu_count() or 1))
+
+    nodes: list[list[int]] = []
+    for node_path in sorted(
+        pathlib.Path("/sys/devices/system/node").glob("node[0-9]*")
+    ):
+        try:
+            cpus = parse_cpu_list((node_path / "cpulist").read_text())
+        except OSError:
+            continue
+        if cpus := [cpu for cpu in cpus if cpu in available_cpus]:
+            nodes.append(cpus)
+
+    return nodes or [sorted(available_cpus)]
+
+
+def get_core_sets(worker_count: int) -> list[list[int]]:
+    """Divide available CPUs over workers, preferring to keep every worker within one
+        NUMA node. If there are at least as many workers as nodes, workers are grouped
+        per node and split the cores of their node evenly. Otherwise, every worker gets
+        one or more whole nodes.
+
+    Args:
+        worker_count (int): number of workers.
+
+    Returns:
+        list[list[int]]: CPU indices per worker.
+    """
+    nodes = get_numa_nodes()
+
+    # Fewer workers than nodes: spread whole nodes over workers round-robin.
+    if worker_count < len(nodes):
+        core_sets: list[list[int]] = [[] for _ in range(worker_count)]
+        for node_index, cpus in enumerate(nodes):
+            core_sets[node_index % worker_count] += cpus
+        return core_sets
+
+    # At least as many workers as nodes: assign worker groups to nodes and split every
+    # node into contiguous chunks of (nearly) equal size.
+    core_sets = []
+    for node_index, cpus in enumerate(nodes):
+        num_node_workers = worker_count // len(nodes) + (
+            node_index < worker_count % len(nodes)
+        )
+        for worker_index in range(num_node_workers):
+            # Workers share cores round-robin on nodes with more workers than cores.
+            if num_node_workers > len(cpus):
+                core_sets.append([cpus[worker_index % len(cpus)]])
+                continue
+            start = worker_index * len(cpus) // num_node_workers
+            stop = (worker_index + 1) * len(cpus) // num_node_workers
+            core_sets.append(cpus[start:stop])
+
+    return core_sets
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import pathlib
+
+import yaml
+
+from blenderline.scripts.python.converters import (
+    DatasetStatistics,
+    StatisticsConverter,
+    get_label_objects,
+    run_conversion,
+)
+from blenderline.scripts.python.converters.engine import (
+    CHUNK_SIZE,
+    get_job_count,
+    initialize_worker,
+)
+
+
+def get_yolo_label_mapping(source_path: pathlib.Path) -> dict[str, str]:
+    """Get label mapping from the dataset YAML file of a converted YOLO dataset.
+
+    Args:
+        source_path (pathlib.Path): absolute location of converted YOLO dataset.
+
+    Returns:
+        dict[str, str]: mapping between label IDs and names, empty if no dataset YAML
+            file with names is found.
+    """
+    for yaml_path in sorted(source_path.glob("*.yaml")):
+        with open(yaml_path, "r") as file:
+            names = (yaml.safe_load(file) or {}).get("names")
+        if isinstance(names, dict):
+            return {str(label): str(name) for label, name in names.items()}
+        if isinstance(names, list):
+            return {str(label): str(name) for label, name in enumerate(names)}
+
+    return {}
+
+
+def run_stats(
+    source: str,
+    output: str,
+    minarea: float = 0.005,
+    jobs: int = 1,
+    plots: bool = False,
+) -> None:
+    # Get absolute paths to source and output folders.
+    source_path = pathlib.Path(os.path.abspath(source))
+    output_path = pathlib.Path(os.path.abspath(output))
+    if not source_path.is_dir():
+        raise Exception("Please specify a valid source directory.")
+
+    # BlenderLine datasets are passed over with the conversion engine, which decodes
+    # every mask once and spreads instances over worker processes.
+    if "label_mapping.json" in os.listdir(source_path):
+        run_conversion(
+            source_path,
+            [StatisticsConverter(output_path, minarea=minarea, plots=plots)],
+            jobs=jobs,
+        )
+        print(f"Wrote statistics of {source_path} to {output_path}.")
+        return
+
+    # Converted YOLO datasets are read from their label files, of which every line is
+    # an object that was kept during conversion.
+    labels_path = source_path / "labels"
+    if not labels_path.is_dir():
+        raise Exception(
+            "Please specify a valid source directory in BlenderLine or YOLO format."
+        )
+
+    tasks = [
+        (split_path.name, label_path)
+        for split_path in sorted(
+            path for path in labels_path.iterdir() if path.is_dir()
+        )
+        for label_path in sorted(split_path.glob("*.txt"))
+    ]
+    label_paths = [label_path for _, label_path in tasks]
+
+    # Parse label files, optionally spread over a pool of worker processes. Results are
+    # returned in order and added to fixed-size histograms as they arrive, so that
+    # memory use does not grow with the number of images.
+    statistics = DatasetStatistics()
+    jobs = get_job_count(jobs)
+    if jobs > 1:
+        with multiprocessing.Pool(jobs, initializer=initialize_worker) as pool:
+            chunksize = max(1, min(CHUNK_SIZE, len(tasks) // jobs))
+            for (split, _), objects in zip(
+                tasks, pool.imap(get_label_objects, label_paths, chunksize)
+            ):
+                statistics.add(split, objects)
+    else:
+        for split, label_path in tasks:
+            statistics.add(split, get_label_objects(label_path))
+
+    statistics.write(output_path, get_yolo_label_mapping(source_path), plots)
+    print(f"Wrote statistics of {len(tasks)} images of {source_path} to {output_path}.")
@@ -0,0 +1,378 @@
+import collections
+import json
+import os
+import pathlib
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+
+blenderline_dir = pathlib.Path(__file__).parent.parent.parent.parent
+sys.path.append(str(blenderline_dir))
+
+from blenderline.scripts.python.workers import (  # noqa: E402
+    get_worker_command,
+    start_worker_process,
+)
+from blenderline.utils import (  # noqa: E402
+    append_manifest,
+    get_process_cpu_time,
+    get_process_memory,
+    read_progress,
+)
+
+
+@dataclass
+class WorkerSlot:
+    """Slot in which the supervisor runs consecutive Blender worker processes."""
+
+    index: int
+    tasks: collections.deque  # Remaining (split, index) tuples, in order.
+    progress_path: pathlib.Path
+    progress_offset: int = 0
+    process: subprocess.Popen | None = None
+    last_progress_time: float = 0.0
+    num_images: int = 0  # Number of images generated by the current process.
+    num_restarts: int = 0
+    peak_rss: int = 0
+    cores: list[int] | None = None  # CPU indices the worker processes are pinned to.
+    process_start_time: float = 0.0
+    process_cpu_time: float = 0.0  # Last sampled CPU time of the current process.
+    cpu_time: float = 0.0  # CPU time of all finished processes.
+    wall_time: float = 0.0  # Lifetime of all finished processes.
+
+
+@dataclass
+class SupervisorReport:
+    """Outcome of a supervised generation run."""
+
+    num_completed: int = 0
+    num_restarts: int = 0
+    quarantined: list[dict] = field(default_factory=list)
+    utilisation: list[dict] = field(default_factory=list)
+    aborted: str | None = None  # Reason the run was aborted, if it was.
+
+
+class WorkerSupervisor:
+    """Supervisor that distributes instances over Blender worker processes, enforcing a
+    per-image timeout, restarting crashed or hung workers from the last completed
+    instance, and recycling workers after a number of images or a memory ceiling.
+    """
+
+    def __init__(
+        self,
+        blender_path: str,
+        config_path: pathlib.Path,
+        target_path: pathlib.Path,
+        dataset_path: pathlib.Path,
+        overlays: list[pathlib.Path],
+        work_path: pathlib.Path,
+        worker_count: int,
+        image_timeout: float = None,
+        startup_timeout: float = None,
+        max_retries: int = 2,
+        max_startup_failures: int = 5,
+        recycle_images: int = None,
+        max_rss: float = None,
+        core_sets: list[list[int]] = None,
+        poll_interval: float = 1.0,
+    ) -> None:
+        """Create worker supervisor.
+
+        Args:
+            blender_path (str): Blender start command.
+            config_path (pathlib.Path): absolute location of the configuration file.
+            target_path (pathlib.Path): absolute location of the generated dataset.
+            dataset_path (pathlib.Path): absolute location of the dataset root folder.
+            overlays (list[pathlib.Path]): absolute locations of configuration overlays.
+            work_path (pathlib.Path): folder for progress, task, and quarantine files.
+            worker_count (int): number of parallel worker processes.
+            image_timeout (float, optional): seconds a worker may spend on one image
+                before it is considered hung. Defaults to None, i.e., no timeout.
+            startup_timeout (float, optional): seconds a worker may spend on starting and
+                its first image. Defaults to None, i.e., no timeout.
+            max_retries (int, optional): number of times a failing instance is retried
+                before it is quarantined. Defaults to 2.
+            max_startup_failures (int, optional): number of consecutive worker failures
+                before any worker completes an image, after which the run is aborted,
+                as the failure is likely systematic, e.g., an invalid configuration or a
+                missing asset. Defaults to 5.
+            recycle_images (int, optional): number of images after which a worker is
+                restarted. Defaults to None, i.e., workers are not recycled.
+            max_rss (float, optional): memory usage (in MB) after which a worker is
+                restarted. Defaults to None, i.e., workers are not recycled.
+            core_sets (list[list[int]], optional): CPU indices to pin every worker to,
+                which also determines its number of threads. Defaults to None, i.e.,
+                workers are not pinned.
+            poll_interval (float, optional): seconds between polls. Defaults to 1.0.
+        """
+        # Save object attributes.
+        self.blender_path = blender_path
+        self.config_path = config_path
+        self.target_path = target_path
+        self.dataset_path = dataset_path
+        self.overlays = overlays
+        self.work_path = work_path
+        self.worker_count = worker_count
+        self.image_timeout = image_timeout
+        self.startup_timeout = startup_timeout
+        self.max_retries = max_retries
+        self.max_startup_failures = max_startup_failures
+        self.recycle_images = recycle_images
+        self.max_rss = max_rss
+        self.core_sets = core_sets
+        self.poll_interval = poll_interval
+
+        # Keep track of failed attempts per instance.
+        self.failures: collections.Counter = collections.Counter()
+
+        # Keep track of consecutive failures of workers that did not complete an image.
+        self.startup_failures = 0
+
+    def start_worker(self, slot: WorkerSlot) -> None:
+        """Start worker process generating the remaining instances of a slot.
+
+        Args:
+            slot (WorkerSlot): slot to start worker process in.
+        """
+        tasks_path = self.work_path / f"tasks-{slot.index}.json"
+        with open(tasks_path, mode="wt") as file:
+            json.dump(
+                [{"split": split, "index": index} for split, index in slot.tasks], file
+            )
+
+        command = get_worker_command(
+            blender_path=self.blender_path,
+            config_path=self.config_path,
+            target_path=self.target_path,
+            overlays=self.overlays,
+            worker_index=slot.index,
+            worker_count=self.worker_count,
+            progress_path=slot.progress_path,
+            tasks_path=tasks_path,
+            max_images=self.recycle_images,
+            max_rss=self.max_rss,
+            threads=len(slot.cores) if slot.cores else None,
+        )
+        slot.process = start_worker_process(command, slot.cores)
+        slot.process_start_time = slot.last_progress_time = time.time()
+        slot.process_cpu_time = 0.0
+        slot.num_images = 0
+
+    def release_worker(self, slot: WorkerSlot) -> None:
+        """Account resource usage of the exited worker process of a slot, and clear the
+            slot for a new process.
+
+        Args:
+            slot (WorkerSlot): slot of exited worker process.
+        """
+        slot.cpu_time += slot.process_cpu_time
+        slot.wall_time += time.time() - slot.process_start_time
+        slot.process = None
+
+    def stop_worker(self, slot: WorkerSlot) -> None:
+        """Kill worker process of a slot and wait for it to exit.
+
+        Args:
+            slot (WorkerSlot): slot to stop worker process of.
+        """
+        try:
+            slot.process.kill()
+        except OSError:
+            pass
+        slot.process.wait()
+
+    def handle_failure(
+        self, slot: WorkerSlot, reason: str, report: SupervisorReport
+    ) -> None:
+        """Register failure of the instance a worker was generating, and quarantine the
+            instance if it failed too often. The slot is restarted on the next poll.
+
+        Args:
+            slot (WorkerSlot): slot of failed worker process.
+            reason (str): description of failure.
+            report (SupervisorReport): report to add quarantined instances to.
+        """
+        self.release_worker(slot)
+        if not slot.tasks:
+            print(
+                f"Worker {slot.index} failed after completing its instances: {reason}."
+            )
+            return
+
+        split, index = instance = slot.tasks[0]
+
+        # Abort the run instead of retrying and quarantining every instance, if workers
+        # keep failing before completing a single image.
+        if not slot.num_images:
+            self.startup_failures += 1
+            if self.startup_failures >= self.max_startup_failures:
+                report.aborted = (
+                    f"{self.startup_failures} consecutive workers failed before "
+                    f"completing an image, the last on {split}/{index}: {reason}"
+                )
+                return
+
+        slot.num_restarts += 1
+        report.num_restarts += 1
+
+        self.failures[instance] += 1
+        print(f"Worker {slot.index} failed on {split}/{index}: {reason}.")
+
+        if self.failures[instance] > self.max_retries:
+            slot.tasks.popleft()
+            report.quarantined.append(
+                {
+                    "split": split,
+                    "index": index,
+                    "reason": reason,
+                    "attempts": self.failures[instance],
+                }
+            )
+
+            # Remove partial outputs, so that converters do not encounter them, and
+            # remove the instance from the manifest if generated by a previous run.
+            shutil.rmtree(self.dataset_path / split / str(index), ignore_errors=True)
+            append_manifest(
+                self.dataset_path / split, {"index": index, "removed": True}
+            )
+
+    def poll_slot(self, slot: WorkerSlot, report: SupervisorReport) -> None:
+        """Process progress of a slot and restart its worker process if required.
+
+        Args:
+            slot (WorkerSlot): slot to poll.
+            report (SupervisorReport): report to register completed instances in.
+        """
+        # Start worker process if the slot has remaining instances.
+        if slot.process is None:
+            if slot.tasks:
+                self.start_worker(slot)
+            return
+
+        # Poll process before reading progress, so that all progress of an exited
+        # process is read before deciding whether it failed.
+        returncode = slot.process.poll()
+
+        # Remove completed instances from remaining instances, and list their outputs in
+        # the manifest of their split. The supervisor is the only process writing
+        # manifests, so records of concurrent workers cannot interleave.
+        records, slot.progress_offset = read_progress(
+            slot.progress_path, slot.progress_offset
+        )
+        for record in records:
+            instance = (record["split"], record["index"])
+            if instance in slot.tasks:
+                slot.tasks.remove(instance)
+                report.num_completed += 1
+            if "outputs" in record:
+                append_manifest(
+                    self.dataset_path / record["split"],
+                    {"index": record["index"], **record["outputs"]},
+                )
+            slot.last_progress_time = time.time()
+            slot.num_images += 1
+            self.startup_failures = 0
+
+        # Enforce timeouts on running workers, where the first image includes startup.
+        if returncode is None:
+            _, peak_rss = get_process_memory(slot.process.pid)
+            slot.peak_rss = max(slot.peak_rss, peak_rss)
+            cpu_time = get_process_cpu_time(slot.process.pid)
+            slot.process_cpu_time = cpu_time or slot.process_cpu_time
+
+            timeout = self.image_timeout if slot.num_images else self.startup_timeout
+            if timeout and time.time() - slot.last_progress_time > timeout:
+                self.stop_worker(slot)
+                self.handle_failure(slot, f"timed out after {timeout} seconds", report)
+
+        # Workers exit normally when they are done or need to be recycled. In the latter
+        # case, a new worker continues with the remaining instances on the next poll.
+        elif returncode == 0 and (slot.num_images or not slot.tasks):
+            self.release_worker(slot)
+
+        # Workers exiting abnormally (or without progress) failed on the first remaining
+        # instance.
+        else:
+            self.handle_failure(slot, f"exited with code {returncode}", report)
+
+    def run(self, tasks: list[list[tuple[str, int]]]) -> SupervisorReport:
+        """Generate instances with supervised worker processes until all instances are
+            either completed or quarantined, or until the run is aborted because workers
+            keep failing before completing an image.
+
+        Args:
+            tasks (list[list[tuple[str, int]]]): (split, index) tuples to generate per
+                worker.
+
+        Returns:
+            SupervisorReport: outcome of the generation run.
+        """
+        slots = [
+            WorkerSlot(
+                index=worker_index,
+                tasks=collections.deque(worker_tasks),
+                progress_path=self.work_path / f"progress-{worker_index}.jsonl",
+                cores=self.core_sets[worker_index] if self.core_sets else None,
+            )
+            for worker_index, worker_tasks in enumerate(tasks)
+        ]
+        for slot in slots:
+            slot.progress_path.unlink(missing_ok=True)
+
+        report = SupervisorReport()
+
+        def terminate_workers() -> None:
+            for slot in slots:
+                if slot.process is not None:
+                    try:
+                        slot.process.terminate()
+                    except OSError:
+                        pass
+
+        # Handle termination of the subprocesses
+        signal.signal(signal.SIGTERM, lambda _signum, _frame: sys.exit(1))
+
+        try:
+            while any(slot.tasks or slot.process is not None for slot in slots):
+                for slot in slots:
+                    self.poll_slot(slot, report)
+                    if report.aborted:
+                        break
+                if report.aborted:
+                    break
+                time.sleep(self.poll_interval)
+        finally:
+            terminate_workers()
+            for slot in slots:
+                if slot.process is not None:
+                    slot.process.wait()
+
+        # Record quarantined instances, so that they can be inspected and regenerated.
+        with open(self.work_path / "quarantine.json", mode="wt") as file:
+            json.dump(report.quarantined, file, indent=2)
+
+        # Record achieved CPU utilisation per worker, relative to the cores available to
+        # it. CPU time is sampled while polling, so utilisation is slightly underestimated.
+        for slot in slots:
+            num_cores = len(slot.cores) if slot.cores else (os.cpu_count() or 1)
+            report.utilisation.append(
+                {
+                    "worker": slot.index,
+                    "cores": slot.cores,
+                    "cpu_seconds": slot.cpu_time,
+                    "wall_seconds": slot.wall_time,
+                    "utilisation": (
+                        slot.cpu_time / (slot.wall_time * num_cores)
+                        if slot.wall_time
+                        else 0.0
+                    ),
+                    "peak_rss": slot.peak_rss,
+                }
+            )
+        with open(self.work_path / "utilisation.json", mode="wt") as file:
+            json.dump(report.utilisation, file, indent=2)
+
+        return report
@@ -0,0 +1,237 @@
+import itertools
+import json
+import os
+import pathlib
+import sys
+import tempfile
+from dataclasses import dataclass
+
+blenderline_dir = pathlib.Path(__file__).parent.parent.parent.parent
+sys.path.append(str(blenderline_dir))
+
+from blenderline.scripts.python.placement import get_core_sets  # noqa: E402
+from blenderline.scripts.python.workers import (  # noqa: E402
+    WorkerProcess,
+    get_blender_path,
+    launch_workers,
+    wait_for_workers,
+)
+from blenderline.utils import get_setting, load_settings, read_progress  # noqa: E402
+
+
+@dataclass(frozen=True, eq=True)
+class TuneCandidate:
+    """Combination of render settings to calibrate."""
+
+    workers: int
+    threads: int
+    tile_size: int
+    samples: int
+
+
+@dataclass(frozen=True, eq=True)
+class TuneResult:
+    """Measured performance of a calibrated combination of render settings."""
+
+    candidate: TuneCandidate
+    images_per_hour: float
+    peak_rss: int  # Sum of peak RSS of all workers in bytes.
+
+
+def get_tune_candidates(
+    workers: list[int], threads: list[int], tile_sizes: list[int], samples: list[int]
+) -> list[TuneCandidate]:
+    """Build search grid of render settings, skipping combinations that oversubscribe
+        the available CPU cores.
+
+    Args:
+        workers (list[int]): numbers of parallel Blender processes to try.
+        threads (list[int]): numbers of Cycles threads per process to try. If empty, the
+            available cores are divided evenly over the Blender processes.
+        tile_sizes (list[int]): render tile sizes to try.
+        samples (list[int]): render sample counts to try.
+
+    Returns:
+        list[TuneCandidate]: combinations of render settings to calibrate.
+    """
+    cpu_count = os.cpu_count() or 1
+
+    candidates: list[TuneCandidate] = []
+
+    for worker_count in workers:
+        thread_counts = threads or [max(1, cpu_count // worker_count)]
+        for thread_count, tile_size, sample_count in itertools.product(
+            thread_counts, tile_sizes, samples
+        ):
+            if worker_count * thread_count > cpu_count:
+                continue
+            candidates.append(
+                TuneCandidate(worker_count, thread_count, tile_size, sample_count)
+            )
+
+    return candidates
+
+
+def get_images_per_hour(workers: list[WorkerProcess]) -> float:
+    """Compute combined throughput of workers from their progress files. The first image
+        of every worker is treated as warm-up, as it includes e.g. shader compilation.
+
+    Args:
+        workers (list[WorkerProcess]): finished worker processes.
+
+    Returns:
+        float: number of images rendered per hour by all workers combined.
+    """
+    images_per_hour = 0.0
+
+    for worker in workers:
+        records, _ = read_progress(worker.progress_path)
+        if len(records) >= 2:
+            duration = records[-1]["timestamp"] - records[0]["timestamp"]
+            images_per_hour += (len(records) - 1) / duration * 3600
+        elif records:
+            images_per_hour += 3600 / records[0]["render_time"]
+
+    return images_per_hour
+
+
+def calibrate(
+    candidate: TuneCandidate,
+    blender_path: str,
+    config_path: pathlib.Path,
+    overlay_paths: list[pathlib.Path],
+    images: int,
+) -> TuneResult:
+    """Render a short calibration batch with a combination of render settings.
+
+    Args:
+        candidate (TuneCandidate): combination of render settings to calibrate.
+        blender_path (str): Blender start command.
+        config_path (pathlib.Path): absolute location of the configuration file.
+        overlay_paths (list[pathlib.Path]): absolute locations of configuration overlays.
+        images (int): number of images to render per worker.
+
+    Returns:
+        TuneResult: measured throughput and peak memory.
+    """
+    with tempfile.TemporaryDirectory() as temp_folder:
+        temp_path = pathlib.Path(temp_folder)
+
+        # Replace configured splits by a single calibration split and apply candidate
+        # render settings on top of the configuration and user overlays.
+        calibration_overlay_path = temp_path / "calibration.json"
+        with open(calibration_overlay_path, mode="wt") as file:
+            json.dump(
+                {
+                    "dataset": {
+                        "splits": [
+                            {"name": "calibration", "size": candidate.workers * images}
+                        ]
+                    },
+                    "scene": {
+                        "render_use_cuda": False,
+                        "render_threads": candidate.threads,
+                        "render_tile_size": candidate.tile_size,
+                        "render_samples": candidate.samples,
+                    },
+                },
+                file,
+            )
+
+        workers = launch_workers(
+            blender_path=blender_path,
+            config_path=config_path,
+            target_path=temp_path / "target",
+            overlays=overlay_paths + [calibration_overlay_path],
+            worker_count=candidate.workers,
+            work_dir=temp_path,
+            core_sets=get_core_sets(candidate.workers),
+        )
+        if returncode := wait_for_workers(workers):
+            raise Exception(f"Calibration of {candidate} failed ({returncode}).")
+
+        return TuneResult(
+            candidate=candidate,
+            images_per_hour=get_images_per_hour(workers),
+            peak_rss=sum(worker.peak_rss for worker in workers),
+        )
+
+
+def run_tune(
+    config: str,
+    output: str,
+    blender: str = None,
+    overlays: list[str] = None,
+    workers: list[int] = None,
+    threads: list[int] = None,
+    tile_sizes: list[int] = None,
+    samples: list[int] = None,
+    images: int = 3,
+    max_rss: float = None,
+) -> None:
+    # Get absolute path to configuration file and check that it is valid, i.e., exists
+    # and is a JSON file.
+    config_path = pathlib.Path(os.path.abspath(config))
+    if not config_path.is_file() or config_path.suffix != ".json":
+        raise Exception("Please specify a valid configuration file.")
+
+    overlay_paths = [
+        pathlib.Path(os.path.abspath(overlay)) for overlay in overlays or []
+    ]
+    settings = load_settings(config_path, overlay_paths)
+
+    # Get absolute path to output overlay file and check that it is a JSON file.
+    output_path = pathlib.Path(os.path.abspath(output))
+    if output_path.suffix != ".json":
+        raise Exception("Please specify a JSON file as output overlay.")
+
+    # Build search grid, by default keeping the configured sample count, as it affects
+    # image quality rather than just throughput.
+    candidates = get_tune_candidates(
+        workers=workers or [1, 2, 4],
+        threads=threads or [],
+        tile_sizes=tile_sizes or [256, 2048],
+        samples=samples or [get_setting(settings, "scene.render_samples", 1024)],
+    )
+    if not candidates:
+        raise Exception("No combination of settings fits the available CPU cores.")
+
+    # Calibrate all combinations of render settings.
+    results: list[TuneResult] = []
+    blender_path = get_blender_path(blender)
+    for candidate in candidates:
+        result = calibrate(candidate, blender_path, config_path, overlay_paths, images)
+        results.append(result)
+        print(
+            f"workers={candidate.workers} threads={candidate.threads} "
+            f"tile_size={candidate.tile_size} samples={candidate.samples}: "
+            f"{result.images_per_hour:.1f} images/hour, "
+            f"{result.peak_rss / 2**20:.0f} MB peak RSS"
+        )
+
+    # Select fastest combination within the memory budget (in megabytes).
+    feasible_results = [
+        result
+        for result in results
+        if max_rss is None or result.peak_rss / 2**20 <= max_rss
+    ]
+    if not feasible_results:
+        raise Exception("No combination of settings fits the memory budget.")
+    best = max(feasible_results, key=lambda result: result.images_per_hour).candidate
+
+    # Write best settings as configuration overlay to pass to `blenderline generate`.
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, mode="wt") as file:
+        json.dump(
+            {
+                "generation": {"workers": best.workers},
+                "scene": {
+                    "render_use_cuda": False,
+                    "render_threads": best.threads,
+                    "render_tile_size": best.tile_size,
+                    "render_samples": best.samples,
+                },
+            },
+            file,
+            indent=2,
+        )
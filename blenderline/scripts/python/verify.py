@@ -0,0 +1,122 @@
+import json
+import multiprocessing
+import os
+import pathlib
+
+from blenderline.scripts.python.converters.engine import (
+    CHUNK_SIZE,
+    get_job_count,
+    initialize_worker,
+)
+from blenderline.scripts.python.converters.verify import InstanceVerification
+from blenderline.scripts.python.generate import WORK_DIR_NAME
+from blenderline.utils import read_manifest
+
+# Name of the list of invalid instances, written next to quarantine.json by default.
+INVALID_FILENAME = "invalid.json"
+
+
+def get_index(name: str) -> int | str:
+    """Get instance index from instance folder name, as in generation bookkeeping.
+
+    Args:
+        name (str): name of instance folder.
+
+    Returns:
+        int | str: instance index, or folder name if it is not an index.
+    """
+    return int(name) if name.isdigit() else name
+
+
+def run_verify(
+    source: str,
+    output: str = None,
+    jobs: int = 1,
+    headers_only: bool = False,
+) -> None:
+    # Get absolute path to source folder and check that it is valid, i.e., exists. The
+    # label mapping is only present once generation completes, so it is optional.
+    source_path = pathlib.Path(os.path.abspath(source))
+    if not source_path.is_dir():
+        raise Exception(
+            "Please specify a valid source directory in BlenderLine format."
+        )
+
+    label_ids = None
+    if (source_path / "label_mapping.json").is_file():
+        with open(source_path / "label_mapping.json", "r") as file:
+            label_ids = set(json.load(file))
+
+    # By default, the list of invalid instances is written next to the quarantine list
+    # of generation, in the work folder next to the dataset.
+    if output:
+        output_path = pathlib.Path(os.path.abspath(output))
+    else:
+        output_path = (
+            source_path.parent / WORK_DIR_NAME / source_path.name / INVALID_FILENAME
+        )
+
+    # Collect instances listed in the manifest of every split, or every instance folder
+    # of splits without manifest. Folders missing from a manifest are left over from
+    # interrupted or ongoing generation, and are invalid as converters skip them.
+    tasks: list[tuple[str, str, pathlib.Path, dict | None]] = []
+    invalid: dict[tuple[str, str], list[str]] = {}
+    for split_path in sorted(path for path in source_path.iterdir() if path.is_dir()):
+        split = split_path.name
+        manifest = read_manifest(split_path)
+        with os.scandir(split_path) as entries:
+            folder_names = {entry.name for entry in entries if entry.is_dir()}
+
+        if manifest is None:
+            tasks += [
+                (split, name, split_path / name, None) for name in sorted(folder_names)
+            ]
+            continue
+
+        tasks += [
+            (split, str(index), split_path / str(index), record)
+            for index, record in sorted(manifest.items())
+        ]
+        for name in sorted(folder_names - {str(index) for index in manifest}):
+            invalid[(split, name)] = ["instance folder is not listed in manifest"]
+
+    # Verify instances, optionally spread over a pool of worker processes.
+    verification = InstanceVerification(label_ids, decode=not headers_only)
+    jobs = get_job_count(jobs)
+    if jobs > 1:
+        with multiprocessing.Pool(jobs, initializer=initialize_worker) as pool:
+            results = list(
+                pool.imap_unordered(
+                    verification,
+                    tasks,
+                    chunksize=max(1, min(CHUNK_SIZE, len(tasks) // jobs)),
+                )
+            )
+    else:
+        results = [verification(task) for task in tasks]
+    for split, name, problems in results:
+        if problems:
+            invalid[(split, name)] = problems
+
+    # Write invalid instances in the format of the quarantine list, sorted by split and
+    # numerically by index so that the list does not depend on the number of processes.
+    # Generation can regenerate them with `blenderline generate --instances`, and
+    # conversion can skip them with `blenderline convert --skip`.
+    records = [
+        {"split": split, "index": get_index(name), "reason": "; ".join(problems)}
+        for (split, name), problems in sorted(
+            invalid.items(), key=lambda item: (item[0][0], len(item[0][1]), item[0][1])
+        )
+    ]
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w+") as file:
+        json.dump(records, file, indent=2)
+
+    print(
+        f"Verified {len(tasks)} instances of {source_path}: {len(records)} invalid "
+        f"instances listed in {output_path}."
+    )
+    for record in records[:10]:
+        print(f"{record['split']}/{record['index']}: {record['reason']}")
+    if len(records) > 10:
+        print(f"... and {len(records) - 10} more.")
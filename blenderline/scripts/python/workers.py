@@ -0,0 +1,256 @@
+import json
+import os
+import pathlib
+import signal
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+blenderline_dir = pathlib.Path(__file__).parent.parent.parent.parent
+sys.path.append(str(blenderline_dir))
+
+from blenderline.utils import get_process_memory  # noqa: E402
+
+
+@dataclass
+class WorkerProcess:
+    """Blender worker process generating part of a dataset."""
+
+    index: int
+    process: subprocess.Popen
+    progress_path: pathlib.Path | None = None
+    peak_rss: int = 0
+
+
+def get_blender_path(blender: str = None) -> str:
+    """Get Blender start command.
+
+    Args:
+        blender (str, optional): folder in which Blender is installed. Defaults to None.
+
+    Returns:
+        str: Blender start command.
+    """
+    # Append Blender start command to path if given, else, assume Blender start command
+    # is available on path and can be called using `blender`. No verification is performed
+    # on the given path, as this is likely platform-dependent.
+    if blender:
+        return str(pathlib.Path(blender) / "blender")
+    return "blender"
+
+
+def get_worker_command(
+    blender_path: str,
+    config_path: pathlib.Path,
+    target_path: pathlib.Path,
+    overlays: list[pathlib.Path],
+    worker_index: int = 0,
+    worker_count: int = 1,
+    progress_path: pathlib.Path = None,
+    tasks_path: pathlib.Path = None,
+    max_images: int = None,
+    max_rss: float = None,
+    threads: int = None,
+    online: str = None,
+) -> list[str]:
+    """Get command to start a Blender worker process.
+
+    Args:
+        blender_path (str): Blender start command.
+        config_path (pathlib.Path): absolute location of the configuration file.
+        target_path (pathlib.Path): absolute location of the generated dataset, or None
+            if the worker generates online.
+        overlays (list[pathlib.Path]): absolute locations of configuration overlays.
+        worker_index (int, optional): index of worker. Defaults to 0.
+        worker_count (int, optional): total number of workers. Defaults to 1.
+        progress_path (pathlib.Path, optional): file the worker reports progress to.
+            Defaults to None.
+        tasks_path (pathlib.Path, optional): JSON file listing the instances to generate.
+            Defaults to None.
+        max_images (int, optional): number of images after which the worker exits, so
+            that it can be recycled. Defaults to None.
+        max_rss (float, optional): memory usage (in MB) after which the worker exits, so
+            that it can be recycled. Defaults to None.
+        threads (int, optional): number of threads Blender uses, unless a fixed number
+            of render threads is configured. Defaults to None, i.e., all system threads.
+        online (str, optional): name of the sample ring the worker generates samples
+            into, instead of generating a dataset at target_path. Defaults to None.
+
+    Returns:
+        list[str]: command to start worker with.
+    """
+    # Get absolute path to generate script to be executing in Blender context.
+    script_path = (
+        blenderline_dir / "blenderline" / "scripts" / "blender" / "generate.py"
+    )
+
+    # The thread count must precede the script, as Blender handles arguments in order.
+    # Blender exits with code 0 on an uncaught Python exception, unless configured
+    # otherwise.
+    command = [blender_path, "--background"]
+    if threads:
+        command += ["--threads", str(threads)]
+    command += [
+        "--python-exit-code",
+        "1",
+        "--python",
+        str(script_path),
+        "--",
+        "--config",
+        str(config_path),
+        "--worker-index",
+        str(worker_index),
+        "--worker-count",
+        str(worker_count),
+    ]
+    if target_path:
+        command += ["--target", str(target_path)]
+    for overlay in overlays:
+        command += ["--overlay", str(overlay)]
+    if progress_path:
+        command += ["--progress", str(progress_path)]
+    if tasks_path:
+        command += ["--tasks", str(tasks_path)]
+    if max_images:
+        command += ["--max-images", str(max_images)]
+    if max_rss:
+        command += ["--max-rss", str(max_rss)]
+    if online:
+        command += ["--online", online]
+
+    return command
+
+
+def start_worker_process(
+    command: list[str], cores: list[int] = None
+) -> subprocess.Popen:
+    """Start worker process, pinned to a set of CPU cores if given. Pinning is applied
+        before Blender starts, so that all its threads inherit it, and memory is
+        allocated on the NUMA node of the pinned cores by the default first-touch policy.
+
+    Args:
+        command (list[str]): command to start worker with.
+        cores (list[int], optional): CPU indices to pin the process to. Ignored on
+            platforms without CPU affinity support. Defaults to None.
+
+    Returns:
+        subprocess.Popen: started process.
+    """
+    if cores and hasattr(os, "sched_setaffinity"):
+        return subprocess.Popen(
+            command, preexec_fn=lambda: os.sched_setaffinity(0, cores)
+        )
+    return subprocess.Popen(command)
+
+
+def launch_workers(
+    blender_path: str,
+    config_path: pathlib.Path,
+    target_path: pathlib.Path,
+    overlays: list[pathlib.Path],
+    worker_count: int,
+    work_dir: pathlib.Path = None,
+    tasks: list[list[dict]] = None,
+    core_sets: list[list[int]] = None,
+) -> list[WorkerProcess]:
+    """Start Blender worker processes, each generating an equal share of the dataset
+        or an explicit list of instances.
+
+    Args:
+        blender_path (str): Blender start command.
+        config_path (pathlib.Path): absolute location of the configuration file.
+        target_path (pathlib.Path): absolute location of the generated dataset.
+        overlays (list[pathlib.Path]): absolute locations of configuration overlays.
+        worker_count (int): number of worker processes to start.
+        work_dir (pathlib.Path, optional): folder in which workers write their progress
+            files and read their task files. Defaults to None, i.e., progress is not
+            reported.
+        tasks (list[list[dict]], optional): instances ({"split": ..., "index": ...}) to
+            generate per worker. Requires work_dir. Defaults to None, i.e., instances
+            are distributed over the workers round-robin.
+        core_sets (list[list[int]], optional): CPU indices to pin every worker to, which
+            also determines its number of threads. Defaults to None, i.e., workers are
+            not pinned.
+
+    Returns:
+        list[WorkerProcess]: started worker processes.
+    """
+    workers: list[WorkerProcess] = []
+
+    for worker_index in range(worker_count):
+        # Start every worker with an empty progress file, if progress is tracked.
+        progress_path = None
+        if work_dir:
+            progress_path = work_dir / f"progress-{worker_index}.jsonl"
+            progress_path.unlink(missing_ok=True)
+
+        # Write explicit list of instances to generate to a task file.
+        tasks_path = None
+        if tasks is not None:
+            tasks_path = work_dir / f"tasks-{worker_index}.json"
+            with open(tasks_path, mode="wt") as file:
+                json.dump(tasks[worker_index], file)
+
+        # Pin worker to its core set and match its number of threads, if given.
+        cores = core_sets[worker_index] if core_sets else None
+
+        command = get_worker_command(
+            blender_path=blender_path,
+            config_path=config_path,
+            target_path=target_path,
+            overlays=overlays,
+            worker_index=worker_index,
+            worker_count=worker_count,
+            progress_path=progress_path,
+            tasks_path=tasks_path,
+            threads=len(cores) if cores else None,
+        )
+        workers.append(
+            WorkerProcess(
+                index=worker_index,
+                process=start_worker_process(command, cores),
+                progress_path=progress_path,
+            )
+        )
+
+    return workers
+
+
+def wait_for_workers(workers: list[WorkerProcess], poll_interval: float = 1.0) -> int:
+    """Wait for all worker processes to finish, keeping track of their peak memory.
+
+    Args:
+        workers (list[WorkerProcess]): started worker processes.
+        poll_interval (float, optional): seconds between polls. Defaults to 1.0.
+
+    Returns:
+        int: first non-zero worker return code, or 0 if all workers succeeded.
+    """
+
+    def terminate_workers() -> None:
+        for worker in workers:
+            try:
+                worker.process.terminate()
+            except OSError:
+                pass
+
+    # Handle termination of the subprocesses
+    signal.signal(signal.SIGTERM, lambda _signum, _frame: terminate_workers())
+
+    try:
+        while any(worker.process.poll() is None for worker in workers):
+            for worker in workers:
+                if worker.process.returncode is None:
+                    _, peak_rss = get_process_memory(worker.process.pid)
+                    worker.peak_rss = max(worker.peak_rss, peak_rss)
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        terminate_workers()
+        for worker in workers:
+            worker.process.wait()
+
+    return next(
+        (worker.process.returncode for worker in workers if worker.process.returncode),
+        0,
+    )
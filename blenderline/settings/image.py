@@ -1,4 +1,3 @@
-import json
 import pathlib
 
 from blenderline.collections import BackgroundCollection, HDRCollection, ItemCollection
@@ -8,25 +7,38 @@ from blenderline.managers import (
     BackgroundManager,
     HDRManager,
     ItemManager,
+    LifecycleManager,
     SceneManager,
 )
+from blenderline.utils import (
+    get_encoding_profile,
+    load_hook,
+    load_settings,
+    merge_settings,
+)
 
 
 class ImageDatasetSettings:
     """TODO"""
 
-    def __init__(self, config: pathlib.Path, target: pathlib.Path) -> None:
+    def __init__(
+        self,
+        config: pathlib.Path,
+        target: pathlib.Path,
+        overlays: list[pathlib.Path] = None,
+    ) -> None:
         """TODO
 
         Args:
             config (pathlib.Path): Absolute location of the configuration file.
             target (pathlib.Path): Absolute location of the directory where the dataset
                 is generated.
+            overlays (list[pathlib.Path], optional): Absolute locations of configuration
+                overlays merged into the configuration file in order. Defaults to None.
         """
-        # Save base directory and load JSON config object.
+        # Save base directory and load JSON config object with overlays merged in.
         self.target = target
-        with open(config, mode="rt") as file:
-            self.settings: dict = json.load(file)
+        self.settings: dict = load_settings(config, overlays)
 
         # Get configuration file directory.
         self.config_dir = config.parent
@@ -152,9 +164,13 @@ class ImageDatasetSettings:
 
         return item_collection
 
-    def get_scene_manager(self) -> SceneManager:
+    def get_scene_manager(self, online: bool = False) -> SceneManager:
         """Create scene manager using parameters configured in settings.
 
+        Args:
+            online (bool, optional): whether samples are rendered into memory instead of
+                written to files. Defaults to False.
+
         Returns:
             SceneManager: scene manager object.
         """
@@ -162,6 +178,16 @@ class ImageDatasetSettings:
         if not self.get("scene.path"):
             raise Exception("Configure path to scene asset")
 
+        # Get encoding profile, and per split encoding profiles merged into it.
+        encoding: dict = self.get("scene.encoding", {})
+        split_encodings = {
+            split_dict["name"]: get_encoding_profile(
+                merge_settings(encoding, split_dict["encoding"])
+            )
+            for split_dict in self.get("dataset.splits", [])
+            if "encoding" in split_dict
+        }
+
         # Return scene manager with specified parameters, falling back to defaults if not
         # specified.
         return SceneManager(
@@ -171,6 +197,17 @@ class ImageDatasetSettings:
             render_use_cuda=self.get("scene.render_use_cuda", False),
             render_denoising=self.get("scene.render_denoising", True),
             render_resolution=self.get("scene.render_resolution", [512, 512]),
+            render_threads=self.get("scene.render_threads", 0),
+            render_tile_size=self.get("scene.render_tile_size", 2048),
+            label_mode=self.get("scene.label_mode", "masks"),
+            render_images=self.get("scene.render_images", True),
+            encoding=get_encoding_profile(encoding),
+            split_encodings=split_encodings,
+            writer_threads=self.get("scene.writer_threads", 0),
+            writer_queue_size=self.get("scene.writer_queue_size", 8),
+            online=online,
+            view_transform=self.get("scene.view_transform"),
+            look=self.get("scene.look"),
         )
 
     def get_hdr_manager(self) -> HDRManager:
@@ -208,9 +245,23 @@ class ImageDatasetSettings:
             item_collection=self.get_item_collection(),
         )
 
-    def get_dataset_generator(self) -> ImageDatasetGenerator:
+    def get_lifecycle_manager(self) -> LifecycleManager:
+        """Create datablock lifecycle manager using parameters configured in settings.
+
+        Returns:
+            LifecycleManager: lifecycle manager object.
+        """
+        return LifecycleManager(
+            purge_interval=self.get("memory.purge_interval", 10),
+        )
+
+    def get_dataset_generator(self, online: bool = False) -> ImageDatasetGenerator:
         """Create image dataset generator using parameters configured in settings.
 
+        Args:
+            online (bool, optional): whether samples are rendered into memory instead of
+                written to files. Defaults to False.
+
         Returns:
             ImageDatasetGenerator: dataste generator object.
         """
@@ -218,10 +269,13 @@ class ImageDatasetSettings:
         image_dataset_generator = ImageDatasetGenerator(
             name=self.get("dataset.name", "dataset"),
             target=self.target,
-            scene_manager=self.get_scene_manager(),
+            scene_manager=self.get_scene_manager(online),
             hdr_manager=self.get_hdr_manager(),
             background_manager=self.get_background_manager(),
             item_manager=self.get_item_manager(),
+            lifecycle_manager=self.get_lifecycle_manager(),
+            hook_threads=self.get("generation.hook_threads", 0),
+            max_rejections=self.get("generation.max_rejections", 100),
         )
 
         # Register all splits.
@@ -243,4 +297,12 @@ class ImageDatasetSettings:
                 label=item_dict["label"], label_name=item_dict["label_name"]
             )
 
+        # Register hooks per stage, referenced as module:function.
+        hooks: dict[str, list[str]] = self.get("generation.hooks", {})
+        for stage, references in hooks.items():
+            for reference in references:
+                image_dataset_generator.register_hook(
+                    stage=stage, hook=load_hook(reference, self.config_dir)
+                )
+
         return image_dataset_generator
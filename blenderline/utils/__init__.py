@@ -0,0 +1,14 @@
+from .config import get_setting, load_hook, load_settings, merge_settings
+from .encoding import IMAGE_FORMATS, EncodingProfile, get_encoding_profile
+from .labels import LABELS_FILENAME, format_values, get_pass_labels
+from .manifest import (
+    MANIFEST_FILENAME,
+    append_manifest,
+    read_instance_list,
+    read_manifest,
+)
+from .png import encode_png, write_png
+from .progress import append_progress, read_progress
+from .resources import get_process_cpu_time, get_process_memory
+from .ring import SampleRing
+from .writer import OutputWriter
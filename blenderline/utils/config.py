@@ -0,0 +1,96 @@
+import copy
+import importlib
+import json
+import pathlib
+import sys
+from typing import Callable
+
+
+def merge_settings(base: dict, overlay: dict) -> dict:
+    """Recursively merge an overlay settings dictionary into a base settings dictionary.
+        Nested dictionaries are merged key by key, whereas all other values (including
+        lists) in the overlay replace the value in the base dictionary.
+
+    Args:
+        base (dict): base settings dictionary, which is not modified.
+        overlay (dict): settings dictionary with values taking precedence.
+
+    Returns:
+        dict: new merged settings dictionary.
+    """
+    merged = copy.deepcopy(base)
+
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_settings(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+
+    return merged
+
+
+def load_settings(config: pathlib.Path, overlays: list[pathlib.Path] = None) -> dict:
+    """Load JSON configuration file and merge any configuration overlays into it, in the
+        order in which they are given.
+
+    Args:
+        config (pathlib.Path): absolute location of the configuration file.
+        overlays (list[pathlib.Path], optional): absolute locations of overlay files,
+            e.g., generated by `blenderline tune`. Defaults to None.
+
+    Returns:
+        dict: merged settings dictionary.
+    """
+    with open(config, mode="rt") as file:
+        settings: dict = json.load(file)
+
+    for overlay in overlays or []:
+        with open(overlay, mode="rt") as file:
+            settings = merge_settings(settings, json.load(file))
+
+    return settings
+
+
+def get_setting(settings: dict, key: str, default=None):
+    """Get nested value from settings dictionary using dot notation to specify a path of
+        keys to follow, e.g., "scene.path". Mirrors `ImageDatasetSettings.get` for code
+        that runs outside of Blender.
+
+    Args:
+        settings (dict): settings dictionary.
+        key (str): dot-separated path of keys to follow.
+        default (_type_, optional): default value to return if key does not exist.
+            Defaults to None.
+    """
+    parts = key.split(".")
+
+    current_dict = settings
+    for part in parts[:-1]:
+        current_dict = current_dict.get(part, {})
+
+    return current_dict.get(parts[-1], default)
+
+
+def load_hook(reference: str, config_dir: pathlib.Path) -> Callable:
+    """Import hook function from a reference of the form "module:function", e.g.,
+        "hooks:compress_outputs". Modules are also searched for in the configuration
+        file directory, so that hooks can be kept next to the configuration file.
+
+    Args:
+        reference (str): module and name of hook function, separated by a colon.
+        config_dir (pathlib.Path): absolute location of the configuration file directory.
+
+    Returns:
+        Callable: hook function.
+    """
+    module_name, _, function_name = reference.partition(":")
+    if not module_name or not function_name:
+        raise Exception(f"Configure hook {reference} as module:function")
+
+    if str(config_dir) not in sys.path:
+        sys.path.append(str(config_dir))
+    hook = getattr(importlib.import_module(module_name), function_name, None)
+    if not callable(hook):
+        raise Exception(f"Configure hook {reference} as a function in {module_name}")
+
+    return hook
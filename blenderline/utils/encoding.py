@@ -0,0 +1,48 @@
+from dataclasses import dataclass, fields
+
+# Image formats of rendered images, with the extension Blender writes them with.
+IMAGE_FORMATS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+
+@dataclass(frozen=True, eq=True)
+class EncodingProfile:
+    """Encoding of rendered images and segmentation masks written by the compositor."""
+
+    image_format: str = "PNG"
+    image_compression: int = 15  # PNG compression, from 0 (fastest) to 100 (smallest).
+    image_quality: int = 90  # JPEG and WebP quality, from 0 to 100.
+    mask_compression: int = 15  # PNG compression of masks.
+    mask_antialiasing: bool = True
+
+    @property
+    def image_suffix(self) -> str:
+        """Extension of rendered images, including the dot."""
+        return IMAGE_FORMATS[self.image_format]
+
+
+def get_encoding_profile(settings: dict) -> EncodingProfile:
+    """Create encoding profile from encoding settings, falling back to defaults for keys
+        that are not specified.
+
+    Args:
+        settings (dict): encoding settings, e.g., {"image_format": "JPEG"}.
+
+    Returns:
+        EncodingProfile: validated encoding profile.
+    """
+    # Validate keys, as a misspelled key would silently fall back to a default.
+    keys = [field.name for field in fields(EncodingProfile)]
+    for key in settings:
+        if key not in keys:
+            raise Exception(f"Configure encoding with keys of {', '.join(keys)}")
+
+    profile = EncodingProfile(**settings)
+
+    # Validate image format and compression levels.
+    if profile.image_format not in IMAGE_FORMATS:
+        raise Exception(f"Configure image format as one of {', '.join(IMAGE_FORMATS)}")
+    for key in ["image_compression", "image_quality", "mask_compression"]:
+        if not 0 <= getattr(profile, key) <= 100:
+            raise Exception(f"Configure encoding {key} between 0 and 100")
+
+    return profile
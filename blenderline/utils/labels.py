@@ -0,0 +1,160 @@
+from typing import Any
+
+import numpy as np
+
+# Name of label sidecar file written to instance folders when labels are extracted
+# from the object index pass instead of written as mask images.
+LABELS_FILENAME = "labels.json"
+
+# ASCII codes used to build formatted numbers. Padding bytes are removed afterwards.
+ZERO, POINT, MINUS, SPACE, PADDING = ord("0"), ord("."), ord("-"), ord(" "), 0
+
+# Bound on scaled values below which their fraction is exactly represented, and bound
+# on the relative rounding error of scaling values, with a safety margin.
+MAX_EXACT_SCALED = 2**52
+TIE_TOLERANCE = 2**-50
+
+
+def format_values(values: np.ndarray, precision: int = 6) -> str:
+    """Format values as space-separated fixed-point numbers, exactly equal to joining
+        f"{value:.{precision}f}" for all values, including the sign of negative values
+        that round to zero. All values are formatted at once in a preallocated
+        character buffer, which is much faster than formatting values one by one for
+        large contours.
+
+    Args:
+        values (np.ndarray): values to format, in any shape.
+        precision (int, optional): number of decimals. Defaults to 6.
+
+    Returns:
+        str: formatted values.
+    """
+    values = np.asarray(values, dtype=np.float64).reshape(-1)
+    if not len(values):
+        return ""
+
+    # Format values one by one if scaled values are not exactly represented by their
+    # integer part and fraction, i.e., if they are too large or not finite.
+    scale = 10**precision
+    scaled_values = np.abs(values) * scale
+    if not np.all(scaled_values < MAX_EXACT_SCALED):
+        return " ".join(f"{value:.{precision}f}" for value in values)
+
+    # Split absolute values, rounded to the desired precision, into integer and
+    # fractional digits. Scaling rounds values, so values that are within its rounding
+    # error of a tie between two decimals are rounded by Python instead.
+    scaled = np.rint(scaled_values).astype(np.int64)
+    ties = np.flatnonzero(
+        np.abs(scaled_values - np.floor(scaled_values) - 0.5)
+        <= scaled_values * TIE_TOLERANCE
+    )
+    for index in ties:
+        scaled[index] = int(f"{abs(values[index]):.{precision}f}".replace(".", ""))
+    integer, fraction = np.divmod(scaled, scale)
+    num_digits = len(str(integer.max()))
+
+    # Every value gets a fixed-width row of sign, integer digits, decimal point,
+    # fractional digits, and separator. Unused positions are left as padding.
+    width = 1 + num_digits + (1 + precision if precision else 0) + 1
+    buffer = np.full((len(values), width), PADDING, dtype=np.uint8)
+
+    # Place minus sign, which ends up directly in front of the first digit once padding
+    # is removed. As in Python, negative values rounding to zero keep their sign.
+    buffer[:, 0] = np.where(np.signbit(values), MINUS, PADDING)
+
+    # Place integer digits, omitting leading zeros.
+    for position in range(num_digits, 0, -1):
+        digit = integer % 10
+        if position == num_digits:
+            buffer[:, position] = ZERO + digit
+        else:
+            buffer[:, position] = np.where(integer > 0, ZERO + digit, PADDING)
+        integer //= 10
+
+    # Place decimal point and fractional digits, including trailing zeros.
+    if precision:
+        buffer[:, num_digits + 1] = POINT
+        for position in range(num_digits + 1 + precision, num_digits + 1, -1):
+            buffer[:, position] = ZERO + fraction % 10
+            fraction //= 10
+
+    buffer[:, -1] = SPACE
+
+    # Remove padding and trailing separator.
+    characters = buffer.reshape(-1)
+    return characters[characters != PADDING][:-1].tobytes().decode("ascii")
+
+
+def get_pass_labels(
+    index_map: np.ndarray, labels: dict[int, str]
+) -> list[dict[str, Any]]:
+    """Get label, bounding box, area, and mask of every object visible in an object
+        index pass, computing bounding boxes and areas of all objects in a single pass
+        over the index map.
+
+    Args:
+        index_map (np.ndarray): object pass index of every pixel, of shape (height,
+            width) with the first row at the top of the image.
+        labels (dict[int, str]): label ID of every object by pass index. Pixels of other
+            pass indices are background.
+
+    Returns:
+        list[dict[str, Any]]: label ID, pass index, bounding box in pixels as (xmin,
+            ymin, width, height), area in pixels, and run-length encoded mask of every
+            visible object, by pass index. Runs cover the bounding box in row-major
+            order, alternating between background and object pixels, starting with
+            background.
+    """
+    height, width = index_map.shape
+    pass_indices = sorted(labels)
+    if not pass_indices:
+        return []
+
+    # Number objects from 1 by position in the sorted pass indices, and all other pixels
+    # as 0, so that statistics of all objects are computed at once.
+    lookup = np.zeros(max(int(index_map.max()), pass_indices[-1]) + 1, dtype=np.int32)
+    lookup[pass_indices] = np.arange(1, len(pass_indices) + 1)
+    positions = lookup[index_map.clip(0)]
+
+    # Compute areas, and rows and columns in which every object occurs.
+    areas = np.bincount(positions.ravel(), minlength=len(pass_indices) + 1)
+    rows = np.zeros((len(pass_indices) + 1, height), dtype=bool)
+    rows[positions, np.arange(height)[:, None]] = True
+    columns = np.zeros((len(pass_indices) + 1, width), dtype=bool)
+    columns[positions, np.arange(width)[None, :]] = True
+    ymin, ymax = rows.argmax(axis=1), height - 1 - rows[:, ::-1].argmax(axis=1)
+    xmin, xmax = columns.argmax(axis=1), width - 1 - columns[:, ::-1].argmax(axis=1)
+
+    objects = []
+    for position, pass_index in enumerate(pass_indices, 1):
+        if not areas[position]:
+            continue
+
+        # Encode mask within bounding box as runs, starting with background.
+        crop = (
+            positions[
+                ymin[position] : ymax[position] + 1, xmin[position] : xmax[position] + 1
+            ]
+            == position
+        ).ravel()
+        boundaries = np.flatnonzero(crop[1:] != crop[:-1]) + 1
+        counts = np.diff(boundaries, prepend=0, append=crop.size).tolist()
+        if crop[0]:
+            counts.insert(0, 0)
+
+        objects.append(
+            {
+                "label": labels[pass_index],
+                "pass_index": pass_index,
+                "bbox": [
+                    int(xmin[position]),
+                    int(ymin[position]),
+                    int(xmax[position] - xmin[position] + 1),
+                    int(ymax[position] - ymin[position] + 1),
+                ],
+                "area": int(areas[position]),
+                "counts": counts,
+            }
+        )
+
+    return objects
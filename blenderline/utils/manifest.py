@@ -0,0 +1,60 @@
+import json
+import pathlib
+
+from .progress import append_progress, read_progress
+
+# Name of manifest file within every split folder of a generated dataset.
+MANIFEST_FILENAME = "manifest.jsonl"
+
+
+def append_manifest(split_path: pathlib.Path, record: dict) -> None:
+    """Append instance record to the manifest of a split. Records are appended as
+        instances are generated, so a later record of an instance supersedes earlier
+        ones, e.g., when an instance is regenerated.
+
+    Args:
+        split_path (pathlib.Path): absolute location of split folder.
+        record (dict): instance record with index, image filename, and masks (filename,
+            label, and pass index). Records with "removed" set mark removed instances.
+    """
+    split_path.mkdir(parents=True, exist_ok=True)
+    append_progress(split_path / MANIFEST_FILENAME, record)
+
+
+def read_manifest(split_path: pathlib.Path) -> dict[int, dict] | None:
+    """Read latest record of every instance in the manifest of a split.
+
+    Args:
+        split_path (pathlib.Path): absolute location of split folder.
+
+    Returns:
+        dict[int, dict] | None: instance records by instance index, excluding removed
+            instances, or None if the split has no manifest.
+    """
+    manifest_path = split_path / MANIFEST_FILENAME
+    if not manifest_path.is_file():
+        return None
+
+    records: dict[int, dict] = {}
+    for record in read_progress(manifest_path)[0]:
+        if record.get("removed"):
+            records.pop(record["index"], None)
+        else:
+            records[record["index"]] = record
+
+    return records
+
+
+def read_instance_list(list_path: pathlib.Path) -> list[tuple[str, int | str]]:
+    """Read list of instances, e.g., quarantine.json written by generation, or
+        invalid.json written by `blenderline verify`.
+
+    Args:
+        list_path (pathlib.Path): absolute location of JSON file with a list of records
+            with split and index of every instance.
+
+    Returns:
+        list[tuple[str, int | str]]: split and index of every listed instance.
+    """
+    with open(list_path, "r") as file:
+        return [(record["split"], record["index"]) for record in json.load(file)]
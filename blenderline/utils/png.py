@@ -0,0 +1,91 @@
+import os
+import pathlib
+import struct
+import zlib
+
+import numpy as np
+
+# Every PNG image starts with this 8-byte signature.
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def get_png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """Build PNG chunk from its type and data.
+
+    Args:
+        chunk_type (bytes): 4-byte chunk type, e.g., b"IHDR".
+        data (bytes): chunk data.
+
+    Returns:
+        bytes: chunk length, type, data, and CRC.
+    """
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+def encode_png(pixels: np.ndarray, compression: int = 15) -> bytes:
+    """Encode image as PNG with NumPy and zlib, which release the GIL for most of the
+        work, so that images can be encoded in background threads inside Blender. Every
+        scanline uses the Up filter, which is computed for all rows at once.
+
+    Args:
+        pixels (np.ndarray): boolean (height, width) image, written as 1-bit grayscale,
+            uint8 (height, width) image, written as 8-bit grayscale, or uint8 (height,
+            width, 3) image, written as 8-bit RGB. The first row is the top of the image.
+        compression (int, optional): compression from 0 (fastest) to 100 (smallest), as
+            in Blender. Defaults to 15.
+
+    Returns:
+        bytes: encoded PNG image.
+    """
+    height, width = pixels.shape[:2]
+
+    # Pack 1-bit pixels into bytes, most significant bit first.
+    if pixels.dtype == bool:
+        bit_depth, color_type = 1, 0
+        rows = np.packbits(pixels, axis=1)
+    elif pixels.ndim == 2:
+        bit_depth, color_type = 8, 0
+        rows = pixels.astype(np.uint8, copy=False)
+    else:
+        bit_depth, color_type = 8, 2
+        rows = pixels.astype(np.uint8, copy=False).reshape(height, width * 3)
+
+    # Prefix every row with the Up filter type, and subtract the previous row modulo
+    # 256. The first row is subtracted from zeros, i.e., kept as is.
+    scanlines = np.empty((height, rows.shape[1] + 1), dtype=np.uint8)
+    scanlines[:, 0] = 2
+    scanlines[:, 1:] = rows
+    scanlines[1:, 1:] -= rows[:-1]
+
+    header = struct.pack(">IIBBBBB", width, height, bit_depth, color_type, 0, 0, 0)
+    level = round(compression * 9 / 100)
+
+    return (
+        PNG_SIGNATURE
+        + get_png_chunk(b"IHDR", header)
+        + get_png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), level))
+        + get_png_chunk(b"IEND", b"")
+    )
+
+
+def write_png(
+    png_path: pathlib.Path, pixels: np.ndarray, compression: int = 15
+) -> None:
+    """Encode image as PNG and write it atomically, so that an interrupted write never
+        leaves a truncated image under its final name.
+
+    Args:
+        png_path (pathlib.Path): absolute location of PNG image.
+        pixels (np.ndarray): image to encode, see encode_png.
+        compression (int, optional): compression from 0 (fastest) to 100 (smallest).
+            Defaults to 15.
+    """
+    temporary_path = png_path.with_name(png_path.name + ".tmp")
+    with open(temporary_path, "wb") as file:
+        file.write(encode_png(pixels, compression))
+    os.replace(temporary_path, png_path)
@@ -0,0 +1,43 @@
+import json
+import pathlib
+
+
+def append_progress(progress_path: pathlib.Path, record: dict) -> None:
+    """Append progress record to a JSON lines progress file. Every record is written
+        with a single write call and flushed immediately, so that a process tailing the
+        file never observes more than one partially written line.
+
+    Args:
+        progress_path (pathlib.Path): absolute location of progress file.
+        record (dict): JSON serializable progress record.
+    """
+    with open(progress_path, mode="at") as file:
+        file.write(json.dumps(record) + "\n")
+        file.flush()
+
+
+def read_progress(
+    progress_path: pathlib.Path, offset: int = 0
+) -> tuple[list[dict], int]:
+    """Read complete progress records appended to a progress file since a given offset.
+
+    Args:
+        progress_path (pathlib.Path): absolute location of progress file.
+        offset (int, optional): byte offset to start reading from. Defaults to 0.
+
+    Returns:
+        tuple[list[dict], int]: new progress records and the offset to continue from.
+            Trailing partially written lines are left for the next read.
+    """
+    if not progress_path.is_file():
+        return [], offset
+
+    with open(progress_path, mode="rb") as file:
+        file.seek(offset)
+        data = file.read()
+
+    # Only consume lines terminated by a newline, as the last line may still be written.
+    end = data.rfind(b"\n") + 1
+    records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+
+    return records, offset + end
@@ -0,0 +1,64 @@
+import os
+import pathlib
+import sys
+
+try:
+    import resource
+except ImportError:  # Not available on Windows.
+    resource = None
+
+
+def get_process_memory(pid: int = None) -> tuple[int, int]:
+    """Get current and peak resident set size (RSS) of a process.
+
+    Args:
+        pid (int, optional): process ID. Defaults to None, i.e., the current process.
+
+    Returns:
+        tuple[int, int]: current and peak RSS in bytes. Values are 0 if they cannot be
+            determined on the current platform, e.g., for other processes outside Linux.
+    """
+    status_path = pathlib.Path(f"/proc/{pid or os.getpid()}/status")
+
+    # On Linux, the proc filesystem exposes both current (VmRSS) and peak (VmHWM) RSS.
+    try:
+        with open(status_path, mode="rt") as file:
+            status = dict(
+                line.split(":", maxsplit=1) for line in file.read().splitlines()
+            )
+        rss = int(status["VmRSS"].split()[0]) * 1024
+        peak_rss = int(status["VmHWM"].split()[0]) * 1024
+        return rss, peak_rss
+    except (OSError, KeyError, ValueError):
+        pass
+
+    # Other platforms only expose the peak RSS of the current process, which is
+    # reported in kilobytes on Linux and in bytes on macOS.
+    if resource and (pid is None or pid == os.getpid()):
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != "darwin":
+            peak_rss *= 1024
+        return peak_rss, peak_rss
+
+    return 0, 0
+
+
+def get_process_cpu_time(pid: int) -> float | None:
+    """Get CPU time (user and system, summed over all threads) consumed by a process.
+
+    Args:
+        pid (int): process ID.
+
+    Returns:
+        float | None: CPU time in seconds, or None if it cannot be determined on the
+            current platform.
+    """
+    # On Linux, fields 14 and 15 of /proc/<pid>/stat hold user and system time in clock
+    # ticks. The process name (field 2) may contain spaces, so fields are counted from
+    # the closing parenthesis of the process name.
+    try:
+        with open(f"/proc/{pid}/stat", mode="rt") as file:
+            fields = file.read().rsplit(")", maxsplit=1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
@@ -0,0 +1,262 @@
+import json
+import platform
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any
+
+import numpy as np
+
+# The ring header holds the slot size, number of slots, number of samples written and
+# read, and whether the ring is closed and whether the writer failed, as 64-bit
+# integers. Every slot holds a 64-bit payload size followed by the payload, and starts
+# at a multiple of 64 bytes.
+HEADER_SIZE = 64
+SLOT_SIZE, NUM_SLOTS, WRITE_COUNT, READ_COUNT, CLOSED, FAILED = range(6)
+ALIGNMENT = 64
+
+# Architectures with total store order, on which stores become visible to other cores in
+# program order. Publishing a sample by storing the written count after its payload
+# relies on this, as Python offers no memory barriers.
+TSO_ARCHITECTURES = ["x86_64", "amd64", "i386", "i686", "x86"]
+
+
+def get_payload_layout(sample: dict[str, Any]) -> tuple[bytes, list[np.ndarray]]:
+    """Get payload header and arrays of sample. The header describes the arrays and
+        holds all other values of the sample as JSON.
+
+    Args:
+        sample (dict[str, Any]): sample to serialize, mapping names to NumPy arrays or
+            JSON serializable values.
+
+    Returns:
+        tuple[bytes, list[np.ndarray]]: header, and arrays to write after the header.
+    """
+    arrays = {
+        name: value for name, value in sample.items() if isinstance(value, np.ndarray)
+    }
+    header = json.dumps(
+        {
+            "values": {
+                name: value for name, value in sample.items() if name not in arrays
+            },
+            "arrays": [
+                [name, array.dtype.str, list(array.shape)]
+                for name, array in arrays.items()
+            ],
+        }
+    ).encode()
+
+    return header, list(arrays.values())
+
+
+def get_array_offsets(header_size: int, arrays: list[np.ndarray]) -> list[int]:
+    """Get offsets of arrays within payload, after the header length and header, with
+        every array aligned to 8 bytes.
+
+    Args:
+        header_size (int): size of payload header in bytes.
+        arrays (list[np.ndarray]): arrays of sample.
+
+    Returns:
+        list[int]: offset of every array, followed by the size of the payload.
+    """
+    offsets = [(4 + header_size + 7) // 8 * 8]
+    for array in arrays:
+        offsets.append((offsets[-1] + array.nbytes + 7) // 8 * 8)
+
+    return offsets
+
+
+class SampleRing:
+    """Ring buffer of samples in shared memory, written by a single process and read by
+    a single other process, e.g., a Blender worker and a data loader worker on the same
+    host. The writer blocks while all slots are full, and the reader blocks while all
+    slots are empty, so that neither process can run ahead of the other.
+
+    The counts of written and read samples are aligned 64-bit integers, which x86 stores
+    atomically. Each count is only modified by one process, so no lock is needed. A
+    sample is published by storing the written count after the payload, which relies on
+    the total store order of x86, so rings are only supported on x86 hosts. On weakly
+    ordered architectures, e.g., aarch64, the reader could see the count before the
+    payload.
+    """
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool) -> None:
+        """Wrap shared memory holding a ring. Use SampleRing.create or SampleRing.attach
+            instead.
+
+        Args:
+            memory (shared_memory.SharedMemory): shared memory holding the ring.
+            owner (bool): whether this process created the ring, and removes it once
+                released.
+        """
+        self.memory = memory
+        self.owner = owner
+        self.header = np.ndarray((HEADER_SIZE // 8,), dtype=np.int64, buffer=memory.buf)
+        self.slot_size = int(self.header[SLOT_SIZE])
+        self.num_slots = int(self.header[NUM_SLOTS])
+        self.slot_stride = (8 + self.slot_size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+    @classmethod
+    def create(cls, num_slots: int, slot_size: int) -> "SampleRing":
+        """Create ring in new shared memory.
+
+        Args:
+            num_slots (int): number of samples the ring can hold.
+            slot_size (int): maximum size of a serialized sample in bytes.
+
+        Returns:
+            SampleRing: empty ring, owned by this process.
+        """
+        if platform.machine().lower() not in TSO_ARCHITECTURES:
+            raise Exception(
+                f"Shared-memory sample rings are not supported on {platform.machine()}, "
+                "only on x86 hosts"
+            )
+
+        slot_stride = (8 + slot_size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+        memory = shared_memory.SharedMemory(
+            create=True, size=HEADER_SIZE + num_slots * slot_stride
+        )
+        header = np.ndarray((HEADER_SIZE // 8,), dtype=np.int64, buffer=memory.buf)
+        header[:] = 0
+        header[SLOT_SIZE], header[NUM_SLOTS] = slot_size, num_slots
+        del header
+
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SampleRing":
+        """Attach to ring created by another process.
+
+        Args:
+            name (str): name of shared memory of ring.
+
+        Returns:
+            SampleRing: ring, not owned by this process.
+        """
+        # The resource tracker removes shared memory registered by a process once the
+        # process exits, which must only happen for the owner. Processes started by
+        # the owner share its tracker, whereas unrelated processes, e.g., Blender
+        # workers, start their own, from which the ring is removed again.
+        try:
+            memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            shared_tracker = resource_tracker._resource_tracker._fd is not None
+            memory = shared_memory.SharedMemory(name=name)
+            if not shared_tracker:
+                resource_tracker.unregister(memory._name, "shared_memory")
+
+        return cls(memory, owner=False)
+
+    @property
+    def name(self) -> str:
+        """Name of shared memory of ring, to attach to from other processes."""
+        return self.memory.name
+
+    @property
+    def closed(self) -> bool:
+        """Whether the ring is closed by either process."""
+        return bool(self.header[CLOSED])
+
+    @property
+    def failed(self) -> bool:
+        """Whether the writer failed, so that the samples it would write never follow."""
+        return bool(self.header[FAILED])
+
+    def close(self) -> None:
+        """Close ring, so that the other process stops writing or reading."""
+        self.header[CLOSED] = 1
+
+    def fail(self) -> None:
+        """Mark writer as failed and close ring, so that the reader raises instead of
+        treating the ring as finished.
+        """
+        self.header[FAILED] = 1
+        self.close()
+
+    def get_slot(self, count: int) -> memoryview:
+        """Get memory of the slot holding the sample with the given count.
+
+        Args:
+            count (int): number of samples written before the sample.
+
+        Returns:
+            memoryview: slot memory, starting with the payload size.
+        """
+        start = HEADER_SIZE + count % self.num_slots * self.slot_stride
+        return self.memory.buf[start : start + 8 + self.slot_size]
+
+    def put(self, sample: dict[str, Any], poll_interval: float = 0.001) -> bool:
+        """Write sample to the ring, waiting while all slots are full.
+
+        Args:
+            sample (dict[str, Any]): sample mapping names to NumPy arrays or JSON
+                serializable values.
+            poll_interval (float, optional): seconds between checks for a free slot.
+                Defaults to 0.001.
+
+        Returns:
+            bool: whether the sample was written, i.e., False if the ring is closed.
+        """
+        header, arrays = get_payload_layout(sample)
+        offsets = get_array_offsets(len(header), arrays)
+        if offsets[-1] > self.slot_size:
+            raise Exception(
+                f"Sample of {offsets[-1]} bytes does not fit in a slot of "
+                f"{self.slot_size} bytes, configure a larger slot size"
+            )
+
+        # Wait for a free slot.
+        write_count = int(self.header[WRITE_COUNT])
+        while write_count - int(self.header[READ_COUNT]) >= self.num_slots:
+            if self.closed:
+                return False
+            time.sleep(poll_interval)
+        if self.closed:
+            return False
+
+        # Write payload directly into the slot, and publish it by counting it as
+        # written only afterwards.
+        slot = self.get_slot(write_count)
+        struct.pack_into("<qI", slot, 0, offsets[-1], len(header))
+        slot[12 : 12 + len(header)] = header
+        for array, offset in zip(arrays, offsets):
+            np.ndarray(array.shape, array.dtype, slot, 8 + offset)[...] = array
+        self.header[WRITE_COUNT] = write_count + 1
+
+        return True
+
+    def get(self) -> dict[str, Any] | None:
+        """Read the oldest unread sample from the ring, without waiting.
+
+        Returns:
+            dict[str, Any] | None: sample, with copies of its arrays, or None if the
+                ring is empty.
+        """
+        read_count = int(self.header[READ_COUNT])
+        if read_count == int(self.header[WRITE_COUNT]):
+            return None
+
+        # Copy payload out of the slot, before counting it as read so that the writer
+        # can reuse the slot.
+        slot = self.get_slot(read_count)
+        header_size = struct.unpack_from("<I", slot, 8)[0]
+        header = json.loads(bytes(slot[12 : 12 + header_size]))
+        sample = dict(header["values"])
+        offset = (4 + header_size + 7) // 8 * 8
+        for name, dtype, shape in header["arrays"]:
+            array = np.ndarray(shape, np.dtype(dtype), slot, 8 + offset).copy()
+            sample[name] = array
+            offset = (offset + array.nbytes + 7) // 8 * 8
+        self.header[READ_COUNT] = read_count + 1
+
+        return sample
+
+    def release(self) -> None:
+        """Detach from ring, and remove it if this process created it."""
+        del self.header
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
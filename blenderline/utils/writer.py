@@ -0,0 +1,72 @@
+import pathlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+
+from .png import write_png
+
+
+class OutputWriter:
+    """Pool of background threads that encode and write rendered outputs, so that
+    encoding overlaps rendering of the next image. The number of pending outputs is
+    bounded, so that rendering blocks rather than buffering images without limit when
+    writing falls behind.
+    """
+
+    def __init__(self, num_threads: int = 2, queue_size: int = 8) -> None:
+        """Create output writer.
+
+        Args:
+            num_threads (int, optional): number of writer threads. Defaults to 2.
+            queue_size (int, optional): maximum number of outputs waiting to be written,
+                including outputs being written. Defaults to 8.
+        """
+        self.executor = ThreadPoolExecutor(
+            num_threads, thread_name_prefix="blenderline-writer"
+        )
+        self.slots = threading.BoundedSemaphore(queue_size)
+
+        # Keep track of the first error that occurred while writing, which is raised by
+        # close even if the future of the failed output is never inspected.
+        self.error: BaseException = None
+
+    def write_png(
+        self, png_path: pathlib.Path, pixels: np.ndarray, compression: int = 15
+    ) -> Future:
+        """Queue image to be encoded as PNG and written, blocking while the queue is
+            full.
+
+        Args:
+            png_path (pathlib.Path): absolute location of PNG image.
+            pixels (np.ndarray): image to encode, see encode_png. The array must not be
+                modified until the image is written.
+            compression (int, optional): compression from 0 (fastest) to 100
+                (smallest). Defaults to 15.
+
+        Returns:
+            Future: future that completes once the image is written, and raises any
+                error that occurred while writing.
+        """
+        self.slots.acquire()
+        future = self.executor.submit(write_png, png_path, pixels, compression)
+        future.add_done_callback(self.finish_write)
+
+        return future
+
+    def finish_write(self, future: Future) -> None:
+        """Release queue slot of a written output, and record its error, if any.
+
+        Args:
+            future (Future): future of the written output.
+        """
+        self.slots.release()
+        if self.error is None and not future.cancelled():
+            self.error = future.exception()
+
+    def close(self) -> None:
+        """Wait for all queued outputs to be written, and stop writer threads. Raises the
+        first error that occurred while writing."""
+        self.executor.shutdown(wait=True)
+        if self.error is not None:
+            raise self.error